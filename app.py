@@ -8,12 +8,54 @@ Company: INDOARSIP
 
 import streamlit as st
 import pandas as pd
-import zipfile
-import tempfile
 import os
-import shutil
-from pathlib import Path
-from io import BytesIO
+import re
+import logging
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from indoarsip import (
+    MATCH_MODES,
+    DEFAULT_CODE_PATTERNS,
+    compile_code_patterns,
+    REPORT_FILE_NAME,
+    list_zip_members,
+    ARCHIVE_UPLOAD_TYPES,
+    is_tar_archive,
+    list_tar_members,
+    read_source_file,
+    spill_files,
+    match_files_with_reference,
+    create_zip_from_files,
+    create_zip_from_tar,
+    read_output_file,
+    create_unmatched_report,
+    load_reference_index,
+    read_excel_headers,
+    JobMetrics,
+    JobCancelled,
+    JobRejected,
+    job_manager,
+    content_hash,
+    resolve_duplicates,
+    suggest_for_unmatched,
+    format_suggestions,
+    BATCH_WORKERS,
+    run_batch,
+    summarize_batch,
+    import_register,
+    list_registers,
+    open_register,
+    register_index,
+    FileManifest,
+    workspace_manager,
+    artefact_cache,
+    estimate_size,
+    file_cache,
+)
+
+# Job metrics are logged as one JSON line per job
+logging.basicConfig(level=logging.INFO, format="%(message)s")
 
 # ============================================================================
 # PAGE CONFIGURATION
@@ -137,145 +179,714 @@ if 'validated' not in st.session_state:
     st.session_state.validated = False
 if 'temp_dir' not in st.session_state:
     st.session_state.temp_dir = None
-if 'file_list' not in st.session_state:
-    st.session_state.file_list = []
+if 'source_zip' not in st.session_state:
+    st.session_state.source_zip = None
+if 'file_manifest' not in st.session_state:
+    # One columnar table: scan, match result and output names of every file
+    st.session_state.file_manifest = None
 if 'reference_data' not in st.session_state:
     st.session_state.reference_data = None
-if 'matched_files' not in st.session_state:
-    st.session_state.matched_files = []
-if 'unmatched_files' not in st.session_state:
-    st.session_state.unmatched_files = []
-if 'rename_mapping' not in st.session_state:
-    st.session_state.rename_mapping = {}
 if 'show_individual_files' not in st.session_state:
     st.session_state.show_individual_files = False
-if 'file_contents_cache' not in st.session_state:
-    st.session_state.file_contents_cache = {}
 if 'show_download_section' not in st.session_state:
     st.session_state.show_download_section = False
+if 'output_dir' not in st.session_state:
+    st.session_state.output_dir = None
+if 'output_parts' not in st.session_state:
+    st.session_state.output_parts = []
+if 'report_path' not in st.session_state:
+    st.session_state.report_path = None
+if 'duplicate_files' not in st.session_state:
+    st.session_state.duplicate_files = []
+if 'validation_metrics' not in st.session_state:
+    st.session_state.validation_metrics = None
+if 'rename_metrics' not in st.session_state:
+    st.session_state.rename_metrics = None
+if 'upload_hashes' not in st.session_state:
+    st.session_state.upload_hashes = {}
+if 'scan_manifest' not in st.session_state:
+    st.session_state.scan_manifest = None
+if 'validation_result' not in st.session_state:
+    st.session_state.validation_result = None
+if 'validation_job_id' not in st.session_state:
+    st.session_state.validation_job_id = None
+if 'rename_job_id' not in st.session_state:
+    st.session_state.rename_job_id = None
+if 'applied_job_ids' not in st.session_state:
+    st.session_state.applied_job_ids = set()
+if 'batch_job_id' not in st.session_state:
+    st.session_state.batch_job_id = None
+if 'batch_output_dir' not in st.session_state:
+    st.session_state.batch_output_dir = None
+if 'batch_summaries' not in st.session_state:
+    st.session_state.batch_summaries = None
+if 'batch_metrics' not in st.session_state:
+    st.session_state.batch_metrics = None
+
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = get_script_run_ctx().session_id
+
+def session_is_active(session_id):
+    """Whether a browser session is still connected (always true outside a server)"""
+    return not runtime.exists() or runtime.get_instance().is_active_session(session_id)
+
+# Disk workspaces of this session stay alive while it is used; idle or closed sessions are cleaned up
+workspace_manager.start_janitor(is_active=session_is_active)
+workspace_manager.touch(st.session_state.session_id)
+
+# Reattach to background jobs after a browser refresh (job ids are kept in the URL)
+for job_kind in ('validation', 'rename', 'batch'):
+    job_id = st.query_params.get(f"{job_kind}_job")
+    if st.session_state[f"{job_kind}_job_id"] is None and job_id and job_manager.get(job_id):
+        st.session_state[f"{job_kind}_job_id"] = job_id
 
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def extract_zip(zip_file):
-    """Extract ZIP file to temporary directory"""
-    temp_dir = tempfile.mkdtemp()
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        zip_ref.extractall(temp_dir)
-    return temp_dir
-
-def get_files_from_directory(directory):
-    """Get all files from directory (including subdirectories)"""
-    files = []
-    for root, dirs, filenames in os.walk(directory):
-        # Skip __MACOSX and other system directories
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__MACOSX']
+def read_renamed_file(source_key, file_key, new_name, source_zip=None, output_parts=None):
+    """Return a callable that reads a renamed file's bytes on click, through the shared cache
+
+    Entries are keyed by upload content (source_key) and file key, so every
+    session downloading from the same archive shares them. A TAR cannot be
+    read at random, its files are read back from the output ZIP part(s).
+    """
+    if source_zip is not None and is_tar_archive(source_zip):
+        return lambda: file_cache.get((source_key, file_key), lambda: read_output_file(output_parts, new_name))
+    return lambda: file_cache.get((source_key, file_key), lambda: read_source_file(file_key, source_zip))
+
+DOWNLOAD_PAGE_SIZES = [25, 50, 100]
+
+def paginate(rows, page, page_size):
+    """Return the rows of a 1-based page and the total number of pages"""
+    total_pages = max(1, (len(rows) + page_size - 1) // page_size)
+    page = min(max(1, page), total_pages)
+    start = (page - 1) * page_size
+    return rows[start:start + page_size], total_pages
+
+def upload_content_key(uploads, upload_hashes, progress=None):
+    """Content hash of a set of uploads; each upload is hashed once per session"""
+    parts = []
+    for upload in uploads:
+        if upload.file_id not in upload_hashes:
+            upload_hashes[upload.file_id] = content_hash(upload.getbuffer(), progress)
+        elif progress is not None:
+            progress.advance(nbytes=upload.size)
+        parts.append(f"{upload.name}\0{upload_hashes[upload.file_id]}")
+    return content_hash('\n'.join(sorted(parts)).encode('utf-8'))
+
+def scan_uploads(upload_type, uploads, metrics, session_id, progress=None):
+    """Scan the archive upload(s) into a manifest of files
+
+    Loose uploads get a workspace of the session (see indoarsip.workspace)
+    but nothing is written to it yet: matching only needs their names.
+    """
+    if upload_type == "File ZIP Arsip" and is_tar_archive(uploads[0]):
+        # Only the member headers are read, nothing is extracted
+        with metrics.stage('scan_tar') as stage:
+            tar_members, all_items = list_tar_members(uploads[0])
+            stage['items'] = len(tar_members)
+            stage['bytes'] = uploads[0].size
+        return {
+            'files': FileManifest.from_files([name for name, _ in tar_members], [size for _, size in tar_members]),
+            'all_items': all_items if not tar_members else [],
+            'temp_dir': None,
+        }
+    
+    if upload_type == "File ZIP Arsip":
+        # Only the central directory is read, nothing is extracted
+        with metrics.stage('scan_zip') as stage:
+            zip_members, all_items = list_zip_members(uploads[0])
+            stage['items'] = len(zip_members)
+            stage['bytes'] = uploads[0].size
+        return {
+            'files': FileManifest.from_files(
+                [info.filename for info in zip_members],
+                [info.file_size for info in zip_members]
+            ),
+            # Only shown (debug) when no valid file was found
+            'all_items': all_items if not zip_members else [],
+            'temp_dir': None,
+        }
+    
+    # Loose uploads are only listed: their names are matched first, spill_matched_uploads writes the matched ones
+    with metrics.stage('list_uploads') as stage:
+        temp_dir = workspace_manager.create(session_id, 'upload')
+        stage['items'] = len(uploads)
+    return {
+        'files': FileManifest.from_files(
+            [os.path.join(temp_dir, uploaded_file.name) for uploaded_file in uploads],
+            [uploaded_file.size for uploaded_file in uploads]
+        ),
+        'all_items': [],
+        'temp_dir': temp_dir,
+    }
+
+def spill_matched_uploads(files, uploads, temp_dir, metrics, progress=None):
+    """Write the matched loose uploads into their workspace, concurrently
+
+    Unmatched files are never written; files already spilled by an earlier
+    validation of the same uploads are kept. Only the bytes written are
+    counted against the server disk quota.
+    """
+    by_path = {os.path.join(temp_dir, uploaded_file.name): uploaded_file for uploaded_file in uploads}
+    matched = {file_key: by_path[file_key] for file_key in files.file_keys(files.matched())}
+    if progress is not None:
+        progress.set_stage('write_uploads', files_total=len(matched), bytes_total=sum(u.size for u in matched.values()))
+    with metrics.stage('write_uploads') as stage:
+        try:
+            workspace_manager.reserve(temp_dir, sum(
+                uploaded_file.size for file_key, uploaded_file in matched.items() if not os.path.exists(file_key)
+            ))
+        except FileNotFoundError:
+            raise FileNotFoundError("File upload sudah dihapus dari server (terlalu lama tidak dipakai), validasi ulang ya")
+        with workspace_manager.busy(temp_dir):
+            stage['bytes'] = spill_files(matched, progress=progress)
+        workspace_manager.record_size(temp_dir)
+        stage['items'] = len(matched)
+
+def get_scan_manifest(upload_type, uploads, previous, upload_hashes, metrics, session_id, progress=None):
+    """Return (manifest, reused): the scan of these uploads, reused when their content is unchanged
+
+    A ZIP scan is immutable and comes from the process-wide artefact cache.
+    """
+    if progress is not None:
+        progress.set_stage('hash_upload', files_total=len(uploads), bytes_total=sum(u.size for u in uploads))
+    with metrics.stage('hash_upload') as stage:
+        # Only uploads not hashed before in this session are read
+        stage['bytes'] = sum(upload.getbuffer().nbytes for upload in uploads if upload.file_id not in upload_hashes)
+        key = upload_content_key(uploads, upload_hashes, progress)
+        stage['items'] = len(uploads)
+    
+    if previous and previous['key'] == key and previous['upload_type'] == upload_type:
+        # Spilled uploads may have been evicted or cleaned up meanwhile
+        if previous['temp_dir'] is None or workspace_manager.exists(previous['temp_dir']):
+            return previous, True
+    
+    scanned = []
+    
+    def scan():
+        manifest = scan_uploads(upload_type, uploads, metrics, session_id, progress)
+        manifest['key'] = key
+        manifest['upload_type'] = upload_type
+        scanned.append(manifest)
+        return manifest
+    
+    if upload_type == "File ZIP Arsip":
+        # Nothing of a ZIP scan belongs to the session: sessions uploading the same ZIP share it
+        manifest = artefact_cache.get(('scan', key), scan, size_of=estimate_size)
+        return manifest, not scanned
+    # Loose uploads are spilled into this session's workspace, their scan is not shared
+    return scan(), False
+
+def open_reference(excel_file, reference_column, catalog_register=None, catalog_save_name=None):
+    """Reference index plus a small descriptor of it (name, column, count, version)
+
+    The index comes from a catalog register, from an uploaded Excel imported
+    into the catalog under catalog_save_name, or from the uploaded Excel
+    alone. Only the descriptor is kept in the session. Returns (None, None)
+    if the register or the column does not exist.
+    """
+    if not catalog_register and not catalog_save_name:
+        # Shared by every session that uploads the same register
+        reference_index = load_reference_index(excel_file, reference_column)
+        if reference_index is None:
+            return None, None
+        return reference_index, {
+            'name': excel_file.name,
+            'column': reference_column,
+            'count': len(reference_index['keys']),
+            'version': None,
+        }
+    
+    if catalog_register:
+        reference_index = open_register(catalog_register)
+        register = reference_index.register if reference_index is not None else None
+    else:
+        register = import_register(excel_file, reference_column, catalog_save_name.strip())
+        reference_index = register_index(register) if register is not None else None
+    if register is None:
+        return None, None
+    return reference_index, {
+        'name': register['name'],
+        'column': register['column_name'],
+        'count': register['row_count'],
+        'version': register['content_hash'][:12],
+    }
+
+def run_validation_job(job, upload_type, uploads, excel_file, reference_column, match_mode,
+                       patterns, previous_manifest, upload_hashes, session_id, catalog_register=None,
+                       catalog_save_name=None):
+    """Background validation: scan, read the reference column, match
+
+    Runs on the job pool, so it must not call Streamlit; the result dict is
+    applied to the session and rendered by the script once the job is done.
+    """
+    metrics = JobMetrics('validation', job_id=job.id, upload_type=upload_type, match_mode=match_mode)
+    metrics.fields['status'] = 'failed'
+    try:
+        # Step 1: Scan files (reused if the same upload was already scanned)
+        manifest, reused = get_scan_manifest(upload_type, uploads, previous_manifest, upload_hashes, metrics,
+                                             session_id, job)
+        result = {
+            'status': 'ok',
+            'upload_type': upload_type,
+            'manifest': manifest,
+            'files': manifest['files'],
+            'reused': reused,
+            'source_zip': uploads[0] if upload_type == "File ZIP Arsip" else None,
+        }
+        if not len(manifest['files']):
+            result['status'] = 'empty_zip' if upload_type == "File ZIP Arsip" else 'no_files'
+            return result
         
-        for filename in filenames:
-            # Skip hidden files, system files, and macOS metadata
-            if (not filename.startswith('.') and 
-                not filename.startswith('__') and
-                filename != '.DS_Store' and
-                not root.endswith('__MACOSX')):
-                file_path = os.path.join(root, filename)
-                # Double check it's actually a file
-                if os.path.isfile(file_path):
-                    files.append(file_path)
-    return files
-
-def extract_code_from_filename(filename):
-    """Extract code from filename (e.g., '0336' from 'file_pelanggan_0336')"""
-    # Remove extension
-    name_without_ext = os.path.splitext(filename)[0]
-    
-    # Try to find numeric code patterns
-    import re
-    
-    # Pattern 1: Numbers at the end (e.g., file_pelanggan_0336 -> 0336)
-    match = re.search(r'_(\d+)$', name_without_ext)
-    if match:
-        return match.group(1)
-    
-    # Pattern 2: Numbers at the beginning (e.g., 0336_document -> 0336)
-    match = re.search(r'^(\d+)', name_without_ext)
-    if match:
-        return match.group(1)
-    
-    # Pattern 3: Any sequence of digits (fallback)
-    match = re.search(r'(\d+)', name_without_ext)
-    if match:
-        return match.group(1)
-    
-    # If no code found, return the whole name
-    return name_without_ext
-
-def match_files_with_reference(file_list, reference_values):
-    """Match filenames with reference values using prefix-based matching"""
-    matched = []
-    unmatched = []
-    rename_map = {}
-    
-    # Get base filenames without extension
-    for file_path in file_list:
-        filename = os.path.basename(file_path)
-        file_extension = os.path.splitext(filename)[1]
+        # Step 2 & 3: Reference index from the catalog, or only the reference column of the Excel
+        job.set_stage('read_reference', files_total=1, bytes_total=0)
+        with metrics.stage('read_reference') as stage:
+            reference_index, reference = open_reference(excel_file, reference_column, catalog_register, catalog_save_name)
+            stage['bytes'] = excel_file.size if excel_file is not None else 0
+            stage['items'] = reference['count'] if reference is not None else 0
+        if reference is None and catalog_register:
+            result['status'] = 'missing_register'
+            result['register'] = catalog_register
+            return result
+        if reference is None:
+            result['status'] = 'missing_column'
+            result['reference_column'] = reference_column
+            result['headers'] = read_excel_headers(excel_file)
+            return result
         
-        # Extract code from filename
-        file_code = extract_code_from_filename(filename)
+        # Step 4: Match files
+        with metrics.stage('match') as stage:
+            matched, unmatched, rename_map, ambiguous, codes = match_files_with_reference(
+                manifest['files'].file_keys(), None, mode=match_mode, index=reference_index,
+                patterns=patterns, progress=job
+            )
+            stage['items'] = len(manifest['files'])
+        
+        # Step 5: Closest references for unmatched files ("mungkin maksudnya")
+        job.set_stage('suggest', files_total=len(unmatched), bytes_total=0)
+        with metrics.stage('suggest') as stage:
+            suggestions = suggest_for_unmatched(unmatched, codes, reference_index)
+            stage['items'] = len(unmatched)
+        # The lists and dicts above only live in this job, the session keeps the manifest
+        result.update({
+            'reference': reference,
+            'files': manifest['files'].with_matches(codes, rename_map, ambiguous, suggestions),
+        })
+        
+        # Step 6: Only the matched loose uploads are written to disk, for the output build
+        if manifest['temp_dir'] is not None:
+            spill_matched_uploads(result['files'], uploads, manifest['temp_dir'], metrics, job)
         
-        # Check if code matches any reference value (prefix matching)
-        match_found = False
-        for ref_val in reference_values:
-            ref_str = str(ref_val).strip()
+        metrics.fields['status'] = 'ok'
+        return result
+    except JobCancelled:
+        metrics.fields['status'] = 'cancelled'
+        raise
+    finally:
+        job.metrics = metrics.log()
+
+def run_rename_job(job, files, source_zip, source_dir, previous_output_dir, part_size, session_id):
+    """Background output build: renamed ZIP part(s) and the unmatched report
+
+    files is the validated FileManifest, source_zip the ZIP or TAR upload,
+    source_dir the workspace of spilled uploads (None for an archive). A
+    TAR is streamed into the output in one pass. The output goes to a new
+    workspace of the session. Runs on the job pool, so it must not call
+    Streamlit. A cancelled job removes its partial output.
+    """
+    rename_mapping = files.rename_mapping()
+    unmatched_files = files.file_keys(files.unmatched())
+    source_tar = source_zip if source_zip is not None and is_tar_archive(source_zip) else None
+    # Sizes of spilled uploads and TAR members are already known from the scan
+    file_sizes = files.file_sizes() if source_zip is None or source_tar is not None else None
+    metrics = JobMetrics('rename', job_id=job.id, files=len(rename_mapping))
+    metrics.fields['status'] = 'failed'
+    
+    # Output is written to disk, previous results are replaced
+    if previous_output_dir:
+        workspace_manager.release(previous_output_dir)
+    # Renamed files take at most the size of their sources
+    output_dir = workspace_manager.create(session_id, 'output', reserve_bytes=files.total_size(files.matched()))
+    try:
+        # Neither the uploads being read nor the output being written may be evicted meanwhile
+        with workspace_manager.busy(source_dir), workspace_manager.busy(output_dir):
+            if source_dir is not None and not workspace_manager.exists(source_dir):
+                raise FileNotFoundError("File upload sudah dihapus dari server (terlalu lama tidak dipakai), validasi ulang ya")
             
-            # Method 1: Check if reference starts with the file code
-            # Example: file code "0336" matches "0336-PT. CONTAINER MARITIME ACTIVITIES"
-            if ref_str.startswith(file_code):
-                matched.append(file_path)
-                # Create new filename: reference value + original extension
-                new_filename = ref_str + file_extension
-                rename_map[file_path] = new_filename
-                match_found = True
-                break
+            if source_tar is not None:
+                # Matched members stream straight into the output, duplicates are resolved on the way
+                with metrics.stage('build_zip') as stage:
+                    output_parts, output_mapping, duplicates = create_zip_from_tar(
+                        rename_mapping,
+                        output_dir,
+                        source_tar,
+                        part_size=part_size,
+                        progress=job,
+                        file_sizes=file_sizes
+                    )
+                    stage['items'] = len(output_mapping)
+                    stage['bytes'] = sum(os.path.getsize(p) for p in output_parts)
+            else:
+                # Files with the same new name: identical copies are stored once
+                with metrics.stage('dedupe') as stage:
+                    output_mapping, duplicates = resolve_duplicates(
+                        rename_mapping,  # This already has old_path -> new_name
+                        source_zip=source_zip,
+                        file_sizes=file_sizes,
+                        progress=job
+                    )
+                    stage['items'] = len(duplicates)
+                
+                # Create ZIP for renamed files using the deduplicated mapping
+                with metrics.stage('build_zip') as stage:
+                    output_parts = create_zip_from_files(
+                        output_mapping,
+                        output_dir,
+                        source_zip=source_zip,
+                        part_size=part_size,
+                        progress=job,
+                        file_sizes=file_sizes
+                    )
+                    stage['items'] = len(output_mapping)
+                    stage['bytes'] = sum(os.path.getsize(p) for p in output_parts)
+            
+            # Create Excel report for unmatched and duplicate files
+            report_path = None
+            if unmatched_files or duplicates:
+                job.set_stage('unmatched_report', files_total=len(unmatched_files) + len(duplicates), bytes_total=0)
+                with metrics.stage('unmatched_report') as stage:
+                    report_path = create_unmatched_report(
+                        unmatched_files,
+                        os.path.join(output_dir, REPORT_FILE_NAME),
+                        duplicates=duplicates,
+                        suggestions=files.unmatched_suggestions()
+                    )
+                    stage['items'] = len(unmatched_files) + len(duplicates)
+                    stage['bytes'] = os.path.getsize(report_path)
+        workspace_manager.record_size(output_dir)
+        metrics.fields['status'] = 'ok'
+        return {
+            'output_dir': output_dir,
+            'output_parts': output_parts,
+            'report_path': report_path,
+            'files': files.with_output(output_mapping),
+            'duplicates': duplicates,
+        }
+    except BaseException as e:
+        workspace_manager.release(output_dir)
+        if isinstance(e, JobCancelled):
+            metrics.fields['status'] = 'cancelled'
+        raise
+    finally:
+        job.metrics = metrics.log()
+
+def run_batch_job(job, zip_uploads, excel_file, reference_column, match_mode, patterns, max_workers,
+                  previous_output_dir, session_id, catalog_register=None):
+    """Background multi-archive run: one output ZIP and report per uploaded ZIP
+
+    The reference column is read and indexed once for all archives. Runs on
+    the job pool, so it must not call Streamlit.
+    """
+    metrics = JobMetrics('batch', job_id=job.id, archives=len(zip_uploads), match_mode=match_mode)
+    metrics.fields['status'] = 'failed'
+    
+    if previous_output_dir:
+        workspace_manager.release(previous_output_dir)
+    # Outputs take at most the size of the uploaded archives
+    output_dir = workspace_manager.create(session_id, 'batch', reserve_bytes=sum(upload.size for upload in zip_uploads))
+    try:
+        job.set_stage('read_reference', files_total=1, bytes_total=0)
+        with metrics.stage('read_reference') as stage:
+            reference_index, reference = open_reference(excel_file, reference_column, catalog_register)
+            stage['bytes'] = excel_file.size if excel_file is not None else 0
+            stage['items'] = reference['count'] if reference is not None else 0
+        if reference is None:
+            workspace_manager.release(output_dir)
+            if catalog_register:
+                return {'status': 'missing_register', 'register': catalog_register}
+            return {
+                'status': 'missing_column',
+                'reference_column': reference_column,
+                'headers': read_excel_headers(excel_file),
+            }
         
-        if not match_found:
-            unmatched.append(file_path)
-    
-    return matched, unmatched, rename_map
-
-def create_zip_from_files(file_mapping, original_dir):
-    """Create ZIP file from renamed files"""
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for old_path, new_name in file_mapping.items():
-            # Write file with NEW name (not old path basename)
-            # old_path = full path to original file
-            # new_name = the new filename we want
-            zip_file.write(old_path, arcname=new_name)
-    zip_buffer.seek(0)
-    return zip_buffer
-
-def create_unmatched_report(unmatched_files):
-    """Create Excel report for unmatched files"""
-    data = {
-        'Nama File Tidak Cocok': [os.path.basename(f) for f in unmatched_files],
-        'Path Lengkap': unmatched_files,
-        'Status': ['Tidak Ditemukan di Referensi'] * len(unmatched_files)
-    }
-    df = pd.DataFrame(data)
+        with metrics.stage('batch') as stage, workspace_manager.busy(output_dir):
+            summaries = run_batch(
+                [(upload.name, upload) for upload in zip_uploads],
+                None,
+                output_dir,
+                mode=match_mode,
+                patterns=patterns,
+                max_workers=max_workers,
+                job=job,
+                reference_index=reference_index
+            )
+            stage['items'] = len(summaries)
+            stage['bytes'] = sum(upload.size for upload in zip_uploads)
+        workspace_manager.record_size(output_dir)
+        metrics.fields['status'] = 'ok'
+        return {
+            'status': 'ok',
+            'output_dir': output_dir,
+            'summaries': summaries,
+        }
+    except BaseException as e:
+        workspace_manager.release(output_dir)
+        if isinstance(e, JobCancelled):
+            metrics.fields['status'] = 'cancelled'
+        raise
+    finally:
+        job.metrics = metrics.log()
+
+def apply_validation_result(result):
+    """Store a finished validation in the session"""
+    st.session_state.validation_result = result
+    manifest = result['manifest']
+    
+    # A different upload replaces the previous scan and its spilled files
+    previous = st.session_state.scan_manifest
+    if previous and previous is not manifest and previous['temp_dir']:
+        workspace_manager.release(previous['temp_dir'])
+    if manifest['temp_dir']:
+        # The job may have been started by an earlier connection of this browser
+        workspace_manager.adopt(manifest['temp_dir'], st.session_state.session_id)
+    st.session_state.scan_manifest = manifest
+    st.session_state.temp_dir = manifest['temp_dir']
+    st.session_state.source_zip = result['source_zip']
+    
+    if result['status'] != 'ok':
+        st.session_state.validated = False
+        return
     
-    excel_buffer = BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Arsip Tidak Cocok', index=False)
-    excel_buffer.seek(0)
-    return excel_buffer
+    # Store in session state
+    st.session_state.file_manifest = result['files']
+    st.session_state.reference_data = result['reference']
+    st.session_state.validated = True
+    st.session_state.show_download_section = False
+
+def render_validation_result(result):
+    """Render the outcome of a validation (summary, tables or what went wrong)"""
+    manifest = result['manifest']
+    files = result['files']
+    if result['reused']:
+        st.caption("♻️ Arsip sama dengan validasi sebelumnya, hasil scan dipakai ulang")
+    
+    if result['status'] == 'empty_zip':
+        st.error("❌ **ZIP kosong atau tidak ada file yang valid!**")
+        st.warning("🔍 **Kemungkinan penyebab:**")
+        st.markdown("""
+        - ZIP kosong (tidak ada file)
+        - Semua file adalah hidden files (diawali titik)
+        - File berada dalam folder `__MACOSX` (metadata macOS)
+        - Coba extract manual dulu untuk mengecek isi ZIP
+        """)
+        
+        # Debug info: all_items lists every entry in the ZIP
+        if manifest['all_items']:
+            with st.expander("🐛 Debug: Lihat semua item yang di-extract (termasuk hidden files)"):
+                st.code('\n'.join([os.path.basename(item) for item in manifest['all_items']]))
+        return
+    
+    if result['status'] == 'no_files':
+        st.error("❌ **Tidak ada file arsip yang valid!**")
+        return
+    
+    if result['upload_type'] == "File ZIP Arsip":
+        # Show extracted files info
+        st.info(f"📦 **ZIP berhasil di-extract!** Ditemukan {len(files)} file")
+        with st.expander("📂 Lihat file hasil extract dari ZIP"):
+            extracted_df = files.frame({'name': 'Nama File', 'path': 'Lokasi', 'size': 'Ukuran'})
+            extracted_df['Ukuran'] = (extracted_df['Ukuran'] / 1024).map("{:.2f} KB".format)
+            st.dataframe(extracted_df, use_container_width=True)
+    else:
+        st.info(f"📁 **File berhasil diupload!** Total {len(files)} file")
+    
+    if result['status'] == 'missing_column':
+        st.error(f"❌ Kolom '{result['reference_column']}' tidak ditemukan dalam file Excel!")
+        st.info(f"📋 Kolom yang tersedia: {', '.join(result['headers'])}")
+        return
+    
+    if result['status'] == 'missing_register':
+        st.error(f"❌ Register '{result['register']}' tidak ada di katalog referensi!")
+        return
+    
+    matched_count = files.count(files.matched())
+    unmatched_count = files.count(files.unmatched())
+    ambiguous_count = files.count(files.ambiguous())
+    
+    # Display results
+    st.success("✅ **Validasi Berhasil!**")
+    reference = result['reference']
+    if reference['version']:
+        st.caption(f"📚 Referensi dari katalog: **{reference['name']}** versi `{reference['version']}` "
+                   f"(kolom {reference['column']}, {reference['count']} data)")
+    
+    st.markdown("---")
+    st.markdown("### 📊 Ringkasan Validasi Arsip")
+    
+    col_a, col_b, col_c = st.columns(3)
+    
+    with col_a:
+        st.metric(
+            label="Total Arsip",
+            value=len(files),
+            delta=None
+        )
+    
+    with col_b:
+        st.metric(
+            label="Arsip Cocok",
+            value=matched_count,
+            delta=f"{(matched_count/len(files)*100):.1f}%" if len(files) else "0%",
+            delta_color="normal"
+        )
+    
+    with col_c:
+        st.metric(
+            label="Arsip Tidak Cocok",
+            value=unmatched_count,
+            delta=f"{(unmatched_count/len(files)*100):.1f}%" if len(files) else "0%",
+            delta_color="inverse"
+        )
+    
+    # Detail information
+    if matched_count:
+        with st.expander(f"✅ Lihat {matched_count} arsip yang cocok"):
+            matched_df = files.frame(
+                {'name': 'Nama File Asli', 'code': 'Kode Ekstrak', 'target': 'Akan Direname Jadi'},
+                files.matched()
+            )
+            st.dataframe(matched_df, use_container_width=True)
+    
+    if unmatched_count:
+        with st.expander(f"⚠️ Lihat {unmatched_count} arsip yang tidak cocok"):
+            st.caption("Kolom **Mungkin Maksudnya** berisi data referensi yang kodenya paling mirip, cek dulu sebelum ganti nama file")
+            unmatched_df = files.frame(
+                {'name': 'Nama File', 'code': 'Kode Ekstrak', 'suggestions': 'Mungkin Maksudnya'},
+                files.unmatched()
+            )
+            unmatched_df['Mungkin Maksudnya'] = [
+                format_suggestions((item['reference'], item['distance']) for item in items) or '-'
+                for items in unmatched_df['Mungkin Maksudnya']
+            ]
+            st.dataframe(unmatched_df.drop(columns='No'), use_container_width=True)
+    
+    if ambiguous_count:
+        with st.expander(f"🔀 Lihat {ambiguous_count} arsip dengan kode ambigu"):
+            st.caption("Kode file ini cocok ke lebih dari satu data referensi. "
+                       "Yang dipakai data sesuai mode pencocokan, cek lagi ya sebelum rename")
+            ambiguous_df = files.frame(
+                {'name': 'Nama File', 'code': 'Kode Ekstrak', 'candidates': 'Jumlah Kandidat', 'target': 'Dipakai'},
+                files.ambiguous()
+            )
+            st.dataframe(ambiguous_df.drop(columns='No'), use_container_width=True)
+    
+    st.info("✅ Data siap diproses. Lanjut ke tab **Preview & Proses Rename** ya")
+
+def apply_rename_result(result):
+    """Store a finished output build in the session"""
+    st.session_state.output_dir = result['output_dir']
+    workspace_manager.adopt(result['output_dir'], st.session_state.session_id)
+    st.session_state.output_parts = result['output_parts']
+    st.session_state.report_path = result['report_path']
+    st.session_state.file_manifest = result['files']
+    st.session_state.duplicate_files = result['duplicates']
+    
+    # Mark that download section should be shown
+    st.session_state.show_download_section = True
+
+def start_job(kind, job):
+    """Remember a submitted job in the session and in the URL (for reconnects)"""
+    st.session_state[f"{kind}_job_id"] = job.id
+    st.query_params[f"{kind}_job"] = job.id
+
+def submit_job(kind, function, **kwargs):
+    """Submit a background job and attach it to the session; None if the server turned it away"""
+    try:
+        job = job_manager.submit(kind, function, **kwargs)
+    except JobRejected as e:
+        st.error(f"🚦 {e}")
+        return None
+    start_job(kind, job)
+    return job
+
+def forget_job(kind):
+    """Detach the session from a job of this kind"""
+    st.session_state[f"{kind}_job_id"] = None
+    if f"{kind}_job" in st.query_params:
+        del st.query_params[f"{kind}_job"]
+
+def current_job(kind):
+    """Return the job of this kind attached to the session, if it still exists"""
+    job_id = st.session_state[f"{kind}_job_id"]
+    if job_id is None:
+        return None
+    job = job_manager.get(job_id)
+    if job is None:
+        forget_job(kind)
+    return job
+
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id, label):
+    """Live progress of a background job, refreshed every second, with a cancel button"""
+    job = job_manager.get(job_id)
+    if job is None or job.finished:
+        # Rerun the whole script so the result gets applied
+        st.rerun()
+        return
+    
+    progress = job.snapshot()
+    details = [f"tahap: {progress['stage'] or 'antri'}"]
+    if progress['files_total']:
+        details.append(f"{progress['files_done']}/{progress['files_total']} file")
+    if progress['bytes_total']:
+        details.append(f"{progress['bytes_done'] / (1024 * 1024):.1f}/{progress['bytes_total'] / (1024 * 1024):.1f} MB")
+    st.progress(job.fraction(), text=f"⏳ {label} ({', '.join(details)})")
+    st.caption(f"Job ID: {job.id} - aman kalau halaman di-refresh, proses tetap jalan di server")
+    if job.cancel_requested:
+        st.caption("⛔ Lagi dibatalkan...")
+    elif st.button("⛔ Batalkan Proses", key=f"cancel_{job.id}"):
+        job_manager.cancel(job.id)
+
+def show_job_metrics(summary, title):
+    """Render per-stage timing and memory of a job in an expander"""
+    if not summary:
+        return
+    to_mb = lambda value: round(value / (1024 * 1024), 2) if value is not None else None
+    with st.expander(f"⏱️ {title} - {summary['total_seconds']:.2f} detik"):
+        metrics_df = pd.DataFrame({
+            'Tahap': [stage['stage'] for stage in summary['stages']],
+            'Waktu (detik)': [stage['seconds'] for stage in summary['stages']],
+            'Data (MB)': [to_mb(stage['bytes']) for stage in summary['stages']],
+            'Jumlah Item': [stage['items'] for stage in summary['stages']],
+            'Peak RSS Tahap (MB)': [to_mb(stage['peak_rss_bytes']) for stage in summary['stages']],
+        })
+        st.dataframe(metrics_df, use_container_width=True)
+        process_peak = to_mb(summary.get('process_peak_rss_bytes'))
+        st.caption(
+            f"Job ID: {summary['job_id']} - status: {summary.get('status', '-')}"
+            + (f" - peak RSS proses sejak start: {process_peak} MB" if process_peak is not None else "")
+        )
+
+def open_output_file(path):
+    """Return a callable that reads an output file only when its download is clicked
+
+    Streamlit keeps the bytes of a clicked download in memory, so a whole
+    output part is resident while it is served: the part size ("Pecah ZIP
+    per ukuran") is what bounds that memory.
+    """
+    def read():
+        with open(path, 'rb') as f:
+            return f.read()
+    return read
 
 # ============================================================================
 # TAB STRUCTURE
 # ============================================================================
 
-tab1, tab2 = st.tabs(["📋 Upload & Validasi Arsip", "✅ Preview & Proses Rename"])
+tab1, tab2, tab3 = st.tabs(["📋 Upload & Validasi Arsip", "✅ Preview & Proses Rename", "📚 Batch Multi-Arsip"])
 
 # ============================================================================
 # TAB 1: UPLOAD & VALIDASI ARSIP
@@ -298,10 +909,10 @@ with tab1:
         
         if upload_type == "File ZIP Arsip":
             zip_file = st.file_uploader(
-                "Upload file ZIP yang berisi arsip",
-                type=['zip'],
+                "Upload file ZIP / TAR / TAR.GZ yang berisi arsip",
+                type=ARCHIVE_UPLOAD_TYPES,
                 key="zip_uploader",
-                help="Hanya file ZIP yang bisa diupload di sini"
+                help="File ZIP, atau TAR / TAR.GZ / TAR.BZ2 / TAR.XZ langsung dari vendor scan (tidak perlu dijadikan ZIP dulu)"
             )
         else:
             uploaded_files = st.file_uploader(
@@ -321,17 +932,68 @@ with tab1:
     
     with col2:
         st.markdown("#### 2️⃣ Upload File Referensi Excel")
-        excel_file = st.file_uploader(
-            "Upload file Excel referensi penamaan",
-            type=['xlsx', 'xls'],
-            key="excel_uploader"
+        catalog_registers = list_registers()
+        reference_source = st.radio(
+            "Sumber referensi:",
+            ["Upload File Excel", "Katalog Referensi"],
+            key="reference_source",
+            horizontal=True,
+            help="Katalog = register Excel yang sudah pernah disimpan, tidak perlu upload dan baca ulang"
         )
         
-        reference_column = st.text_input(
-            "Nama Kolom Referensi Arsip",
-            placeholder="Contoh: Nomor_Arsip, Kode_Dokumen, dll",
-            key="ref_column"
+        excel_file = None
+        reference_column = None
+        catalog_register = None
+        catalog_save_name = None
+        if reference_source == "Katalog Referensi":
+            if catalog_registers:
+                catalog_register = st.selectbox(
+                    "Pilih register referensi",
+                    options=[register['name'] for register in catalog_registers],
+                    format_func=lambda name: next(
+                        f"{name} ({register['row_count']} data, kolom {register['column_name']})"
+                        for register in catalog_registers if register['name'] == name
+                    ),
+                    key="catalog_register"
+                )
+            else:
+                st.info("📚 Katalog masih kosong. Upload file Excel dulu dan isi nama register untuk menyimpannya")
+        else:
+            excel_file = st.file_uploader(
+                "Upload file Excel referensi penamaan",
+                type=['xlsx', 'xls'],
+                key="excel_uploader"
+            )
+            
+            reference_column = st.text_input(
+                "Nama Kolom Referensi Arsip",
+                placeholder="Contoh: Nomor_Arsip, Kode_Dokumen, dll",
+                key="ref_column"
+            )
+            
+            catalog_save_name = st.text_input(
+                "Simpan ke katalog dengan nama (opsional)",
+                placeholder="Contoh: Register Arsip 2024",
+                key="catalog_save_name",
+                help="Register disimpan sekali (per isi file), validasi berikutnya bisa pilih dari katalog"
+            )
+        
+        match_mode = st.selectbox(
+            "Mode Pencocokan Kode",
+            options=list(MATCH_MODES.keys()),
+            format_func=MATCH_MODES.get,
+            key="match_mode",
+            help="Pertama cocok = data pertama di Excel yang diawali kode file. "
+                 "Prefix terpanjang = kode Excel terpanjang yang jadi awalan kode file. "
+                 "Kode persis sama = kode di awal data Excel harus sama persis."
         )
+        
+        with st.expander("⚙️ Pola Kode di Nama File (lanjutan)"):
+            code_patterns_text = st.text_area(
+                "Satu regex per baris, dicoba berurutan. Grup pertama = kode",
+                value="\n".join(DEFAULT_CODE_PATTERNS),
+                key="code_patterns"
+            )
     
     st.markdown("---")
     
@@ -342,6 +1004,8 @@ with tab1:
         
         if upload_type == "File ZIP Arsip" and not zip_file:
             errors.append("File ZIP arsip belum diupload")
+        elif upload_type == "File ZIP Arsip" and not (zip_file.name.lower().endswith('.zip') or is_tar_archive(zip_file)):
+            errors.append(f"{zip_file.name} bukan ZIP, TAR atau TAR.GZ")
         elif upload_type == "Folder Arsip (Multiple Files)":
             if not uploaded_files:
                 errors.append("File arsip belum diupload")
@@ -351,153 +1015,66 @@ with tab1:
                 if zip_files_found:
                     errors.append(f"File ZIP tidak bisa diupload di opsi Multiple Files! Gunakan opsi 'File ZIP Arsip' untuk: {', '.join(zip_files_found)}")
         
-        if not excel_file:
-            errors.append("File Excel referensi belum diupload")
+        if reference_source == "Katalog Referensi":
+            if not catalog_register:
+                errors.append("Register referensi dari katalog belum dipilih")
+        else:
+            if not excel_file:
+                errors.append("File Excel referensi belum diupload")
+            
+            if not reference_column or reference_column.strip() == "":
+                errors.append("Nama kolom referensi belum diisi")
         
-        if not reference_column or reference_column.strip() == "":
-            errors.append("Nama kolom referensi belum diisi")
+        code_patterns = [line for line in code_patterns_text.splitlines() if line.strip()]
+        try:
+            compiled_patterns = compile_code_patterns(code_patterns or None)
+        except re.error as e:
+            errors.append(f"Pola kode tidak valid: {e}")
         
         if errors:
             st.error("❌ **Validasi Gagal**")
             for error in errors:
                 st.markdown(f"- {error}")
         else:
-            with st.spinner("Memproses validasi data..."):
-                try:
-                    # Step 1: Extract files
-                    if upload_type == "File ZIP Arsip":
-                        temp_dir = extract_zip(zip_file)
-                        file_list = get_files_from_directory(temp_dir)
-                        
-                        if len(file_list) == 0:
-                            st.error("❌ **ZIP kosong atau tidak ada file yang valid!**")
-                            st.warning("🔍 **Kemungkinan penyebab:**")
-                            st.markdown("""
-                            - ZIP kosong (tidak ada file)
-                            - Semua file adalah hidden files (diawali titik)
-                            - File berada dalam folder `__MACOSX` (metadata macOS)
-                            - Coba extract manual dulu untuk mengecek isi ZIP
-                            """)
-                            
-                            # Debug info: show what's in temp_dir
-                            all_items = []
-                            for root, dirs, files in os.walk(temp_dir):
-                                for f in files:
-                                    all_items.append(os.path.join(root, f))
-                            
-                            if all_items:
-                                with st.expander("🐛 Debug: Lihat semua item yang di-extract (termasuk hidden files)"):
-                                    st.code('\n'.join([os.path.basename(item) for item in all_items]))
-                            
-                            st.session_state.validated = False
-                            continue_validation = False
-                        else:
-                            # Show extracted files info
-                            st.info(f"📦 **ZIP berhasil di-extract!** Ditemukan {len(file_list)} file")
-                            with st.expander("📂 Lihat file hasil extract dari ZIP"):
-                                extracted_df = pd.DataFrame({
-                                    'No': list(range(1, len(file_list) + 1)),
-                                    'Nama File': [os.path.basename(f) for f in file_list],
-                                    'Lokasi': [os.path.relpath(f, temp_dir) for f in file_list],
-                                    'Ukuran': [f"{os.path.getsize(f) / 1024:.2f} KB" for f in file_list]
-                                })
-                                st.dataframe(extracted_df, use_container_width=True)
-                            continue_validation = True
-                    else:
-                        temp_dir = tempfile.mkdtemp()
-                        file_list = []
-                        for uploaded_file in uploaded_files:
-                            file_path = os.path.join(temp_dir, uploaded_file.name)
-                            with open(file_path, 'wb') as f:
-                                f.write(uploaded_file.getbuffer())
-                            file_list.append(file_path)
-                        
-                        st.info(f"📁 **File berhasil diupload!** Total {len(file_list)} file")
-                        continue_validation = True
-                    
-                    st.session_state.temp_dir = temp_dir
-                    
-                    if not continue_validation:
-                        pass  # Stop here, error already shown
-                    else:
-                        # Step 2: Read Excel and validate column
-                        df = pd.read_excel(excel_file)
-                        
-                        if reference_column not in df.columns:
-                            st.error(f"❌ Kolom '{reference_column}' tidak ditemukan dalam file Excel!")
-                            st.info(f"📋 Kolom yang tersedia: {', '.join(df.columns.tolist())}")
-                            st.session_state.validated = False
-                        else:
-                            # Step 3: Get reference values
-                            reference_values = df[reference_column].dropna().astype(str).tolist()
-                            
-                            # Step 4: Match files
-                            matched, unmatched, rename_map = match_files_with_reference(
-                                file_list, reference_values
-                            )
-                            
-                            # Store in session state
-                            st.session_state.file_list = file_list
-                            st.session_state.reference_data = df
-                            st.session_state.matched_files = matched
-                            st.session_state.unmatched_files = unmatched
-                            st.session_state.rename_mapping = rename_map
-                            st.session_state.validated = True
-                            
-                            # Display results
-                            st.success("✅ **Validasi Berhasil!**")
-                            
-                            st.markdown("---")
-                            st.markdown("### 📊 Ringkasan Validasi Arsip")
-                            
-                            col_a, col_b, col_c = st.columns(3)
-                            
-                            with col_a:
-                                st.metric(
-                                    label="Total Arsip",
-                                    value=len(file_list),
-                                    delta=None
-                                )
-                            
-                            with col_b:
-                                st.metric(
-                                    label="Arsip Cocok",
-                                    value=len(matched),
-                                    delta=f"{(len(matched)/len(file_list)*100):.1f}%" if file_list else "0%",
-                                    delta_color="normal"
-                                )
-                            
-                            with col_c:
-                                st.metric(
-                                    label="Arsip Tidak Cocok",
-                                    value=len(unmatched),
-                                    delta=f"{(len(unmatched)/len(file_list)*100):.1f}%" if file_list else "0%",
-                                    delta_color="inverse"
-                                )
-                            
-                            # Detail information
-                            if matched:
-                                with st.expander(f"✅ Lihat {len(matched)} arsip yang cocok"):
-                                    matched_df = pd.DataFrame({
-                                        'No': list(range(1, len(matched) + 1)),
-                                        'Nama File Asli': [os.path.basename(f) for f in matched],
-                                        'Kode Ekstrak': [extract_code_from_filename(os.path.basename(f)) for f in matched],
-                                        'Akan Direname Jadi': [rename_map[f] for f in matched]
-                                    })
-                                    st.dataframe(matched_df, use_container_width=True)
-                            
-                            if unmatched:
-                                with st.expander(f"⚠️ Lihat {len(unmatched)} arsip yang tidak cocok"):
-                                    unmatched_df = pd.DataFrame({
-                                        'Nama File': [os.path.basename(f) for f in unmatched]
-                                    })
-                                    st.dataframe(unmatched_df, use_container_width=True)
-                            
-                            st.info("✅ Data siap diproses. Lanjut ke tab **Preview & Proses Rename** ya")
-                
-                except Exception as e:
-                    st.error(f"❌ Terjadi kesalahan: {str(e)}")
-                    st.session_state.validated = False
+            # Validation runs as a background job; progress is shown below
+            st.session_state.validation_result = None
+            forget_job('rename')
+            submit_job(
+                'validation',
+                run_validation_job,
+                upload_type=upload_type,
+                uploads=[zip_file] if upload_type == "File ZIP Arsip" else list(uploaded_files),
+                excel_file=excel_file,
+                reference_column=reference_column,
+                match_mode=match_mode,
+                patterns=compiled_patterns,
+                previous_manifest=st.session_state.scan_manifest,
+                upload_hashes=st.session_state.upload_hashes,
+                session_id=st.session_state.session_id,
+                catalog_register=catalog_register,
+                catalog_save_name=catalog_save_name.strip() if catalog_save_name else None
+            )
+    
+    validation_job = current_job('validation')
+    if validation_job is not None:
+        if not validation_job.finished:
+            show_job_progress(validation_job.id, "Memproses validasi data...")
+        elif validation_job.id not in st.session_state.applied_job_ids:
+            st.session_state.applied_job_ids.add(validation_job.id)
+            st.session_state.validation_metrics = getattr(validation_job, 'metrics', None)
+            if validation_job.status == 'done':
+                apply_validation_result(validation_job.result)
+            elif validation_job.status == 'cancelled':
+                st.session_state.validated = False
+                st.warning("⛔ Validasi dibatalkan")
+            else:
+                st.session_state.validated = False
+                st.error(f"❌ Terjadi kesalahan: {validation_job.error}")
+    
+    if st.session_state.validation_result is not None:
+        render_validation_result(st.session_state.validation_result)
+    
+    show_job_metrics(st.session_state.validation_metrics, "Detail Performa Validasi")
 
 # ============================================================================
 # TAB 2: PREVIEW & PROSES RENAME
@@ -512,99 +1089,162 @@ with tab2:
         st.info("📋 Upload file arsip sama file Excel referensi dulu, terus klik tombol **Validasi & Cek Arsip**")
     else:
         # Display summary
+        files = st.session_state.file_manifest
+        matched_count = files.count(files.matched())
+        unmatched_count = files.count(files.unmatched())
         st.markdown("### 📊 Ringkasan Proses Rename")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Arsip", len(st.session_state.file_list))
+            st.metric("Total Arsip", len(files))
         with col2:
-            st.metric("Akan Direname", len(st.session_state.matched_files))
+            st.metric("Akan Direname", matched_count)
         with col3:
-            st.metric("Tidak Cocok", len(st.session_state.unmatched_files))
+            st.metric("Tidak Cocok", unmatched_count)
         
         st.markdown("---")
         
         # Preview table
-        if st.session_state.matched_files:
+        if matched_count:
             st.markdown("### 👁️ Preview Penamaan Arsip")
             
-            preview_data = {
-                'No': list(range(1, len(st.session_state.matched_files) + 1)),
-                'Nama Arsip Lama': [os.path.basename(f) for f in st.session_state.matched_files],
-                'Nama Arsip Baru': [st.session_state.rename_mapping[f] for f in st.session_state.matched_files],
-                'Status': ['✅ Siap Rename'] * len(st.session_state.matched_files)
-            }
-            preview_df = pd.DataFrame(preview_data)
+            preview_df = files.frame(
+                {'name': 'Nama Arsip Lama', 'target': 'Nama Arsip Baru', 'candidates': 'Status'},
+                files.matched()
+            )
+            preview_df['Status'] = preview_df['Status'].map(
+                lambda candidates: '⚠️ Siap Rename (Kode Ambigu)' if candidates > 1 else '✅ Siap Rename'
+            )
             st.dataframe(preview_df, use_container_width=True)
             
             st.markdown("---")
             
+            part_size_mb = st.number_input(
+                "Pecah ZIP per ukuran (MB)",
+                min_value=0,
+                value=0,
+                step=100,
+                key="part_size_mb",
+                help="0 = semua file jadi satu ZIP. Isi misalnya 500 biar hasilnya dipecah jadi beberapa ZIP maksimal 500 MB"
+            )
+            
             # Rename button
+            source_dir = st.session_state.temp_dir
+            if source_dir and not workspace_manager.exists(source_dir):
+                st.warning("🗑️ File upload sudah dihapus dari server (terlalu lama tidak dipakai), validasi ulang di Tab 1 ya")
+            
             if st.button("🚀 Mulai Proses Rename Arsip", use_container_width=True, type="primary"):
-                with st.spinner("Memproses rename arsip..."):
-                    try:
-                        # Use the rename_mapping directly (already contains new names)
-                        # st.session_state.rename_mapping format:
-                        # {old_file_path: new_filename_with_extension}
-                        
-                        # Cache file contents for download buttons
-                        # This ensures downloads work even after Streamlit reruns
-                        if 'file_contents_cache' not in st.session_state:
-                            st.session_state.file_contents_cache = {}
-                        
-                        for old_path, new_name in st.session_state.rename_mapping.items():
-                            if new_name not in st.session_state.file_contents_cache:
-                                with open(old_path, 'rb') as f:
-                                    st.session_state.file_contents_cache[new_name] = f.read()
-                        
+                st.session_state.show_download_section = False
+                
+                # The output is built by a background job; progress is shown below
+                job = submit_job(
+                    'rename',
+                    run_rename_job,
+                    files=files,
+                    source_zip=st.session_state.source_zip,
+                    source_dir=st.session_state.temp_dir,
+                    previous_output_dir=st.session_state.output_dir,
+                    part_size=int(part_size_mb) * 1024 * 1024 or None,
+                    session_id=st.session_state.session_id
+                )
+                if job is not None:
+                    st.session_state.output_dir = None
+            
+            rename_job = current_job('rename')
+            if rename_job is not None:
+                if not rename_job.finished:
+                    show_job_progress(rename_job.id, "Memproses rename arsip...")
+                elif rename_job.id not in st.session_state.applied_job_ids:
+                    st.session_state.applied_job_ids.add(rename_job.id)
+                    st.session_state.rename_metrics = getattr(rename_job, 'metrics', None)
+                    if rename_job.status == 'done':
+                        apply_rename_result(rename_job.result)
                         st.success("✅ **Proses Rename Selesai!**")
                         st.balloons()
-                        
-                        # Download section
-                        st.markdown("---")
-                        st.markdown("### 📥 Download Hasil Rename")
-                        
-                        # Create two columns for download options
-                        download_col1, download_col2 = st.columns(2)
-                        
-                        with download_col1:
-                            st.markdown("#### 📦 Opsi 1: Download sebagai ZIP")
-                            st.info("Semua file jadi satu dalam ZIP")
-                            
-                            # Create ZIP for renamed files using the correct mapping
-                            zip_buffer = create_zip_from_files(
-                                st.session_state.rename_mapping,  # This already has old_path -> new_name
-                                st.session_state.temp_dir
-                            )
-                            
-                            st.download_button(
-                                label="📦 Download ZIP Arsip (Semua File)",
-                                data=zip_buffer,
-                                file_name="INDOARSIP_Arsip_Renamed.zip",
-                                mime="application/zip",
-                                use_container_width=True,
-                                type="primary"
-                            )
-                        
-                        with download_col2:
-                            st.markdown("#### 📄 Opsi 2: Download File Individual")
-                            st.info("Download satu-satu sesuai kebutuhan")
-                        
-                        # Mark that download section should be shown
-                        st.session_state.show_download_section = True
-                    
-                    except Exception as e:
-                        st.error(f"❌ Terjadi kesalahan saat proses rename: {str(e)}")
+                    elif rename_job.status == 'cancelled':
+                        st.warning("⛔ Proses rename dibatalkan, hasil sebagian sudah dihapus")
+                    else:
+                        st.error(f"❌ Terjadi kesalahan saat proses rename: {rename_job.error}")
+            
+            show_job_metrics(st.session_state.rename_metrics, "Detail Performa Rename")
+            
+            # Output evicted (disk quota) or cleaned up after being idle
+            output_dir = st.session_state.output_dir
+            if st.session_state.get('show_download_section', False) and output_dir and not workspace_manager.exists(output_dir):
+                st.warning("🗑️ Hasil rename sudah dihapus dari server (terlalu lama tidak dipakai), proses ulang ya")
+                st.session_state.show_download_section = False
             
             # Show download section if rename has been processed
             if st.session_state.get('show_download_section', False):
+                # Download section
+                st.markdown("---")
+                st.markdown("### 📥 Download Hasil Rename")
+                
+                # Create two columns for download options
+                download_col1, download_col2 = st.columns(2)
+                
+                with download_col1:
+                    st.markdown("#### 📦 Opsi 1: Download sebagai ZIP")
+                    output_parts = st.session_state.output_parts
+                    if len(output_parts) > 1:
+                        st.info(f"Hasil dipecah jadi {len(output_parts)} ZIP, download semuanya ya")
+                    else:
+                        st.info("Semua file jadi satu dalam ZIP")
+                    
+                    for part_number, part_path in enumerate(output_parts, 1):
+                        part_label = f" (Part {part_number}/{len(output_parts)})" if len(output_parts) > 1 else " (Semua File)"
+                        st.download_button(
+                            label=f"📦 Download ZIP Arsip{part_label} - {os.path.getsize(part_path) / (1024 * 1024):.1f} MB",
+                            data=open_output_file(part_path),
+                            file_name=os.path.basename(part_path),
+                            mime="application/zip",
+                            key=f"download_zip_part_{part_number}",
+                            use_container_width=True,
+                            type="primary"
+                        )
+                
+                with download_col2:
+                    st.markdown("#### 📄 Opsi 2: Download File Individual")
+                    st.info("Download satu-satu sesuai kebutuhan")
+                
                 # Show individual file download list
                 st.markdown("---")
                 st.markdown("### 📋 Daftar File yang Bisa Didownload")
-                st.caption(f"Total ada {len(st.session_state.matched_files)} file")
+                # Output names were added to the manifest by the rename job
+                files = st.session_state.file_manifest
+                written = files.search_output('')
+                st.caption(f"Total ada {len(written)} file")
+                
+                col_search, col_page_size, col_page = st.columns([3, 1, 1])
+                with col_search:
+                    search_query = st.text_input(
+                        "🔎 Cari file",
+                        placeholder="Ketik sebagian nama baru atau nama asli",
+                        key="download_search"
+                    )
+                with col_page_size:
+                    page_size = st.selectbox("File per halaman", DOWNLOAD_PAGE_SIZES, key="download_page_size")
                 
-                # Create scrollable container for file list
-                for idx, (old_path, new_name) in enumerate(st.session_state.rename_mapping.items(), 1):
+                filtered_rows = files.search_output(search_query) if search_query.strip() else written
+                total_pages = max(1, (len(filtered_rows) + page_size - 1) // page_size)
+                # Keep the page valid when the search narrows the list
+                if st.session_state.get('download_page', 1) > total_pages:
+                    st.session_state.download_page = total_pages
+                with col_page:
+                    page = st.number_input("Halaman", min_value=1, max_value=total_pages, value=1, key="download_page")
+                
+                # Only the visible page is rendered (and read from the manifest), whatever the archive size
+                page_indices, total_pages = paginate(filtered_rows, int(page), page_size)
+                page_rows = files.rows(page_indices)
+                if search_query.strip():
+                    st.caption(f"Ketemu {len(filtered_rows)} file - halaman {int(page)} dari {total_pages}")
+                else:
+                    st.caption(f"Halaman {int(page)} dari {total_pages}")
+                
+                if not page_rows:
+                    st.info("Nggak ada file yang cocok sama pencarian")
+                
+                for row_number, (idx, old_path, new_name) in enumerate(page_rows, 1):
                     with st.container():
                         col_file, col_btn = st.columns([3, 1])
                         
@@ -613,45 +1253,54 @@ with tab2:
                             st.caption(f"Original: {os.path.basename(old_path)}")
                         
                         with col_btn:
-                            # Get file content from cache
-                            file_content = st.session_state.file_contents_cache.get(new_name)
-                            
-                            if file_content:
-                                st.download_button(
-                                    label="⬇️ Download",
-                                    data=file_content,
-                                    file_name=new_name,
-                                    mime="application/octet-stream",
-                                    key=f"download_individual_{idx}",
-                                    use_container_width=True
-                                )
-                            else:
-                                st.error("❌ File tidak tersedia")
+                            # Bytes are read only when the button is clicked
+                            st.download_button(
+                                label="⬇️ Download",
+                                data=read_renamed_file(
+                                    st.session_state.scan_manifest['key'], old_path, new_name,
+                                    st.session_state.source_zip, st.session_state.output_parts
+                                ),
+                                file_name=new_name,
+                                mime="application/octet-stream",
+                                key=f"download_individual_{idx}",
+                                use_container_width=True
+                            )
                     
-                    if idx < len(st.session_state.rename_mapping):
+                    if row_number < len(page_rows):
                         st.divider()
                 
+                cache_stats = file_cache.stats()
+                st.caption(
+                    f"💾 Cache download: {cache_stats['hits']} hit, {cache_stats['misses']} miss, "
+                    f"{cache_stats['evictions']} eviction - {cache_stats['bytes'] / (1024 * 1024):.1f} / "
+                    f"{cache_stats['max_bytes'] / (1024 * 1024):.0f} MB"
+                )
+                
                 # Excel report section (always available)
                 st.markdown("---")
                 st.markdown("### 📊 Laporan File Tidak Cocok")
                 
-                if st.session_state.unmatched_files:
+                duplicate_count = sum(1 for d in st.session_state.duplicate_files if d['same_as'])
+                collision_count = len(st.session_state.duplicate_files) - duplicate_count
+                if st.session_state.report_path:
                     col_report1, col_report2 = st.columns([2, 1])
                     
                     with col_report1:
-                        st.warning(f"⚠️ Ada **{len(st.session_state.unmatched_files)} file** yang nggak cocok sama data referensi")
-                        st.caption("File-file ini nggak akan direname dan udah dicatat di laporan Excel")
+                        if unmatched_count:
+                            st.warning(f"⚠️ Ada **{unmatched_count} file** yang nggak cocok sama data referensi")
+                            st.caption("File-file ini nggak akan direname dan udah dicatat di laporan Excel, lengkap dengan saran referensi yang paling mirip")
+                        if duplicate_count:
+                            st.info(f"♻️ **{duplicate_count} file** isinya sama persis dengan file lain ber-nama tujuan sama, cukup disimpan sekali")
+                        if collision_count:
+                            st.warning(f"⚠️ **{collision_count} file** beda isi tapi dapat nama yang sama, dikasih nomor (contoh: `_2`)")
+                        if st.session_state.duplicate_files:
+                            st.caption("Daftar duplikat ada di sheet **Arsip Duplikat** di laporan Excel")
                     
                     with col_report2:
-                        # Create Excel report for unmatched files
-                        excel_buffer = create_unmatched_report(
-                            st.session_state.unmatched_files
-                        )
-                        
                         st.download_button(
                             label="📄 Download Laporan Excel",
-                            data=excel_buffer,
-                            file_name="INDOARSIP_Laporan_Tidak_Cocok.xlsx",
+                            data=open_output_file(st.session_state.report_path),
+                            file_name=REPORT_FILE_NAME,
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                             use_container_width=True
                         )
@@ -660,11 +1309,214 @@ with tab2:
         else:
             st.warning("⚠️ Tidak ada arsip yang cocok untuk direname")
 
+# ============================================================================
+# TAB 3: BATCH MULTI-ARSIP
+# ============================================================================
+
+with tab3:
+    st.markdown("### Batch Rename Banyak Arsip Sekaligus")
+    st.info("ℹ️ Upload beberapa file ZIP sekaligus. Semua dicocokkan ke satu file Excel referensi, tiap ZIP dapat hasil rename dan laporan sendiri")
+    st.markdown("---")
+    
+    batch_col1, batch_col2 = st.columns(2)
+    
+    with batch_col1:
+        batch_zip_files = st.file_uploader(
+            "Upload file-file ZIP / TAR / TAR.GZ arsip",
+            type=ARCHIVE_UPLOAD_TYPES,
+            accept_multiple_files=True,
+            key="batch_zip_uploader"
+        )
+        batch_workers = st.number_input(
+            "Jumlah ZIP diproses bersamaan",
+            min_value=1,
+            max_value=max(1, BATCH_WORKERS),
+            value=max(1, min(2, BATCH_WORKERS)),
+            key="batch_workers",
+            help=f"Maksimal {BATCH_WORKERS} (sesuai jumlah CPU server)"
+        )
+    
+    with batch_col2:
+        batch_excel_file = None
+        batch_reference_column = None
+        batch_catalog_register = None
+        batch_registers = list_registers()
+        if batch_registers:
+            batch_catalog_register = st.selectbox(
+                "Register referensi dari katalog",
+                options=[None] + [register['name'] for register in batch_registers],
+                format_func=lambda name: "— Upload file Excel —" if name is None else name,
+                key="batch_catalog_register"
+            )
+        if batch_catalog_register is None:
+            batch_excel_file = st.file_uploader(
+                "Upload file Excel referensi penamaan",
+                type=['xlsx', 'xls'],
+                key="batch_excel_uploader"
+            )
+            batch_reference_column = st.text_input(
+                "Nama Kolom Referensi Arsip",
+                placeholder="Contoh: Nomor_Arsip, Kode_Dokumen, dll",
+                key="batch_ref_column"
+            )
+        batch_match_mode = st.selectbox(
+            "Mode Pencocokan Kode",
+            options=list(MATCH_MODES.keys()),
+            format_func=MATCH_MODES.get,
+            key="batch_match_mode"
+        )
+    
+    if st.button("🚀 Proses Semua Arsip", use_container_width=True, type="primary", key="batch_start"):
+        errors = []
+        if not batch_zip_files:
+            errors.append("File ZIP arsip belum diupload")
+        else:
+            not_archives = [f.name for f in batch_zip_files if not (f.name.lower().endswith('.zip') or is_tar_archive(f))]
+            if not_archives:
+                errors.append(f"Bukan ZIP, TAR atau TAR.GZ: {', '.join(not_archives)}")
+        if batch_catalog_register is None:
+            if not batch_excel_file:
+                errors.append("File Excel referensi belum diupload")
+            if not batch_reference_column or batch_reference_column.strip() == "":
+                errors.append("Nama kolom referensi belum diisi")
+        
+        if errors:
+            st.error("❌ **Validasi Gagal**")
+            for error in errors:
+                st.markdown(f"- {error}")
+        else:
+            # Code patterns are shared with Tab 1 (default when left untouched)
+            code_patterns = [line for line in st.session_state.get('code_patterns', '').splitlines() if line.strip()]
+            try:
+                batch_patterns = compile_code_patterns(code_patterns or None)
+            except re.error:
+                batch_patterns = compile_code_patterns()
+            st.session_state.batch_summaries = None
+            job = submit_job(
+                'batch',
+                run_batch_job,
+                zip_uploads=list(batch_zip_files),
+                excel_file=batch_excel_file,
+                reference_column=batch_reference_column,
+                match_mode=batch_match_mode,
+                patterns=batch_patterns,
+                max_workers=int(batch_workers),
+                previous_output_dir=st.session_state.batch_output_dir,
+                session_id=st.session_state.session_id,
+                catalog_register=batch_catalog_register
+            )
+            if job is not None:
+                st.session_state.batch_output_dir = None
+    
+    batch_job = current_job('batch')
+    if batch_job is not None:
+        if not batch_job.finished:
+            show_job_progress(batch_job.id, "Memproses batch arsip...")
+        elif batch_job.id not in st.session_state.applied_job_ids:
+            st.session_state.applied_job_ids.add(batch_job.id)
+            st.session_state.batch_metrics = getattr(batch_job, 'metrics', None)
+            if batch_job.status == 'done' and batch_job.result['status'] == 'missing_register':
+                st.error(f"❌ Register '{batch_job.result['register']}' tidak ada di katalog referensi!")
+            elif batch_job.status == 'done' and batch_job.result['status'] == 'missing_column':
+                st.error(f"❌ Kolom '{batch_job.result['reference_column']}' tidak ditemukan dalam file Excel!")
+                st.info(f"📋 Kolom yang tersedia: {', '.join(batch_job.result['headers'])}")
+            elif batch_job.status == 'done':
+                st.session_state.batch_output_dir = batch_job.result['output_dir']
+                workspace_manager.adopt(batch_job.result['output_dir'], st.session_state.session_id)
+                st.session_state.batch_summaries = batch_job.result['summaries']
+                st.success("✅ **Batch Selesai!**")
+            elif batch_job.status == 'cancelled':
+                st.warning("⛔ Batch dibatalkan, hasil sebagian sudah dihapus")
+            else:
+                st.error(f"❌ Terjadi kesalahan saat proses batch: {batch_job.error}")
+    
+    show_job_metrics(st.session_state.batch_metrics, "Detail Performa Batch")
+    
+    batch_output_dir = st.session_state.batch_output_dir
+    if st.session_state.batch_summaries and batch_output_dir and not workspace_manager.exists(batch_output_dir):
+        st.warning("🗑️ Hasil batch sudah dihapus dari server (terlalu lama tidak dipakai), proses ulang ya")
+        st.session_state.batch_summaries = None
+        st.session_state.batch_output_dir = None
+    
+    if st.session_state.batch_summaries:
+        summaries = st.session_state.batch_summaries
+        totals = summarize_batch(summaries)
+        
+        st.markdown("### 📊 Ringkasan Batch")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Arsip ZIP", totals['archives'])
+        with col2:
+            st.metric("Total File", totals['total'])
+        with col3:
+            st.metric("Direname", totals['matched'])
+        with col4:
+            st.metric("Tidak Cocok", totals['unmatched'])
+        if totals['failed']:
+            st.warning(f"⚠️ {totals['failed']} ZIP gagal diproses, cek kolom Keterangan")
+        
+        batch_df = pd.DataFrame({
+            'Arsip': [summary['archive'] for summary in summaries],
+            'Total File': [summary['total'] for summary in summaries],
+            'Direname': [summary['matched'] for summary in summaries],
+            'Tidak Cocok': [summary['unmatched'] for summary in summaries],
+            'Kode Ambigu': [summary['ambiguous'] for summary in summaries],
+            'Duplikat': [summary['duplicates'] for summary in summaries],
+            'Nama Bentrok': [summary['collisions'] for summary in summaries],
+            'Waktu (detik)': [summary['seconds'] for summary in summaries],
+            'Keterangan': ['✅ Selesai' if summary['status'] == 'ok' else f"❌ {summary['error']}" for summary in summaries],
+        })
+        st.dataframe(batch_df, use_container_width=True)
+        
+        st.markdown("### 📥 Download Hasil per Arsip")
+        for archive_number, summary in enumerate(summaries, 1):
+            if summary['status'] != 'ok':
+                continue
+            col_name, col_zip, col_report = st.columns([2, 1, 1])
+            with col_name:
+                st.markdown(f"**{archive_number}.** `{summary['archive']}`")
+            archive_stem = os.path.splitext(summary['archive'])[0]
+            with col_zip:
+                for part_number, part_path in enumerate(summary['output_parts'], 1):
+                    st.download_button(
+                        label=f"📦 ZIP - {os.path.getsize(part_path) / (1024 * 1024):.1f} MB",
+                        data=open_output_file(part_path),
+                        file_name=f"{archive_stem}_{os.path.basename(part_path)}",
+                        mime="application/zip",
+                        key=f"batch_zip_{archive_number}_{part_number}",
+                        use_container_width=True
+                    )
+            with col_report:
+                if summary['report_path']:
+                    st.download_button(
+                        label="📄 Laporan",
+                        data=open_output_file(summary['report_path']),
+                        file_name=f"{archive_stem}_{REPORT_FILE_NAME}",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key=f"batch_report_{archive_number}",
+                        use_container_width=True
+                    )
+                else:
+                    st.caption("Semua cocok")
+
 # ============================================================================
 # FOOTER
 # ============================================================================
 
 st.markdown("---")
+disk_usage = workspace_manager.usage()
+st.caption(
+    f"🗄️ Disk kerja server: {disk_usage['bytes'] / (1024 * 1024):.1f} / {disk_usage['quota_bytes'] / (1024 * 1024):.0f} MB "
+    f"({disk_usage['workspaces']} folder, {disk_usage['sessions']} sesi, {disk_usage['evictions']} dihapus karena kuota)"
+)
+admission = job_manager.admission()
+shared_cache = artefact_cache.stats()
+memory_budget = f" / {admission['max_rss_bytes'] / (1024 * 1024):.0f}" if admission['max_rss_bytes'] else ""
+st.caption(
+    f"🧠 Memori server: {(admission['rss_bytes'] or 0) / (1024 * 1024):.0f}{memory_budget} MB "
+    f"({admission['running']} proses jalan, {admission['queued']} antre, {admission['rejections']} ditolak) - "
+    f"cache bersama {shared_cache['bytes'] / (1024 * 1024):.1f} / {shared_cache['max_bytes'] / (1024 * 1024):.0f} MB"
+)
 st.markdown("""
 <div style='text-align: center; color: #6b7280; padding: 2rem 0;'>
     <p style='margin: 0;'><strong>INDOARSIP</strong> - Sistem Otomatis Penamaan Arsip Digital</p>
@@ -0,0 +1,7 @@
+"""
+INDOARSIP - Benchmarks
+Synthetic archives/registers, timing of the rename engine and a load test of
+the app with concurrent sessions.
+Run from the repository root: python -m benchmarks.run_benchmarks --help
+or python -m benchmarks.load_test --help
+"""
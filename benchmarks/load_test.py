@@ -0,0 +1,287 @@
+"""
+INDOARSIP - Concurrent-session load test
+Drives N sessions of the real app.py at once through upload, "Validasi & Cek
+Arsip" and "Mulai Proses Rename Arsip" (Streamlit AppTest, fully offline) and
+reports latency percentiles, peak RSS and workspace disk use per concurrency level.
+
+    python -m benchmarks.load_test --sessions 1 2 4 8 --files 2000 -o load_results.json
+
+The engine settings of the app under test come from the usual INDOARSIP_*
+environment variables (job workers, workspace quota, admission budget...).
+AppTest swaps process-wide Streamlit state on every script run, so script
+reruns of the sessions are serialised; the background jobs they start run
+concurrently, as on a server.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from .synthetic import make_synthetic_register, make_synthetic_zip
+
+REFERENCE_COLUMN = "Nomor_Arsip"
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+VALIDATE_BUTTON = "🔍 Validasi & Cek Arsip"
+RENAME_BUTTON = "🚀 Mulai Proses Rename Arsip"
+
+# One AppTest script run at a time (see the module docstring)
+_script_run_lock = threading.Lock()
+
+class SyntheticUploads:
+    """Stands in for the browser: st.file_uploader returns the files given to a session
+
+    AppTest cannot drive file_uploader widgets, so st.file_uploader is
+    replaced for the duration of the test. Every session gets the uploads
+    registered under its session id (None before that, like an empty widget).
+    AppTest gives every script run the same context session id, so the id
+    is the one app.py keeps in st.session_state.
+    """
+    
+    def __init__(self):
+        self._uploads = {}  # session id -> {widget key: UploadedFile}
+        self._lock = threading.Lock()
+        self._original = None
+    
+    def add(self, session_id, key, name, data, mime="application/octet-stream"):
+        from streamlit.proto.Common_pb2 import FileURLs
+        from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+        
+        upload = UploadedFile(UploadedFileRec(f"{session_id}-{key}", name, mime, data), FileURLs())
+        with self._lock:
+            self._uploads.setdefault(session_id, {})[key] = upload
+    
+    def forget(self, session_id):
+        with self._lock:
+            self._uploads.pop(session_id, None)
+    
+    def file_uploader(self, label, type=None, accept_multiple_files=False, key=None, **kwargs):
+        import streamlit as st
+        
+        with self._lock:
+            upload = self._uploads.get(st.session_state.get('session_id'), {}).get(key)
+        if accept_multiple_files:
+            return [upload] if upload is not None else []
+        return upload
+    
+    def __enter__(self):
+        import streamlit as st
+        self._original = st.file_uploader
+        st.file_uploader = self.file_uploader
+        return self
+    
+    def __exit__(self, *exc_info):
+        import streamlit as st
+        st.file_uploader = self._original
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+class ResourceSampler:
+    """Samples RSS and workspace disk use on a thread; keeps the peaks"""
+    
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_rss_bytes = 0
+        self.peak_disk_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='indoarsip-load-sampler', daemon=True)
+    
+    def _loop(self):
+        from indoarsip.instrumentation import current_rss_bytes
+        from indoarsip.workspace import workspace_manager
+        
+        while True:
+            self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes() or 0)
+            self.peak_disk_bytes = max(self.peak_disk_bytes, workspace_manager.usage()['bytes'])
+            if self._stop.wait(self.interval):
+                return
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def run_script(app_test):
+    """One script rerun of a session, like a browser interaction"""
+    with _script_run_lock:
+        app_test.run()
+
+def wait_for(app_test, condition, timeout, poll_interval):
+    """Rerun the script (like the progress fragment of a browser) until condition(app_test)"""
+    deadline = time.perf_counter() + timeout
+    while not condition(app_test):
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Timeout menunggu proses selesai")
+        time.sleep(poll_interval)
+        run_script(app_test)
+
+def error_messages(app_test):
+    return [element.value for element in app_test.error] + [str(element.value) for element in app_test.exception]
+
+def run_session(uploads, zip_path, register_path, args):
+    """One operator: upload, validate, rename; returns the timings of the session"""
+    from streamlit.testing.v1 import AppTest
+    from indoarsip.workspace import workspace_manager
+    
+    record = {'status': 'ok'}
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    app_test = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    app_test.session_state.session_id = session_id
+    started = time.perf_counter()
+    try:
+        run_script(app_test)
+        with open(zip_path, 'rb') as f:
+            uploads.add(session_id, 'zip_uploader', os.path.basename(zip_path), f.read(), "application/zip")
+        with open(register_path, 'rb') as f:
+            uploads.add(session_id, 'excel_uploader', os.path.basename(register_path), f.read())
+        app_test.text_input(key='ref_column').set_value(REFERENCE_COLUMN)
+        
+        validate_started = time.perf_counter()
+        next(button for button in app_test.button if button.label == VALIDATE_BUTTON).click()
+        run_script(app_test)
+        wait_for(
+            app_test,
+            lambda at: at.session_state.validated or error_messages(at) or (
+                at.session_state.validation_result is not None and at.session_state.validation_result['status'] != 'ok'
+            ),
+            args.timeout, args.poll_interval
+        )
+        record['validate_seconds'] = time.perf_counter() - validate_started
+        if not app_test.session_state.validated:
+            record['status'] = 'validation_failed'
+            record['errors'] = error_messages(app_test)
+            return record
+        
+        rename_started = time.perf_counter()
+        next(button for button in app_test.button if button.label == RENAME_BUTTON).click()
+        run_script(app_test)
+        wait_for(
+            app_test,
+            lambda at: at.session_state.show_download_section or error_messages(at),
+            args.timeout, args.poll_interval
+        )
+        record['rename_seconds'] = time.perf_counter() - rename_started
+        if not app_test.session_state.show_download_section:
+            record['status'] = 'rename_failed'
+            record['errors'] = error_messages(app_test)
+        return record
+    except Exception as e:
+        record['status'] = 'error'
+        record['errors'] = [str(e)]
+        return record
+    finally:
+        record['total_seconds'] = time.perf_counter() - started
+        uploads.forget(session_id)
+        workspace_manager.release_session(session_id)
+
+def summarize_level(sessions, records, sampler, seconds):
+    """One result row: latency percentiles, failures and peaks of a concurrency level"""
+    row = {
+        'sessions': sessions,
+        'ok': sum(1 for record in records if record['status'] == 'ok'),
+        'failed': sum(1 for record in records if record['status'] != 'ok'),
+        'wall_seconds': round(seconds, 3),
+        'peak_rss_bytes': sampler.peak_rss_bytes,
+        'peak_disk_bytes': sampler.peak_disk_bytes,
+        'errors': sorted({error for record in records for error in record.get('errors', [])}),
+    }
+    for step in ('validate', 'rename', 'total'):
+        values = [record[f"{step}_seconds"] for record in records if f"{step}_seconds" in record]
+        for name, fraction in (('p50', 0.5), ('p99', 0.99)):
+            value = percentile(values, fraction)
+            row[f"{step}_{name}_seconds"] = round(value, 3) if value is not None else None
+    return row
+
+def prepare_data(data_dir, count, args):
+    """Generate (or reuse) one register and count archives (one per session, or one shared)"""
+    register_rows = int(args.files * args.register_ratio)
+    register_path = os.path.join(data_dir, f"load_register_{register_rows}.xlsx")
+    if not os.path.exists(register_path):
+        make_synthetic_register(register_path, register_rows, collision_rate=0.01, column=REFERENCE_COLUMN)
+    zip_paths = []
+    for seed in range(1 if args.same_upload else count):
+        zip_path = os.path.join(data_dir, f"load_archive_{args.files}_{args.min_size}_{args.max_size}_{seed}.zip")
+        if not os.path.exists(zip_path):
+            make_synthetic_zip(zip_path, args.files, register_rows, size_range=(args.min_size, args.max_size), seed=seed)
+        zip_paths.append(zip_path)
+    return [zip_paths[index % len(zip_paths)] for index in range(count)], register_path
+
+def build_parser():
+    """Build the argument parser for the load test"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test", description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="Jumlah sesi bersamaan per level")
+    parser.add_argument("--files", type=int, default=1000, help="Jumlah file per arsip ZIP")
+    parser.add_argument("--register-ratio", type=float, default=1.5, help="Jumlah baris register per file arsip")
+    parser.add_argument("--min-size", type=int, default=1024, help="Ukuran file minimum (byte)")
+    parser.add_argument("--max-size", type=int, default=8192, help="Ukuran file maksimum (byte)")
+    parser.add_argument("--same-upload", action="store_true", help="Semua sesi upload ZIP yang sama (default: ZIP beda per sesi)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Jeda rerun saat menunggu job (detik)")
+    parser.add_argument("--timeout", type=float, default=600, help="Batas waktu per langkah (detik)")
+    parser.add_argument("--data-dir", default=None, help="Folder data sintetis (dipakai ulang antar run)")
+    parser.add_argument("-o", "--output", default="load_results.json", help="File hasil JSON")
+    return parser
+
+def main(argv=None):
+    """Run the load test; returns the process exit code (1 if any session failed)"""
+    args = build_parser().parse_args(argv)
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "indoarsip_bench_data")
+    os.makedirs(data_dir, exist_ok=True)
+    
+    from indoarsip.cache import artefact_cache, file_cache
+    
+    results = []
+    with SyntheticUploads() as uploads:
+        for sessions in args.sessions:
+            zip_paths, register_path = prepare_data(data_dir, sessions, args)
+            # Levels are independent: nothing parsed by the previous one is reused
+            artefact_cache.clear()
+            file_cache.clear()
+            started = time.perf_counter()
+            with ResourceSampler() as sampler, ThreadPoolExecutor(max_workers=sessions) as executor:
+                records = list(executor.map(lambda zip_path: run_session(uploads, zip_path, register_path, args), zip_paths))
+            row = summarize_level(sessions, records, sampler, time.perf_counter() - started)
+            print(
+                f"{row['sessions']:>4} sesi  validasi p50 {row['validate_p50_seconds']} p99 {row['validate_p99_seconds']} s  "
+                f"rename p50 {row['rename_p50_seconds']} p99 {row['rename_p99_seconds']} s  "
+                f"RSS {row['peak_rss_bytes'] / (1024 * 1024):.0f} MB  disk {row['peak_disk_bytes'] / (1024 * 1024):.1f} MB  "
+                f"gagal {row['failed']}",
+                file=sys.stderr
+            )
+            results.append(row)
+    
+    output = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'data_dir')},
+            'env': {key: value for key, value in os.environ.items() if key.startswith('INDOARSIP_')},
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"📄 {args.output}", file=sys.stderr)
+    return 1 if any(row['failed'] for row in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+INDOARSIP - Benchmark runner
+Times the rename engine on synthetic data at several scales and writes JSON results.
+
+    python -m benchmarks.run_benchmarks --scales 1000 10000 100000 -o results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from indoarsip.archive import extract_zip, get_files_from_directory, list_zip_members
+from indoarsip.matching import match_files_with_reference
+from indoarsip.output import create_zip_from_files, create_unmatched_report
+from indoarsip.reference import read_file_bytes, read_reference_column
+from indoarsip.instrumentation import peak_rss_bytes
+
+from .synthetic import make_synthetic_register, make_synthetic_zip
+
+REFERENCE_COLUMN = "Nomor_Arsip"
+
+def timed(function, repeat):
+    """Run function repeat times; returns (last result, list of durations)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return result, durations
+
+def prepare_data(data_dir, scale, args):
+    """Generate (or reuse) the synthetic ZIP and register of one scale"""
+    register_rows = int(scale * args.register_ratio)
+    tag = f"{scale}_{register_rows}_{args.collision_rate}_{args.nesting}_{args.macosx_noise}_{args.min_size}_{args.max_size}_{args.seed}"
+    zip_path = os.path.join(data_dir, f"archive_{tag}.zip")
+    register_path = os.path.join(data_dir, f"register_{tag}.xlsx")
+    if not os.path.exists(zip_path):
+        make_synthetic_zip(
+            zip_path, scale, register_rows,
+            size_range=(args.min_size, args.max_size),
+            nesting=args.nesting,
+            macosx_noise=args.macosx_noise,
+            seed=args.seed
+        )
+    if not os.path.exists(register_path):
+        make_synthetic_register(
+            register_path, register_rows,
+            collision_rate=args.collision_rate,
+            column=REFERENCE_COLUMN,
+            seed=args.seed
+        )
+    return zip_path, register_path
+
+def run_scale(scale, zip_path, register_path, repeat):
+    """Benchmark every engine function at one scale; returns result rows"""
+    rows = []
+    work_dir = tempfile.mkdtemp(prefix="indoarsip_bench_")
+    
+    def record(name, durations, items=0, bytes_processed=0):
+        rows.append({
+            'scale': scale,
+            'benchmark': name,
+            'repeat': len(durations),
+            'seconds_min': round(min(durations), 6),
+            'seconds_median': round(statistics.median(durations), 6),
+            'items': items,
+            'bytes': bytes_processed,
+            'peak_rss_bytes': peak_rss_bytes(),
+        })
+    
+    try:
+        zip_size = os.path.getsize(zip_path)
+        
+        extracted_dirs = []
+        def run_extract():
+            extracted_dirs.append(extract_zip(zip_path))
+            return extracted_dirs[-1]
+        extracted_dir, durations = timed(run_extract, repeat)
+        record('extract_zip', durations, bytes_processed=zip_size)
+        
+        files, durations = timed(lambda: get_files_from_directory(extracted_dir), repeat)
+        record('get_files_from_directory', durations, items=len(files))
+        for directory in extracted_dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        (members, _), durations = timed(lambda: list_zip_members(zip_path), repeat)
+        record('list_zip_members', durations, items=len(members), bytes_processed=zip_size)
+        member_names = [info.filename for info in members]
+        
+        register_bytes = read_file_bytes(register_path)
+        references, durations = timed(lambda: read_reference_column(register_bytes, REFERENCE_COLUMN), repeat)
+        record('read_reference_column', durations, items=len(references), bytes_processed=len(register_bytes))
+        
+        result, durations = timed(lambda: match_files_with_reference(member_names, references), repeat)
+        matched, unmatched, rename_map = result[0], result[1], result[2]
+        record('match_files_with_reference', durations, items=len(member_names))
+        
+        output_dirs = []
+        def run_create_zip():
+            output_dirs.append(tempfile.mkdtemp(dir=work_dir))
+            return create_zip_from_files(rename_map, output_dirs[-1], source_zip=zip_path)
+        part_paths, durations = timed(run_create_zip, repeat)
+        record('create_zip_from_files', durations, items=len(rename_map),
+               bytes_processed=sum(os.path.getsize(p) for p in part_paths))
+        
+        report_path = os.path.join(work_dir, "report.xlsx")
+        _, durations = timed(lambda: create_unmatched_report(unmatched, report_path), repeat)
+        record('create_unmatched_report', durations, items=len(unmatched))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+def compare(results, baseline, tolerance):
+    """Return benchmarks whose median got slower than baseline by more than tolerance"""
+    previous = {(row['scale'], row['benchmark']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get((row['scale'], row['benchmark']))
+        if old and row['seconds_median'] > old['seconds_median'] * (1 + tolerance):
+            regressions.append({
+                'scale': row['scale'],
+                'benchmark': row['benchmark'],
+                'baseline_seconds': old['seconds_median'],
+                'seconds': row['seconds_median'],
+            })
+    return regressions
+
+def build_parser():
+    """Build the argument parser for the benchmark runner"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run_benchmarks", description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000], help="Jumlah file per skenario")
+    parser.add_argument("--register-ratio", type=float, default=1.5, help="Jumlah baris register per file arsip")
+    parser.add_argument("--collision-rate", type=float, default=0.01, help="Porsi kode register yang dipendekkan (prefix ambigu)")
+    parser.add_argument("--nesting", type=int, default=2, help="Kedalaman folder di dalam ZIP")
+    parser.add_argument("--macosx-noise", type=float, default=0.1, help="Porsi file yang punya metadata __MACOSX/.DS_Store")
+    parser.add_argument("--min-size", type=int, default=1024, help="Ukuran file minimum (byte)")
+    parser.add_argument("--max-size", type=int, default=8192, help="Ukuran file maksimum (byte)")
+    parser.add_argument("--repeat", type=int, default=3, help="Pengulangan per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="Folder data sintetis (dipakai ulang antar run)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="File hasil JSON")
+    parser.add_argument("--compare", default=None, help="File hasil sebelumnya; exit 1 kalau ada regresi")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Toleransi regresi (0.2 = 20%% lebih lambat)")
+    return parser
+
+def main(argv=None):
+    """Run the benchmark suite; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "indoarsip_bench_data")
+    os.makedirs(data_dir, exist_ok=True)
+    
+    # Lazily imported by the engine; their import cost is not part of any benchmark
+    import pandas
+    import openpyxl
+    
+    results = []
+    for scale in args.scales:
+        zip_path, register_path = prepare_data(data_dir, scale, args)
+        for row in run_scale(scale, zip_path, register_path, args.repeat):
+            print(f"{row['scale']:>8} {row['benchmark']:<28} {row['seconds_median']:>10.4f} s", file=sys.stderr)
+            results.append(row)
+    
+    output = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'data_dir')},
+        },
+        'results': results,
+    }
+    
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        output['regressions'] = regressions
+        for regression in regressions:
+            print(f"❌ Regresi: {regression}", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+    
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"📄 {args.output}", file=sys.stderr)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
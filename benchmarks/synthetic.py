@@ -0,0 +1,77 @@
+"""
+INDOARSIP - Synthetic benchmark data
+Reproducible archives (ZIP) and Excel registers with configurable shape
+"""
+
+import os
+import random
+import zipfile
+
+def code_for(number, width=6):
+    """Format a document code the way registers do (zero padded)"""
+    return f"{number:0{width}d}"
+
+def make_register_values(rows, collision_rate=0.0, seed=0):
+    """Build reference values like '000336-PT. NAMA 336'
+
+    collision_rate is the share of rows whose code is shortened, so it
+    becomes a prefix of other codes (ambiguous matches).
+    """
+    rng = random.Random(seed)
+    values = []
+    for number in range(rows):
+        code = code_for(number)
+        if collision_rate and rng.random() < collision_rate:
+            code = code[:rng.randint(2, len(code) - 1)]
+        values.append(f"{code}-PT. NAMA {number}")
+    return values
+
+def make_synthetic_register(path, rows, collision_rate=0.0, extra_columns=3, column="Nomor_Arsip", seed=0):
+    """Write an Excel register with the reference column plus filler columns"""
+    import pandas as pd
+    
+    data = {column: make_register_values(rows, collision_rate, seed)}
+    for extra in range(extra_columns):
+        data[f"Kolom_{extra + 1}"] = [f"isi {extra}-{row}" for row in range(rows)]
+    pd.DataFrame(data).to_excel(path, index=False)
+    return path
+
+def make_file_names(file_count, register_rows, match_rate=0.9, seed=0):
+    """Build archive file names; about match_rate of them have a code in the register"""
+    rng = random.Random(seed)
+    names = []
+    for index in range(file_count):
+        if rng.random() < match_rate and register_rows:
+            number = rng.randrange(register_rows)
+        else:
+            number = register_rows + index  # Outside the register
+        names.append(f"file_pelanggan_{code_for(number)}.pdf")
+    return names
+
+def make_synthetic_zip(path, file_count, register_rows, size_range=(1024, 8192), nesting=2,
+                       macosx_noise=0.1, match_rate=0.9, compress_type=zipfile.ZIP_DEFLATED, seed=0):
+    """Write a ZIP of random (incompressible, like scans) files
+
+    nesting is the folder depth of members, macosx_noise the share of extra
+    __MACOSX/._ metadata and .DS_Store entries.
+    """
+    rng = random.Random(seed)
+    names = make_file_names(file_count, register_rows, match_rate, seed)
+    noisy_folders = set()
+    used_members = set()
+    with zipfile.ZipFile(path, 'w', compress_type) as zip_file:
+        for index, name in enumerate(names):
+            folders = [f"region_{rng.randint(1, 5)}" for _ in range(nesting)]
+            member = '/'.join([f"{index // 1000:03d}"] + folders + [name])
+            if member in used_members:
+                # Same code drawn twice in one folder, keep member names unique
+                member = '/'.join([f"{index // 1000:03d}", f"dup_{index}", name])
+            used_members.add(member)
+            zip_file.writestr(member, rng.randbytes(rng.randint(*size_range)))
+            if macosx_noise and rng.random() < macosx_noise:
+                folder = member.rsplit('/', 1)[0]
+                zip_file.writestr(f"__MACOSX/{folder}/._{name}", b'\0' * 82)
+                if folder not in noisy_folders:
+                    noisy_folders.add(folder)
+                    zip_file.writestr(f"{folder}/.DS_Store", b'\0' * 64)
+    return path
@@ -0,0 +1,62 @@
+"""
+INDOARSIP - Rename engine
+Headless core of the batch renaming system: usable from app.py, the CLI
+(python -m indoarsip) or batch jobs, without importing Streamlit.
+"""
+
+from .archive import (
+    extract_zip,
+    get_files_from_directory,
+    scan_directory,
+    is_valid_archive_member,
+    list_zip_members,
+    ARCHIVE_UPLOAD_TYPES,
+    is_tar_archive,
+    list_tar_members,
+    read_source_file,
+    spill_files,
+    copy_zip_member_raw,
+)
+from .matching import (
+    MATCH_MODES,
+    DEFAULT_CODE_PATTERNS,
+    compile_code_patterns,
+    extract_code_from_filename,
+    extract_codes,
+    build_reference_index,
+    lookup_reference,
+    match_files_with_reference,
+)
+from .output import (
+    OUTPUT_ZIP_NAME,
+    REPORT_FILE_NAME,
+    plan_archive_parts,
+    create_zip_from_files,
+    create_zip_from_tar,
+    read_output_file,
+    create_unmatched_report,
+)
+from .reference import (
+    content_hash,
+    read_excel_headers,
+    load_reference_values,
+    load_reference_index,
+)
+from .manifest import FileManifest
+from .dedupe import resolve_duplicates
+from .suggest import suggest_for_unmatched, format_suggestions
+from .batch import BATCH_WORKERS, process_archive, run_batch, summarize_batch
+from .watch import InboxWatcher
+from .catalog import (
+    CATALOG_PATH,
+    CatalogIndex,
+    import_register,
+    list_registers,
+    list_register_versions,
+    open_register,
+    register_index,
+)
+from .instrumentation import JobMetrics
+from .jobs import JobCancelled, JobRejected, job_manager
+from .cache import FILE_CACHE_MAX_BYTES, SHARED_CACHE_MAX_BYTES, ByteLRUCache, artefact_cache, estimate_size, file_cache
+from .workspace import WorkspaceQuotaExceeded, workspace_manager
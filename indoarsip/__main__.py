@@ -0,0 +1,7 @@
+"""Run the INDOARSIP command line: python -m indoarsip"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
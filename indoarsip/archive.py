@@ -0,0 +1,384 @@
+"""
+INDOARSIP - Archive input
+Scanning directories and reading ZIP or TAR members (no Streamlit imports)
+"""
+
+import io
+import os
+import struct
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Threads used for directory scanning, size collection and spilling uploads (syscall bound, useful beyond the core count)
+SCAN_WORKERS = int(os.environ.get('INDOARSIP_SCAN_WORKERS', str(min(32, (os.cpu_count() or 1) + 4))))
+
+# Decompression is CPU bound, one extraction thread per core
+EXTRACT_WORKERS = int(os.environ.get('INDOARSIP_EXTRACT_WORKERS', str(os.cpu_count() or 1)))
+
+class BufferReader(io.RawIOBase):
+    """Read-only file over a buffer (e.g. an upload's getbuffer()), with its own position
+
+    Nothing is copied, so every reader of a shared upload can have one.
+    """
+    
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        self._position = 0
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def read(self, size=-1):
+        end = len(self._buffer) if size is None or size < 0 else self._position + size
+        data = bytes(self._buffer[self._position:end])
+        self._position += len(data)
+        return data
+    
+    def readinto(self, target):
+        data = self._buffer[self._position:self._position + len(target)]
+        target[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._buffer)
+        if offset < 0:
+            raise ValueError(f"Posisi negatif: {offset}")
+        self._position = offset
+        return offset
+    
+    def tell(self):
+        return self._position
+
+def source_view(source):
+    """Return an archive source (path or file object) that one reader can use on its own
+
+    Uploads are shared by the script, download threads and jobs, and a
+    ZipFile seeks its file: every reader gets a BufferReader over the
+    upload's bytes instead. Paths are returned as is (each open gets its own
+    handle); other file objects too, so they must not be read concurrently.
+    """
+    if not isinstance(source, (str, os.PathLike)) and hasattr(source, 'getbuffer'):
+        return BufferReader(source.getbuffer())
+    return source
+
+def extract_zip(zip_file, workers=None):
+    """Extract ZIP file to temporary directory
+
+    A ZIP on disk is extracted by several threads (zlib releases the GIL),
+    each with its own handle on the archive; file objects (uploads) and
+    single-core hosts extract sequentially.
+    """
+    temp_dir = tempfile.mkdtemp()
+    workers = workers or EXTRACT_WORKERS
+    if workers < 2 or not isinstance(zip_file, (str, os.PathLike)):
+        with zipfile.ZipFile(source_view(zip_file), 'r') as zip_ref:
+            zip_ref.extractall(temp_dir)
+        return temp_dir
+    
+    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        # Directories first, so workers never race on creating them
+        for info in members:
+            if info.is_dir():
+                zip_ref.extract(info, temp_dir)
+    members = [info for info in members if not info.is_dir()]
+    workers = max(1, min(workers, len(members)))
+    
+    def extract_slice(start):
+        with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+            for info in members[start::workers]:
+                try:
+                    zip_ref.extract(info, temp_dir)
+                except FileExistsError:
+                    # Another worker created the same parent folder first
+                    zip_ref.extract(info, temp_dir)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='indoarsip-extract') as executor:
+        list(executor.map(extract_slice, range(workers)))
+    return temp_dir
+
+def is_system_directory(dirname):
+    """Check if a directory is hidden or macOS metadata (__MACOSX)"""
+    return dirname.startswith('.') or dirname == '__MACOSX'
+
+def is_system_file(filename):
+    """Check if a file is hidden, a system file, or macOS metadata"""
+    return filename.startswith('.') or filename.startswith('__') or filename == '.DS_Store'
+
+def scan_directory_entries(directory):
+    """List one directory with os.scandir: ({file path: size}, [subdirectories to descend])"""
+    files = {}
+    subdirs = []
+    skip_files = directory.endswith('__MACOSX')
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        # Skip __MACOSX and other system directories; symlinked folders are not followed (like os.walk)
+                        if not is_system_directory(entry.name) and not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif entry.is_file() and not skip_files and not is_system_file(entry.name):
+                        # Stat once here, later stages reuse the size
+                        files[entry.path] = entry.stat().st_size
+                except OSError:
+                    continue  # Vanished or broken entry
+    except OSError:
+        pass  # Unreadable directory, skipped like os.walk does
+    return files, subdirs
+
+def scan_directory(directory, workers=None):
+    """Scan a directory tree (including subdirectories) on a thread pool
+
+    Returns a dict of file path -> size in bytes, in os.walk (top-down) order.
+    """
+    listings = {}
+    with ThreadPoolExecutor(max_workers=workers or SCAN_WORKERS, thread_name_prefix='indoarsip-scan') as executor:
+        pending = {executor.submit(scan_directory_entries, directory): directory}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                listings[path] = future.result()
+                for subdir in listings[path][1]:
+                    pending[executor.submit(scan_directory_entries, subdir)] = subdir
+    
+    # Reassemble in a stable order, whichever listing finished first
+    manifest = {}
+    stack = [directory]
+    while stack:
+        files, subdirs = listings[stack.pop()]
+        manifest.update(files)
+        stack.extend(reversed(subdirs))
+    return manifest
+
+def get_files_from_directory(directory):
+    """Get all files from directory (including subdirectories)"""
+    return list(scan_directory(directory))
+
+def collect_file_sizes(paths, workers=None):
+    """Stat many files on a thread pool; returns {path: size}"""
+    paths = list(paths)
+    if len(paths) < 2:
+        return {path: os.path.getsize(path) for path in paths}
+    with ThreadPoolExecutor(max_workers=workers or SCAN_WORKERS, thread_name_prefix='indoarsip-stat') as executor:
+        return dict(zip(paths, executor.map(os.path.getsize, paths)))
+
+def spill_files(files, workers=None, progress=None):
+    """Write in-memory files (objects with getbuffer(), e.g. uploads) to disk on a thread pool
+
+    files is {path: file object}. A file already on disk with the same size
+    is not written again. Returns the number of bytes written.
+    """
+    def spill(item):
+        path, source = item
+        size = source.getbuffer().nbytes
+        try:
+            written = os.path.getsize(path) == size
+        except OSError:
+            written = False
+        if not written:
+            with open(path, 'wb') as f:
+                f.write(source.getbuffer())
+        if progress is not None:
+            progress.advance(files=1, nbytes=size)
+        return 0 if written else size
+    
+    items = list(files.items())
+    if len(items) < 2:
+        return sum(map(spill, items))
+    with ThreadPoolExecutor(max_workers=workers or SCAN_WORKERS, thread_name_prefix='indoarsip-spill') as executor:
+        return sum(executor.map(spill, items))
+
+def is_valid_archive_member(member_name):
+    """Apply the same hidden/system filtering as get_files_from_directory to a ZIP member name"""
+    parts = member_name.replace('\\', '/').split('/')
+    if any(is_system_directory(d) for d in parts[:-1] if d):
+        return False
+    return bool(parts[-1]) and not is_system_file(parts[-1])
+
+def list_zip_members(zip_file):
+    """List valid file members of a ZIP from its central directory, without extracting
+
+    Returns (members, all_names): the ZipInfo of every valid file, and every
+    name in the archive (for debugging empty results).
+    """
+    with zipfile.ZipFile(source_view(zip_file), 'r') as zip_ref:
+        infos = zip_ref.infolist()
+    members = [info for info in infos if not info.is_dir() and is_valid_archive_member(info.filename)]
+    return members, [info.filename for info in infos]
+
+# Archive names read as TAR; the compression is detected from the data
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# Extensions accepted by the archive uploaders (a plain .gz is not a TAR)
+ARCHIVE_UPLOAD_TYPES = ['zip'] + [suffix.lstrip('.') for suffix in TAR_SUFFIXES]
+
+def is_tar_archive(source):
+    """Check if an archive path or upload is a TAR (plain or compressed), by its name"""
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    return os.fspath(name).lower().endswith(TAR_SUFFIXES)
+
+def open_tar(source, stream=True):
+    """Open a TAR archive (path or file object) for one forward pass
+
+    stream=True reads strictly sequentially ('r|*'), nothing is ever seeked
+    back. With stream=False the data of skipped members is seeked over
+    instead of read, which is free for an uncompressed TAR.
+    """
+    mode = 'r|*' if stream else 'r:*'
+    if isinstance(source, (str, os.PathLike)):
+        return tarfile.open(source, mode)
+    source = source_view(source)
+    source.seek(0)
+    return tarfile.open(fileobj=source, mode=mode)
+
+def iter_tar_entries(tar):
+    """Every member header of an open TAR, without keeping them all in memory"""
+    while True:
+        member = tar.next()
+        if member is None:
+            return
+        tar.members = []  # TarFile remembers every header otherwise
+        yield member
+
+def is_valid_tar_member(member):
+    """Regular file passing the same filtering as get_files_from_directory ('./' prefixes ignored)"""
+    name = member.name
+    while name.startswith('./'):
+        name = name[2:]
+    return member.isfile() and is_valid_archive_member(name)
+
+def list_tar_members(tar_source):
+    """List valid file members of a TAR / TAR.GZ from their headers, without extracting
+
+    Returns (members, all_names): (name, size) of every valid file, and
+    every name in the archive (for debugging empty results). A name stored
+    twice is listed once.
+    """
+    members = []
+    all_names = []
+    seen = set()
+    with open_tar(tar_source, stream=False) as tar:
+        for member in iter_tar_entries(tar):
+            all_names.append(member.name)
+            if is_valid_tar_member(member) and member.name not in seen:
+                seen.add(member.name)
+                members.append((member.name, member.size))
+    return members, all_names
+
+def read_source_file(file_key, source_zip=None):
+    """Read a file's bytes, from the source ZIP member or from disk"""
+    if source_zip is not None:
+        with zipfile.ZipFile(source_view(source_zip), 'r') as zip_ref:
+            return zip_ref.read(file_key)
+    with open(file_key, 'rb') as f:
+        return f.read()
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# ZipFile internals raw copying relies on (not public API, checked before use)
+ZIPFILE_READ_FIELDS = ('fp',)
+ZIPFILE_WRITE_FIELDS = ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify',
+                        '_lock', '_seekable', '_writing', '_writecheck', '_allowZip64')
+
+# General purpose flag: CRC and sizes follow the data instead of the local header
+DATA_DESCRIPTOR_FLAG = 0x08
+DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+
+def has_zip_internals(zip_file, fields):
+    """Check that a ZipFile still has the private fields raw copying uses"""
+    return all(hasattr(zip_file, field) for field in fields)
+
+def read_raw_member(source, info):
+    """Yield the compressed (and possibly encrypted) data of a member, chunk by chunk"""
+    if not has_zip_internals(source, ZIPFILE_READ_FIELDS):
+        raise NotImplementedError("ZipFile tanpa akses data mentah di versi Python ini")
+    # Skip the source local header (its extra field may differ from the central directory)
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = source.fp.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Data arsip terpotong: {info.filename}")
+        yield chunk
+        remaining -= len(chunk)
+
+def append_raw_member(zip_file, info, chunks):
+    """Write a member whose data is already compressed, as ZipFile.open(..., 'w') would
+
+    info carries the CRC and sizes. The same checks as a normal write apply
+    (mode, open write handle, duplicate name, ZIP64). With the data
+    descriptor flag set, CRC and sizes are written after the data.
+    """
+    if not has_zip_internals(zip_file, ZIPFILE_WRITE_FIELDS):
+        raise NotImplementedError("ZipFile tanpa akses data mentah di versi Python ini")
+    zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    with zip_file._lock:
+        if zip_file._writing:
+            raise ValueError("Can't write to the ZIP file while there is another write handle open on it")
+        if zip64 and not zip_file._allowZip64:
+            raise zipfile.LargeZipFile("Filesize would require ZIP64 extensions")
+        if zip_file._seekable:
+            zip_file.fp.seek(zip_file.start_dir)
+        info.header_offset = zip_file.fp.tell()
+        zip_file._writecheck(info)
+        zip_file._didModify = True
+        zip_file.fp.write(info.FileHeader(zip64))
+        for chunk in chunks:
+            zip_file.fp.write(chunk)
+        if info.flag_bits & DATA_DESCRIPTOR_FLAG:
+            zip_file.fp.write(struct.pack('<LLQQ' if zip64 else '<LLLL', DATA_DESCRIPTOR_SIGNATURE,
+                                          info.CRC, info.compress_size, info.file_size))
+        zip_file.start_dir = zip_file.fp.tell()
+        zip_file.filelist.append(info)
+        zip_file.NameToInfo[info.filename] = info
+
+def copy_zip_member_raw(source, info, zip_file, new_name, progress=None):
+    """Copy a member's compressed data from source into zip_file under new_name
+
+    The data is never decompressed or recompressed: the local header is
+    rebuilt for the new name and the compressed stream is copied as is, so
+    encrypted members stay readable with their password. source.fp is
+    seeked: source must be a ZipFile of this reader only (see source_view).
+    If this Python's ZipFile lacks the internals used for that, an
+    unencrypted member is decompressed and written again instead.
+    progress (optional) gets advance(nbytes=...) per copied chunk.
+    """
+    new_info = zipfile.ZipInfo(new_name, date_time=info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.external_attr = info.external_attr
+    
+    def counted(chunks):
+        for chunk in chunks:
+            yield chunk
+            if progress is not None:
+                progress.advance(nbytes=len(chunk))
+    
+    if has_zip_internals(source, ZIPFILE_READ_FIELDS) and has_zip_internals(zip_file, ZIPFILE_WRITE_FIELDS):
+        new_info.CRC = info.CRC
+        new_info.compress_size = info.compress_size
+        new_info.file_size = info.file_size
+        # Encryption, compression options and data descriptor bits: the
+        # password check byte of an encrypted member depends on bit 3
+        new_info.flag_bits = info.flag_bits & 0x0F
+        append_raw_member(zip_file, new_info, counted(read_raw_member(source, info)))
+        return
+    
+    new_info.file_size = info.file_size
+    force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+    with source.open(info) as stream, zip_file.open(new_info, 'w', force_zip64=force_zip64) as target:
+        for chunk in counted(iter(lambda: stream.read(COPY_CHUNK_SIZE), b'')):
+            target.write(chunk)
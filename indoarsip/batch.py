@@ -0,0 +1,212 @@
+"""
+INDOARSIP - Multi-archive batch
+Processes several archives against one parsed reference index, concurrently
+up to a worker limit; each archive gets its own output ZIP and report
+"""
+
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .archive import is_tar_archive, list_tar_members, list_zip_members, scan_directory
+from .dedupe import DUPLICATE, NAME_COLLISION, resolve_duplicates
+from .instrumentation import JobMetrics
+from .jobs import JobCancelled
+from .matching import build_reference_index, match_files_with_reference
+from .suggest import suggest_for_unmatched
+from .output import REPORT_FILE_NAME, create_zip_from_files, create_zip_from_tar, create_unmatched_report
+
+# Archives processed at the same time in one batch
+BATCH_WORKERS = int(os.environ.get('INDOARSIP_BATCH_WORKERS', str(os.cpu_count() or 2)))
+
+class ArchiveProgress:
+    """Forwards one archive's progress to the batch job without resetting its counters"""
+    
+    def __init__(self, job):
+        self.job = job
+    
+    def set_stage(self, stage, files_total=None, bytes_total=None):
+        self.job.check_cancelled()
+    
+    def advance(self, files=0, nbytes=0):
+        self.job.advance(nbytes=nbytes)
+
+def archive_output_name(name, used_names):
+    """Folder name for one archive's output, unique within the batch"""
+    stem = os.path.splitext(os.path.basename(str(name).rstrip('/\\')))[0]
+    if stem.lower().endswith('.tar'):
+        stem = stem[:-4]  # arsip.tar.gz -> arsip
+    stem = stem or 'arsip'
+    stem = re.sub(r'[^\w.-]+', '_', stem)
+    candidate = stem
+    number = 2
+    while candidate in used_names:
+        candidate = f"{stem}_{number}"
+        number += 1
+    used_names.add(candidate)
+    return candidate
+
+def process_archive(source, name, reference_index, output_dir, mode='first', patterns=None,
+                    part_size=None, progress=None):
+    """Scan, match and build the output of one archive (ZIP or TAR path/file object, or directory)
+
+    A TAR is never extracted: its headers are listed, then matched members
+    are streamed into the output in one pass (see create_zip_from_tar).
+    Returns a summary dict with counts, output paths and the stage metrics.
+    """
+    metrics = JobMetrics('archive', archive=name, match_mode=mode)
+    source_tar = None
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        source_zip = None
+        with metrics.stage('scan_directory') as stage:
+            file_sizes = scan_directory(source)
+            file_list = list(file_sizes)
+            stage['items'] = len(file_list)
+            stage['bytes'] = sum(file_sizes.values())
+    elif is_tar_archive(source):
+        source_zip = None
+        source_tar = source
+        with metrics.stage('scan_tar') as stage:
+            tar_members, _ = list_tar_members(source_tar)
+            file_sizes = dict(tar_members)
+            file_list = list(file_sizes)
+            stage['items'] = len(file_list)
+            stage['bytes'] = sum(file_sizes.values())
+    else:
+        source_zip = source
+        file_sizes = None
+        with metrics.stage('scan_zip') as stage:
+            zip_members, _ = list_zip_members(source_zip)
+            file_list = [info.filename for info in zip_members]
+            stage['items'] = len(file_list)
+    
+    with metrics.stage('match') as stage:
+        matched, unmatched, rename_map, ambiguous, codes = match_files_with_reference(
+            file_list, None, mode=mode, index=reference_index, patterns=patterns, progress=progress
+        )
+        stage['items'] = len(file_list)
+    
+    with metrics.stage('suggest') as stage:
+        suggestions = suggest_for_unmatched(unmatched, codes, reference_index)
+        stage['items'] = len(unmatched)
+    
+    os.makedirs(output_dir, exist_ok=True)
+    if source_tar is not None:
+        # Duplicates are resolved while the matched members stream into the output
+        with metrics.stage('build_zip') as stage:
+            part_paths, output_mapping, duplicates = create_zip_from_tar(
+                rename_map, output_dir, source_tar, part_size=part_size, progress=progress, file_sizes=file_sizes
+            )
+            stage['items'] = len(output_mapping)
+            stage['bytes'] = sum(os.path.getsize(p) for p in part_paths)
+    else:
+        with metrics.stage('dedupe') as stage:
+            output_mapping, duplicates = resolve_duplicates(
+                rename_map, source_zip=source_zip, file_sizes=file_sizes, progress=progress
+            )
+            stage['items'] = len(duplicates)
+        
+        with metrics.stage('build_zip') as stage:
+            part_paths = create_zip_from_files(
+                output_mapping, output_dir, source_zip=source_zip, part_size=part_size, progress=progress,
+                file_sizes=file_sizes
+            )
+            stage['items'] = len(output_mapping)
+            stage['bytes'] = sum(os.path.getsize(p) for p in part_paths)
+    
+    report_path = None
+    if unmatched or duplicates:
+        with metrics.stage('unmatched_report') as stage:
+            report_path = create_unmatched_report(
+                unmatched, os.path.join(output_dir, REPORT_FILE_NAME), duplicates=duplicates,
+                suggestions=suggestions
+            )
+            stage['items'] = len(unmatched) + len(duplicates)
+    
+    return {
+        'archive': name,
+        'status': 'ok',
+        'total': len(file_list),
+        'matched': len(matched),
+        'unmatched': len(unmatched),
+        'ambiguous': len(ambiguous),
+        'duplicates': sum(1 for d in duplicates if d['status'] == DUPLICATE),
+        'collisions': sum(1 for d in duplicates if d['status'] == NAME_COLLISION),
+        'output_dir': output_dir,
+        'output_parts': part_paths,
+        'report_path': report_path,
+        'error': None,
+        'metrics': metrics.log(),
+    }
+
+def run_batch(sources, reference_values, output_root, mode='first', patterns=None, part_size=None,
+              max_workers=None, job=None, flat=False, reference_index=None):
+    """Process several archives against one reference index, concurrently
+
+    sources is a list of (name, source) pairs. The reference index is built
+    once and shared (read only) by every archive. At most max_workers
+    archives (default BATCH_WORKERS) run at a time. A failing archive is
+    reported in its summary and does not stop the others. With flat=True
+    (single archive) the output goes straight into output_root. A ready
+    reference_index (e.g. a catalog register) replaces reference_values.
+    Returns the list of per-archive summaries, in sources order.
+    """
+    if reference_index is None:
+        reference_index = build_reference_index(reference_values)
+    workers = max(1, min(max_workers or BATCH_WORKERS, len(sources) or 1))
+    progress = ArchiveProgress(job) if job is not None else None
+    if job is not None:
+        job.set_stage('batch', files_total=len(sources), bytes_total=0)
+    
+    used_names = set()
+    planned = [(name, source, output_root if flat else os.path.join(output_root, archive_output_name(name, used_names)))
+               for name, source in sources]
+    
+    def run_one(name, source, output_dir):
+        started = time.perf_counter()
+        # Only a folder this batch created is removed again on failure
+        created = not flat and not os.path.exists(output_dir)
+        try:
+            summary = process_archive(source, name, reference_index, output_dir, mode, patterns, part_size, progress)
+        except JobCancelled:
+            if created:
+                shutil.rmtree(output_dir, ignore_errors=True)
+            raise
+        except Exception as e:
+            # Partial output of a failed archive is never offered for download
+            if created:
+                shutil.rmtree(output_dir, ignore_errors=True)
+            summary = {
+                'archive': name, 'status': 'failed', 'total': 0, 'matched': 0, 'unmatched': 0,
+                'ambiguous': 0, 'duplicates': 0, 'collisions': 0, 'output_dir': output_dir, 'output_parts': [], 'report_path': None,
+                'error': str(e), 'metrics': None,
+            }
+        summary['seconds'] = round(time.perf_counter() - started, 3)
+        if job is not None:
+            job.advance(files=1)
+        return summary
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='indoarsip-batch') as executor:
+        futures = [executor.submit(run_one, *plan) for plan in planned]
+        try:
+            return [future.result() for future in futures]
+        except JobCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+
+def summarize_batch(summaries):
+    """Combine per-archive summaries into batch totals"""
+    return {
+        'archives': len(summaries),
+        'failed': sum(1 for s in summaries if s['status'] != 'ok'),
+        'total': sum(s['total'] for s in summaries),
+        'matched': sum(s['matched'] for s in summaries),
+        'unmatched': sum(s['unmatched'] for s in summaries),
+        'ambiguous': sum(s['ambiguous'] for s in summaries),
+        'duplicates': sum(s['duplicates'] for s in summaries),
+        'collisions': sum(s['collisions'] for s in summaries),
+        'output_bytes': sum(os.path.getsize(p) for s in summaries for p in s['output_parts'] if os.path.exists(p)),
+    }
@@ -0,0 +1,135 @@
+"""
+INDOARSIP - Shared caches
+Bounded in-memory caches shared by every session of the process: file contents
+for downloads, and immutable parsed artefacts (reference indexes, scans of
+uploads) keyed by content hash
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Byte budget of the cache for individual downloads (all sessions together)
+FILE_CACHE_MAX_BYTES = int(os.environ.get('INDOARSIP_FILE_CACHE_MB', '256')) * 1024 * 1024
+
+# Byte budget of the parsed artefacts shared between sessions
+SHARED_CACHE_MAX_BYTES = int(os.environ.get('INDOARSIP_SHARED_CACHE_MB', '512')) * 1024 * 1024
+
+def estimate_size(value):
+    """Approximate memory footprint of value in bytes
+
+    Dicts, lists, tuples and sets are walked, objects reached twice are
+    counted once; objects with an nbytes attribute (Arrow tables, manifests)
+    report their own size.
+    """
+    total = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        nbytes = getattr(item, 'nbytes', None)
+        if isinstance(nbytes, int):
+            total += nbytes
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+class ByteLRUCache:
+    """LRU cache bounded by total bytes instead of entries
+
+    Values must be immutable once cached: every session gets the same
+    object. Concurrent misses on one key wait for a single load
+    (single-flight); the loader runs outside the lock, so a slow load never
+    blocks hits on other keys. None is returned but not cached.
+    """
+    
+    def __init__(self, max_bytes=FILE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._loading = {}  # key -> Event set once its load finished
+        # Used from the script thread, download handlers and the job pool
+        self._lock = threading.Lock()
+    
+    def get(self, key, loader, size_of=len):
+        """Return the cached value for key, calling loader() on a miss
+
+        size_of(value) gives the size counted against max_bytes (len for
+        bytes; see estimate_size for parsed objects).
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is loading this key; retry once it is done (or failed)
+            pending.wait()
+        
+        try:
+            value = loader()
+            size = size_of(value) if value is not None else 0
+            with self._lock:
+                if value is not None and size <= self.max_bytes:
+                    self._entries[key] = (value, size)
+                    self.current_bytes += size
+                    self._evict_until(self.max_bytes)
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+    
+    def trim(self, max_bytes):
+        """Evict least recently used values until at most max_bytes are cached; returns the bytes freed"""
+        with self._lock:
+            return self._evict_until(max_bytes)
+    
+    def _evict_until(self, max_bytes):
+        """Drop least recently used entries until current_bytes <= max_bytes (lock held)"""
+        freed = 0
+        while self._entries and self.current_bytes > max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            freed += evicted_size
+            self.evictions += 1
+        return freed
+    
+    def clear(self):
+        """Drop all cached values (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self):
+        """Return hit/miss/eviction counters and current usage"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+# Shared by every session of the process
+file_cache = ByteLRUCache(FILE_CACHE_MAX_BYTES)
+artefact_cache = ByteLRUCache(SHARED_CACHE_MAX_BYTES)
@@ -0,0 +1,255 @@
+"""
+INDOARSIP - Reference catalog
+Excel registers imported once into an indexed SQLite store, versioned by
+content hash and selected by name; matching queries the store's index
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from .matching import PREFIX_SENTINEL, extract_leading_code
+from .reference import content_hash, read_excel_headers, read_file_bytes, read_reference_column
+from .suggest import SuggestionIndex
+
+# Shared by every session and by the CLI of this server
+CATALOG_PATH = os.environ.get(
+    'INDOARSIP_CATALOG_PATH',
+    os.path.join(os.path.expanduser('~'), '.indoarsip', 'referensi.sqlite3')
+)
+
+# Opened register versions kept in memory (with their leading codes for suggestions)
+OPEN_REGISTERS_MAX = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS registers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    source_name TEXT,
+    row_count INTEGER NOT NULL,
+    imported_at TEXT NOT NULL,
+    UNIQUE (name, content_hash, column_name)
+);
+CREATE TABLE IF NOT EXISTS reference_values (
+    register_id INTEGER NOT NULL REFERENCES registers (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    leading TEXT NOT NULL,
+    PRIMARY KEY (register_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS reference_values_value ON reference_values (register_id, value, position);
+CREATE INDEX IF NOT EXISTS reference_values_leading ON reference_values (register_id, leading, position);
+"""
+
+REGISTER_COLUMNS = "id, name, column_name, content_hash, source_name, row_count, imported_at"
+
+_open_registers = OrderedDict()
+_open_registers_lock = threading.Lock()
+
+def connect(catalog_path=None):
+    """Open the catalog, creating it on first use"""
+    catalog_path = catalog_path or CATALOG_PATH
+    directory = os.path.dirname(os.path.abspath(catalog_path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(catalog_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # Readers (matching jobs) never wait for an import
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def import_register(excel_file, column, name, catalog_path=None):
+    """Import the reference column of an Excel register under name
+
+    A register version is identified by its content hash and column, so
+    importing the same file again only returns the stored version.
+    Returns the register dict, or None if the column does not exist.
+    """
+    data = read_file_bytes(excel_file)
+    digest = content_hash(data)
+    with closing(connect(catalog_path)) as conn:
+        row = conn.execute(
+            f"SELECT {REGISTER_COLUMNS} FROM registers WHERE name = ? AND content_hash = ? AND column_name = ?",
+            (name, digest, column)
+        ).fetchone()
+        if row is not None:
+            return dict(row)
+
+        values = read_reference_column(data, column)
+        if values is None:
+            return None
+        # Same unique, stripped values as build_reference_index, in Excel order
+        unique_values = list(dict.fromkeys(str(value).strip() for value in values))
+
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO registers (name, column_name, content_hash, source_name, row_count, imported_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, column, digest, getattr(excel_file, 'name', str(excel_file)), len(unique_values),
+                 time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            register_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO reference_values (register_id, position, value, leading) VALUES (?, ?, ?, ?)",
+                ((register_id, position, value, extract_leading_code(value)) for position, value in enumerate(unique_values))
+            )
+        return dict(conn.execute(f"SELECT {REGISTER_COLUMNS} FROM registers WHERE id = ?", (register_id,)).fetchone())
+
+def list_registers(catalog_path=None):
+    """Latest version of every register, by name"""
+    with closing(connect(catalog_path)) as conn:
+        rows = conn.execute(
+            f"SELECT {REGISTER_COLUMNS} FROM registers WHERE id IN (SELECT max(id) FROM registers GROUP BY name) ORDER BY name"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def list_register_versions(name, catalog_path=None):
+    """Every stored version of a register, newest first"""
+    with closing(connect(catalog_path)) as conn:
+        rows = conn.execute(
+            f"SELECT {REGISTER_COLUMNS} FROM registers WHERE name = ? ORDER BY id DESC", (name,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def open_register(name, content_hash=None, catalog_path=None):
+    """CatalogIndex of a register version (the latest by default), or None if unknown"""
+    with closing(connect(catalog_path)) as conn:
+        if content_hash is None:
+            row = conn.execute(
+                f"SELECT {REGISTER_COLUMNS} FROM registers WHERE name = ? ORDER BY id DESC LIMIT 1", (name,)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                f"SELECT {REGISTER_COLUMNS} FROM registers WHERE name = ? AND content_hash = ? ORDER BY id DESC LIMIT 1",
+                (name, content_hash)
+            ).fetchone()
+    if row is None:
+        return None
+    return register_index(dict(row), catalog_path)
+
+def register_index(register, catalog_path=None):
+    """CatalogIndex of a register dict (from import_register or list_registers), kept open"""
+    key = (catalog_path or CATALOG_PATH, register['id'])
+    with _open_registers_lock:
+        if key not in _open_registers:
+            _open_registers[key] = CatalogIndex(register, catalog_path)
+            while len(_open_registers) > OPEN_REGISTERS_MAX:
+                _open_registers.popitem(last=False)
+        _open_registers.move_to_end(key)
+        return _open_registers[key]
+
+class CatalogIndex:
+    """Reference index backed by one register version of the catalog
+
+    Accepted wherever a build_reference_index dict is: matching sends every
+    distinct file code in one query to the store's indexes.
+    """
+
+    def __init__(self, register, catalog_path=None):
+        self.register = register
+        self.catalog_path = catalog_path
+        self._suggestion_index = None
+        self._lock = threading.Lock()
+
+    def lookup_many(self, codes, mode='first'):
+        """Same result as lookup_reference for every code: {code: (reference or None, candidates)}"""
+        codes = list(codes)
+        if not codes:
+            return {}
+        with closing(connect(self.catalog_path)) as conn:
+            conn.execute("CREATE TEMP TABLE lookup_keys (key TEXT PRIMARY KEY)")
+            if mode == 'longest':
+                # Every prefix of every code, resolved by the longest one with a leading-code match
+                prefixes = {code: [code[:end] for end in range(len(code), 0, -1)] for code in codes}
+                keys = {prefix for code_prefixes in prefixes.values() for prefix in code_prefixes}
+                found = self._query(conn, keys, 'leading')
+                results = {}
+                for code, code_prefixes in prefixes.items():
+                    results[code] = next((found[p] for p in code_prefixes if found[p][0] is not None), (None, 0))
+                return results
+            return self._query(conn, codes, 'leading' if mode == 'exact' else 'prefix')
+
+    def _query(self, conn, keys, match):
+        """First reference (Excel order) and number of references per key"""
+        conn.execute("DELETE FROM lookup_keys")
+        conn.executemany("INSERT OR IGNORE INTO lookup_keys (key) VALUES (?)", ((key,) for key in keys))
+        if match == 'leading':
+            index_name = "reference_values_leading"
+            condition = "r.leading = k.key"
+            parameters = (self.register['id'],) * 2
+        else:
+            # value >= key AND value < key + highest code point: every value starting with key
+            index_name = "reference_values_value"
+            condition = "r.value >= k.key AND r.value < k.key || ?"
+            parameters = (self.register['id'], PREFIX_SENTINEL) * 2
+        # Without INDEXED BY, SQLite may walk the whole register in position order for the LIMIT 1
+        rows = conn.execute(
+            f"SELECT k.key, "
+            f"(SELECT r.value FROM reference_values r INDEXED BY {index_name} "
+            f"WHERE r.register_id = ? AND {condition} ORDER BY r.position LIMIT 1), "
+            f"(SELECT count(*) FROM reference_values r INDEXED BY {index_name} WHERE r.register_id = ? AND {condition}) "
+            f"FROM lookup_keys k",
+            parameters
+        ).fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def suggestion_index(self):
+        """SuggestionIndex over this register, read from the store once"""
+        with self._lock:
+            if self._suggestion_index is None:
+                leading = {}
+                with closing(connect(self.catalog_path)) as conn:
+                    rows = conn.execute(
+                        "SELECT leading, value FROM reference_values WHERE register_id = ? ORDER BY position",
+                        (self.register['id'],)
+                    )
+                    for row in rows:
+                        leading.setdefault(row[0], []).append(row[1])
+                self._suggestion_index = SuggestionIndex({'leading': leading})
+            return self._suggestion_index
+
+def build_parser():
+    """Build the argument parser for catalog management"""
+    parser = argparse.ArgumentParser(
+        prog="python -m indoarsip.catalog",
+        description="INDOARSIP - Katalog referensi (register Excel yang disimpan sekali dan dipakai ulang)"
+    )
+    parser.add_argument("--catalog", default=None, help=f"Lokasi file katalog (default: env INDOARSIP_CATALOG_PATH atau {CATALOG_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_command = commands.add_parser("import", help="Impor kolom referensi dari file Excel")
+    import_command.add_argument("name", help="Nama register di katalog")
+    import_command.add_argument("excel", help="File Excel referensi penamaan")
+    import_command.add_argument("column", help="Nama kolom referensi arsip di Excel")
+    commands.add_parser("list", help="Tampilkan register yang tersimpan (versi terbaru)")
+    versions_command = commands.add_parser("versions", help="Tampilkan semua versi satu register")
+    versions_command.add_argument("name", help="Nama register di katalog")
+    return parser
+
+def main(argv=None):
+    """Manage the reference catalog; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    if args.command == "import":
+        register = import_register(args.excel, args.column, args.name, args.catalog)
+        if register is None:
+            print(f"❌ Kolom '{args.column}' tidak ditemukan dalam file Excel!", file=sys.stderr)
+            print(f"📋 Kolom yang tersedia: {', '.join(read_excel_headers(args.excel))}", file=sys.stderr)
+            return 2
+        print(f"✅ {register['name']} versi {register['content_hash'][:12]} - {register['row_count']} data referensi")
+        return 0
+
+    registers = list_registers(args.catalog) if args.command == "list" else list_register_versions(args.name, args.catalog)
+    for register in registers:
+        print(f"{register['name']}\t{register['content_hash'][:12]}\t{register['column_name']}\t"
+              f"{register['row_count']}\t{register['imported_at']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
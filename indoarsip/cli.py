@@ -0,0 +1,113 @@
+"""
+INDOARSIP - Command line entry point
+Batch rename one or more archives (ZIP, TAR / TAR.GZ or directory) against
+an Excel reference column, without a browser. Examples:
+
+    python -m indoarsip arsip.zip referensi.xlsx Nomor_Arsip -o hasil/
+    python -m indoarsip scan_vendor.tar.gz referensi.xlsx Nomor_Arsip -o hasil/
+    python -m indoarsip a.zip b.zip c.zip referensi.xlsx Nomor_Arsip -o hasil/ --workers 2
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+
+from .instrumentation import JobMetrics
+from .batch import BATCH_WORKERS, run_batch, summarize_batch
+from .matching import MATCH_MODES, compile_code_patterns
+from .reference import load_reference_values, read_excel_headers
+
+def build_parser():
+    """Build the argument parser for the CLI"""
+    parser = argparse.ArgumentParser(
+        prog="python -m indoarsip",
+        description="INDOARSIP - Sistem Otomatis Penamaan Arsip Digital (batch mode)"
+    )
+    parser.add_argument("sources", nargs="+", help="File ZIP / TAR / TAR.GZ arsip atau folder berisi file arsip (boleh lebih dari satu)")
+    parser.add_argument("excel", help="File Excel referensi penamaan")
+    parser.add_argument("column", help="Nama kolom referensi arsip di Excel")
+    parser.add_argument("-o", "--output-dir", default=".", help="Folder tujuan ZIP hasil rename dan laporan (default: folder saat ini); satu subfolder per arsip bila lebih dari satu")
+    parser.add_argument("--mode", choices=list(MATCH_MODES), default="first", help="Mode pencocokan kode (default: first)")
+    parser.add_argument("--pattern", action="append", dest="patterns", metavar="REGEX", help="Pola kode di nama file, boleh diulang; grup pertama = kode (default: pola bawaan)")
+    parser.add_argument("--part-size-mb", type=int, default=0, help="Pecah ZIP hasil per ukuran ini dalam MB (0 = tidak dipecah)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help=f"Jumlah arsip yang diproses bersamaan (default: {BATCH_WORKERS})")
+    parser.add_argument("--metrics", action="store_true", help="Tulis waktu & memori per tahap sebagai satu baris JSON ke stderr")
+    return parser
+
+def print_archive_summary(summary):
+    """Print the result of one archive"""
+    print(f"Total Arsip: {summary['total']}")
+    print(f"Arsip Cocok: {summary['matched']}")
+    print(f"Arsip Tidak Cocok: {summary['unmatched']}")
+    if summary['ambiguous']:
+        print(f"Kode Ambigu: {summary['ambiguous']}")
+    if summary['duplicates']:
+        print(f"Duplikat Tidak Disimpan: {summary['duplicates']}")
+    if summary['collisions']:
+        print(f"Nama Bentrok Diberi Nomor: {summary['collisions']}")
+    for part_path in summary['output_parts']:
+        print(f"📦 {part_path}")
+    if summary['report_path']:
+        print(f"📄 {summary['report_path']}")
+
+def main(argv=None):
+    """Run one rename job per source archive; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        # One JSON line per job on stderr
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    
+    try:
+        patterns = compile_code_patterns(args.patterns)
+    except re.error as e:
+        print(f"❌ Pola kode tidak valid: {e}", file=sys.stderr)
+        return 2
+    
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"❌ Sumber arsip tidak ditemukan: {source}", file=sys.stderr)
+            return 2
+    
+    metrics = JobMetrics('cli', sources=len(args.sources), match_mode=args.mode)
+    with metrics.stage('read_reference') as stage:
+        reference_values = load_reference_values(args.excel, args.column)
+        stage['items'] = len(reference_values or [])
+        stage['bytes'] = os.path.getsize(args.excel)
+    if reference_values is None:
+        print(f"❌ Kolom '{args.column}' tidak ditemukan dalam file Excel!", file=sys.stderr)
+        print(f"📋 Kolom yang tersedia: {', '.join(read_excel_headers(args.excel))}", file=sys.stderr)
+        return 2
+    
+    with metrics.stage('batch') as stage:
+        # A single archive keeps writing straight into the output folder
+        summaries = run_batch(
+            [(source, source) for source in args.sources], reference_values, args.output_dir,
+            mode=args.mode, patterns=patterns, part_size=args.part_size_mb * 1024 * 1024 or None,
+            max_workers=args.workers, flat=len(args.sources) == 1
+        )
+        stage['items'] = len(summaries)
+    metrics.log()
+    
+    if len(summaries) == 1:
+        summary = summaries[0]
+        if summary['status'] != 'ok':
+            print(f"❌ Gagal memproses {summary['archive']}: {summary['error']}", file=sys.stderr)
+            return 1
+        print_archive_summary(summary)
+        return 0
+    
+    for summary in summaries:
+        print(f"== {summary['archive']} ({summary['seconds']} detik)")
+        if summary['status'] != 'ok':
+            print(f"❌ Gagal: {summary['error']}")
+            continue
+        print_archive_summary(summary)
+    totals = summarize_batch(summaries)
+    print("== Ringkasan")
+    print(f"Arsip Diproses: {totals['archives']} (gagal: {totals['failed']})")
+    print(f"Total Arsip: {totals['total']}")
+    print(f"Arsip Cocok: {totals['matched']}")
+    print(f"Arsip Tidak Cocok: {totals['unmatched']}")
+    return 1 if totals['failed'] else 0
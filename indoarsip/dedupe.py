@@ -0,0 +1,166 @@
+"""
+INDOARSIP - Duplicate detection
+Files that end up with the same new name: identical copies are stored once,
+different contents get a numbered name, and both are listed in the report
+"""
+
+import hashlib
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .archive import source_view
+from .reference import HASH_CHUNK_SIZE
+
+# Hashing threads (hashlib and zlib release the GIL on large buffers)
+HASH_WORKERS = int(os.environ.get('INDOARSIP_HASH_WORKERS', str(os.cpu_count() or 1)))
+
+# Status values listed in the report
+DUPLICATE = 'Duplikat (tidak disimpan)'
+NAME_COLLISION = 'Nama Bentrok (diberi nomor)'
+
+def hash_file(stream, progress=None):
+    """SHA-256 of an open binary stream, read in chunks"""
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        if progress is not None:
+            progress.advance(nbytes=len(chunk))
+    return digest.hexdigest()
+
+def hash_files(file_keys, source_zip=None, workers=None, progress=None):
+    """Hash ZIP members or files on disk in parallel; returns {file_key: sha256}
+
+    Every thread gets its own handle on the ZIP (a view of its bytes for an
+    upload, see source_view). Other ZIP file objects cannot be shared
+    between threads and are hashed sequentially.
+    """
+    file_keys = list(file_keys)
+    if not file_keys:
+        return {}
+    
+    if source_zip is not None and not isinstance(source_zip, (str, os.PathLike)) and not hasattr(source_zip, 'getbuffer'):
+        with zipfile.ZipFile(source_zip, 'r') as zip_ref:
+            hashes = {}
+            for file_key in file_keys:
+                with zip_ref.open(file_key) as stream:
+                    hashes[file_key] = hash_file(stream, progress)
+                if progress is not None:
+                    progress.advance(files=1)
+            return hashes
+    
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    
+    def hash_one(file_key):
+        if source_zip is None:
+            with open(file_key, 'rb') as stream:
+                digest = hash_file(stream, progress)
+        else:
+            if not hasattr(local, 'zip_ref'):
+                # Parse the central directory once per thread, not once per file
+                local.zip_ref = zipfile.ZipFile(source_view(source_zip), 'r')
+                with handles_lock:
+                    handles.append(local.zip_ref)
+            with local.zip_ref.open(file_key) as stream:
+                digest = hash_file(stream, progress)
+        if progress is not None:
+            progress.advance(files=1)
+        return digest
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers or HASH_WORKERS, thread_name_prefix='indoarsip-hash') as executor:
+            return dict(zip(file_keys, executor.map(hash_one, file_keys)))
+    finally:
+        for zip_ref in handles:
+            zip_ref.close()
+
+def numbered_name(new_name, used_names):
+    """First free name_2.ext, name_3.ext, ... for a colliding target name"""
+    stem, extension = os.path.splitext(new_name)
+    number = 2
+    while f"{stem}_{number}{extension}" in used_names:
+        number += 1
+    return f"{stem}_{number}{extension}"
+
+def resolve_duplicates(file_mapping, source_zip=None, file_sizes=None, workers=None, progress=None):
+    """Find files mapped to the same target name and resolve them
+
+    Only files sharing a target name are compared: first by size (and CRC
+    for ZIP members), then by SHA-256 when those are equal. Identical copies
+    are dropped, files with different content get a numbered name.
+    Returns (output_mapping, duplicates): the mapping to write and one dict
+    per dropped or renamed file (file, target, same_as, status).
+    """
+    groups = {}
+    for file_key, new_name in file_mapping.items():
+        groups.setdefault(new_name, []).append(file_key)
+    colliding = [file_keys for file_keys in groups.values() if len(file_keys) > 1]
+    if not colliding:
+        return dict(file_mapping), []
+    
+    # Cheap fingerprint first, from the central directory or the scan
+    fingerprints = {}
+    if source_zip is not None:
+        with zipfile.ZipFile(source_view(source_zip), 'r') as zip_ref:
+            for file_keys in colliding:
+                for file_key in file_keys:
+                    info = zip_ref.getinfo(file_key)
+                    fingerprints[file_key] = (info.file_size, info.CRC)
+    else:
+        known = file_sizes or {}
+        for file_keys in colliding:
+            for file_key in file_keys:
+                fingerprints[file_key] = (known[file_key] if file_key in known else os.path.getsize(file_key),)
+    
+    # Hash only files whose fingerprint is shared within their group
+    to_hash = []
+    for file_keys in colliding:
+        counts = {}
+        for file_key in file_keys:
+            counts[fingerprints[file_key]] = counts.get(fingerprints[file_key], 0) + 1
+        to_hash.extend(file_key for file_key in file_keys if counts[fingerprints[file_key]] > 1)
+    if progress is not None:
+        progress.set_stage('dedupe', files_total=len(to_hash), bytes_total=sum(fingerprints[k][0] for k in to_hash))
+    hashes = hash_files(to_hash, source_zip, workers, progress)
+    
+    targets = {}
+    duplicates = []
+    used_names = set(file_mapping.values())
+    for file_keys in colliding:
+        kept = {}  # content -> file kept for it
+        for file_key in file_keys:
+            content = hashes.get(file_key, fingerprints[file_key])
+            if content in kept:
+                duplicates.append({
+                    'file': file_key,
+                    'target': targets[kept[content]],
+                    'same_as': kept[content],
+                    'status': DUPLICATE,
+                })
+                continue
+            if not kept:
+                targets[file_key] = file_mapping[file_key]
+            else:
+                targets[file_key] = numbered_name(file_mapping[file_key], used_names)
+                used_names.add(targets[file_key])
+                duplicates.append({
+                    'file': file_key,
+                    'target': targets[file_key],
+                    'same_as': None,
+                    'status': NAME_COLLISION,
+                })
+            kept[content] = file_key
+    
+    output_mapping = {}
+    for file_key, new_name in file_mapping.items():
+        if len(groups[new_name]) == 1:
+            output_mapping[file_key] = new_name
+        elif file_key in targets:
+            output_mapping[file_key] = targets[file_key]
+    return output_mapping, duplicates
@@ -0,0 +1,135 @@
+"""
+INDOARSIP - Job instrumentation
+Wall time, bytes processed and memory per pipeline stage, logged as one JSON line per job
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+logger = logging.getLogger('indoarsip')
+
+# How often the resident memory is sampled while a stage runs
+RSS_SAMPLE_SECONDS = float(os.environ.get('INDOARSIP_RSS_SAMPLE_SECONDS', '0.05'))
+
+def current_rss_bytes():
+    """Return the resident memory of this process, or None if unknown"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, AttributeError, ValueError, IndexError):
+        return None
+
+def memory_limit_bytes():
+    """Return the memory available to this process (cgroup limit, else physical memory), or None"""
+    # cgroup v2, then v1; 'max' or a huge v1 value means no container limit
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                limit = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if limit < 1 << 60:
+            return limit
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def peak_rss_bytes():
+    """Return the highest resident memory of this process since it started, or None if unknown"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class RssSampler:
+    """Samples current_rss_bytes() on a thread while active; peak_bytes is the highest seen
+
+    Unlike peak_rss_bytes(), the peak only covers the time the sampler ran.
+    """
+    
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak_bytes = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, rss)
+    
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def __enter__(self):
+        if self.peak_bytes is not None:  # Nothing to sample otherwise
+            self._thread = threading.Thread(target=self._loop, name='indoarsip-rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._sample()
+
+class JobMetrics:
+    """Per-stage measurements of one job (validation, rename, CLI run...)"""
+    
+    def __init__(self, job, job_id=None, **fields):
+        self.job = job
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.fields = fields
+        self.stages = []
+        self.started = time.perf_counter()
+    
+    @contextmanager
+    def stage(self, name):
+        """Measure a stage; the yielded dict takes 'bytes' and 'items' set by the caller
+
+        peak_rss_bytes is the highest resident memory sampled while the stage
+        ran (the whole process, so concurrent jobs are included).
+        """
+        record = {'stage': name, 'bytes': 0, 'items': 0}
+        rss_before = current_rss_bytes()
+        sampler = RssSampler()
+        started = time.perf_counter()
+        try:
+            with sampler:
+                yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - started, 4)
+            rss_after = current_rss_bytes()
+            if rss_before is not None and rss_after is not None:
+                record['rss_delta_bytes'] = rss_after - rss_before
+            record['peak_rss_bytes'] = sampler.peak_bytes
+            self.stages.append(record)
+    
+    def summary(self):
+        """Return the whole job as one JSON-serialisable dict"""
+        return {
+            'job': self.job,
+            'job_id': self.job_id,
+            **self.fields,
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'process_peak_rss_bytes': peak_rss_bytes(),  # Since the process started
+            'stages': self.stages,
+        }
+    
+    def log(self):
+        """Emit the job summary as a single structured log line"""
+        summary = self.summary()
+        logger.info(json.dumps(summary, ensure_ascii=False))
+        return summary
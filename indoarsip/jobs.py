@@ -0,0 +1,277 @@
+"""
+INDOARSIP - Background jobs
+Runs long stages (validation, output build) on a worker pool, with per-file and
+per-byte progress, cancellation, lookup by job id across reruns/reconnects,
+and admission control against the memory and CPU budget of the process
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import artefact_cache, file_cache
+from .instrumentation import current_rss_bytes, memory_limit_bytes
+
+# Jobs running at the same time in this process
+JOB_WORKERS = int(os.environ.get('INDOARSIP_JOB_WORKERS', '2'))
+
+# Finished jobs are kept this long so a reconnecting browser can still fetch them
+JOB_RETENTION_SECONDS = int(os.environ.get('INDOARSIP_JOB_RETENTION_SECONDS', '3600'))
+
+# A job waits before starting while another one runs and the process uses more
+# memory than this (0 = no limit); default 80% of the container or machine memory
+_max_rss_mb = os.environ.get('INDOARSIP_ADMISSION_MAX_RSS_MB')
+ADMISSION_MAX_RSS_BYTES = (
+    int(_max_rss_mb) * 1024 * 1024 if _max_rss_mb is not None
+    else int((memory_limit_bytes() or 0) * 0.8)
+)
+
+# Same for the 1-minute load average per CPU (0 = ignored)
+ADMISSION_MAX_LOAD = float(os.environ.get('INDOARSIP_ADMISSION_MAX_LOAD', '0'))
+
+# New jobs are rejected once this many are waiting to start (0 = no limit)
+ADMISSION_MAX_QUEUED = int(os.environ.get('INDOARSIP_ADMISSION_MAX_QUEUED', '16'))
+
+# A job still waiting for capacity after this long fails instead of waiting forever
+ADMISSION_MAX_WAIT_SECONDS = int(os.environ.get('INDOARSIP_ADMISSION_MAX_WAIT_SECONDS', '900'))
+
+# Share of their byte budget the shared caches are trimmed to when a job waits for memory
+ADMISSION_CACHE_TRIM_FRACTION = float(os.environ.get('INDOARSIP_ADMISSION_CACHE_TRIM_FRACTION', '0.5'))
+
+ADMISSION_POLL_SECONDS = 0.5
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancellation was requested"""
+
+class JobRejected(Exception):
+    """Raised by submit() when the server is too busy to queue another job"""
+
+class Job:
+    """State and progress of one background job"""
+    
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.stage = None
+        self.files_done = 0
+        self.files_total = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+    
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+    
+    def set_stage(self, stage, files_total=None, bytes_total=None):
+        """Start a new stage; its counters restart from zero"""
+        with self._lock:
+            self.stage = stage
+            self.files_done = 0
+            self.bytes_done = 0
+            if files_total is not None:
+                self.files_total = files_total
+            if bytes_total is not None:
+                self.bytes_total = bytes_total
+        self.check_cancelled()
+    
+    def advance(self, files=0, nbytes=0):
+        """Report progress; raises JobCancelled if the job should stop"""
+        with self._lock:
+            self.files_done += files
+            self.bytes_done += nbytes
+        self.check_cancelled()
+    
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.id)
+    
+    def fraction(self):
+        """Progress of the current stage between 0 and 1 (by bytes, else by files)"""
+        with self._lock:
+            if self.bytes_total:
+                return min(1.0, self.bytes_done / self.bytes_total)
+            if self.files_total:
+                return min(1.0, self.files_done / self.files_total)
+            return 0.0
+    
+    def snapshot(self):
+        """Return a consistent copy of the progress counters"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'stage': self.stage,
+                'files_done': self.files_done,
+                'files_total': self.files_total,
+                'bytes_done': self.bytes_done,
+                'bytes_total': self.bytes_total,
+                'error': self.error,
+            }
+
+class JobManager:
+    """Process-wide worker pool and registry of jobs by id
+
+    Every job (scan, matching, output build) is heavy. One starts right away
+    when no other job runs; otherwise it waits, in stage 'waiting_capacity',
+    until the process is back under max_rss_bytes and max_load. When memory
+    is the reason, the shared caches are first trimmed to
+    ADMISSION_CACHE_TRIM_FRACTION of their budget (least recently used
+    entries go; the rest stays shared). Once max_queued jobs are
+    waiting, submit() raises JobRejected instead of growing the queue.
+    """
+    
+    def __init__(self, workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS,
+                 max_rss_bytes=ADMISSION_MAX_RSS_BYTES, max_load=ADMISSION_MAX_LOAD,
+                 max_queued=ADMISSION_MAX_QUEUED, max_wait_seconds=ADMISSION_MAX_WAIT_SECONDS):
+        self.retention_seconds = retention_seconds
+        self.max_rss_bytes = max_rss_bytes
+        self.max_load = max_load
+        self.max_queued = max_queued
+        self.max_wait_seconds = max_wait_seconds
+        self.rejections = 0
+        self._running = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='indoarsip-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, kind, function, *args, **kwargs):
+        """Queue function(job, *args, **kwargs); returns the Job right away
+
+        Raises JobRejected when max_queued jobs are already waiting to start.
+        """
+        self.prune()
+        job = Job(kind)
+        with self._lock:
+            waiting = sum(1 for queued in self._jobs.values() if queued.status == 'queued')
+            if self.max_queued and waiting >= self.max_queued:
+                self.rejections += 1
+                raise JobRejected(f"Server lagi sibuk ({waiting} proses antre), coba lagi beberapa saat lagi")
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, function, args, kwargs)
+        return job
+    
+    def over_budget(self):
+        """Why the process cannot start another job now ('memori' or 'CPU'), or None"""
+        if self.max_rss_bytes:
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.max_rss_bytes:
+                return 'memori'
+        if self.max_load and hasattr(os, 'getloadavg'):
+            if os.getloadavg()[0] / (os.cpu_count() or 1) > self.max_load:
+                return 'CPU'
+        return None
+    
+    def _admit(self, job):
+        """Wait until job may run; raises JobCancelled, or JobRejected after max_wait_seconds"""
+        deadline = time.time() + self.max_wait_seconds
+        caches_trimmed = False
+        while True:
+            with self._lock:
+                # A job alone always runs, so an over-budget baseline never blocks the server
+                reason = self.over_budget() if self._running else None
+                if reason is None:
+                    self._running += 1
+                    return
+            if reason == 'memori' and not caches_trimmed:
+                # Freeing memory does not help against CPU load
+                for cache in (artefact_cache, file_cache):
+                    cache.trim(int(cache.max_bytes * ADMISSION_CACHE_TRIM_FRACTION))
+                caches_trimmed = True
+                continue
+            if job.stage != 'waiting_capacity':
+                job.set_stage('waiting_capacity', files_total=0, bytes_total=0)
+            if time.time() > deadline:
+                raise JobRejected(f"Server kehabisan kapasitas {reason} terlalu lama, coba lagi nanti")
+            job._cancel_event.wait(ADMISSION_POLL_SECONDS)
+            job.check_cancelled()
+    
+    def _run(self, job, function, args, kwargs):
+        if job.cancel_requested:
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+            return
+        try:
+            self._admit(job)
+        except JobCancelled:
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+            return
+        except JobRejected as e:
+            job.error = str(e)
+            job.status = 'failed'
+            job.finished_at = time.time()
+            return
+        job.status = 'running'
+        try:
+            job.result = function(job, *args, **kwargs)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+            job.traceback = traceback.format_exc()
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+    
+    def get(self, job_id):
+        """Return the job with this id, or None if unknown or pruned"""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """Request cancellation; a running job stops at its next progress report"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+        return True
+    
+    def active_count(self):
+        """Number of queued or running jobs"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+    
+    def admission(self):
+        """Current load against the budget: running, queued, rss_bytes, max_rss_bytes, rejections"""
+        with self._lock:
+            return {
+                'running': self._running,
+                'queued': sum(1 for job in self._jobs.values() if job.status == 'queued'),
+                'rss_bytes': current_rss_bytes(),
+                'max_rss_bytes': self.max_rss_bytes,
+                'rejections': self.rejections,
+            }
+    
+    def prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job.finished and job.finished_at and job.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+# Shared by every session of the process
+job_manager = JobManager()
@@ -0,0 +1,183 @@
+"""
+INDOARSIP - File manifest
+One columnar (Arrow) table per upload: where every file is, its size, code,
+match status and target name, instead of parallel lists and dicts of paths
+"""
+
+import os
+
+# Values of the candidates column
+UNMATCHED = 0
+MATCHED = 1  # Ambiguous files have more than one candidate
+
+def split_file_key(file_key):
+    """(directory with its trailing separator, name) of a path or ZIP member name"""
+    cut = max(file_key.rfind('/'), file_key.rfind(os.sep)) + 1
+    return file_key[:cut], file_key[cut:]
+
+def joined_file_keys(table):
+    """directory + name of every row of a manifest table, as an Arrow array"""
+    import pyarrow.compute as pc  # Imported lazily, the CLI and watch mode never build a manifest
+    return pc.binary_join_element_wise(pc.cast(table['directory'], 'string'), table['name'], '')
+
+class FileManifest:
+    """Columnar manifest of the files of one upload
+
+    Columns: directory (dictionary-encoded, so a folder or the spill prefix
+    is stored once), name and size from the scan; code, candidates, target
+    and suggestions after matching; output_name after the output build
+    (null for files not written). Every step returns a new manifest sharing
+    the unchanged columns: Arrow buffers are immutable, nothing is copied.
+    A file key (ZIP member name or path on disk) is directory + name.
+    """
+    
+    def __init__(self, table):
+        self.table = table
+    
+    @classmethod
+    def from_files(cls, file_keys, sizes):
+        """Manifest of scanned files, in scan order"""
+        import pyarrow as pa
+        
+        directories = []
+        names = []
+        for file_key in file_keys:
+            directory, name = split_file_key(file_key)
+            directories.append(directory)
+            names.append(name)
+        return cls(pa.table({
+            'directory': pa.array(directories, pa.string()).dictionary_encode(),
+            'name': pa.array(names, pa.string()),
+            'size': pa.array(sizes, pa.int64()),
+        }))
+    
+    def __len__(self):
+        return self.table.num_rows
+    
+    @property
+    def nbytes(self):
+        """Memory used by the table buffers (see indoarsip.cache.estimate_size)"""
+        return self.table.nbytes
+    
+    def file_keys(self, where=None):
+        """File keys of every row, or of the rows where is true"""
+        table = self.table if where is None else self.table.filter(where)
+        return joined_file_keys(table).to_pylist()
+    
+    def with_matches(self, codes, rename_map, ambiguous, suggestions):
+        """New manifest with the result of match_files_with_reference and suggest_for_unmatched"""
+        import pyarrow as pa
+        
+        file_keys = self.file_keys()
+        suggestion_type = pa.list_(pa.struct([('reference', pa.string()), ('distance', pa.int32())]))
+        columns = {
+            'code': pa.array([codes[file_key] for file_key in file_keys], pa.string()),
+            'candidates': pa.array(
+                [ambiguous.get(file_key, MATCHED) if file_key in rename_map else UNMATCHED for file_key in file_keys],
+                pa.int32()
+            ),
+            'target': pa.array([rename_map.get(file_key) for file_key in file_keys], pa.string()),
+            'suggestions': pa.array(
+                [
+                    [{'reference': reference, 'distance': distance} for reference, distance in suggestions[file_key]]
+                    if file_key in suggestions else None
+                    for file_key in file_keys
+                ],
+                suggestion_type
+            ),
+        }
+        table = self.table
+        for name, column in columns.items():
+            table = table.append_column(name, column)
+        return FileManifest(table)
+    
+    def with_output(self, output_mapping):
+        """New manifest with the names written to the output (see resolve_duplicates)"""
+        import pyarrow as pa
+        
+        output_names = pa.array([output_mapping.get(file_key) for file_key in self.file_keys()], pa.string())
+        table = self.table
+        if 'output_name' in table.column_names:
+            table = table.drop_columns(['output_name'])
+        return FileManifest(table.append_column('output_name', output_names))
+    
+    def matched(self):
+        """Boolean mask of the files with a reference"""
+        import pyarrow.compute as pc
+        return pc.greater(self.table['candidates'], UNMATCHED)
+    
+    def unmatched(self):
+        """Boolean mask of the files without a reference"""
+        import pyarrow.compute as pc
+        return pc.equal(self.table['candidates'], UNMATCHED)
+    
+    def ambiguous(self):
+        """Boolean mask of the files whose code matched several references"""
+        import pyarrow.compute as pc
+        return pc.greater(self.table['candidates'], MATCHED)
+    
+    def count(self, where):
+        """Number of rows where the mask is true"""
+        import pyarrow.compute as pc
+        return pc.sum(where).as_py() or 0
+    
+    def total_size(self, where=None):
+        """Total size of every file, or of the rows where the mask is true"""
+        import pyarrow.compute as pc
+        sizes = self.table['size'] if where is None else self.table['size'].filter(where)
+        return pc.sum(sizes).as_py() or 0
+    
+    def rename_mapping(self):
+        """{file key: target name} of the matched files, for the output build"""
+        where = self.matched()
+        return dict(zip(self.file_keys(where), self.table['target'].filter(where).to_pylist()))
+    
+    def file_sizes(self):
+        """{file key: size} from the scan"""
+        return dict(zip(self.file_keys(), self.table['size'].to_pylist()))
+    
+    def unmatched_suggestions(self):
+        """{file key: [(reference, distance)]} of the unmatched files, for the report"""
+        where = self.unmatched()
+        return {
+            file_key: [(item['reference'], item['distance']) for item in items or []]
+            for file_key, items in zip(self.file_keys(where), self.table['suggestions'].filter(where).to_pylist())
+        }
+    
+    def search_output(self, query):
+        """Row indices of the written files whose new or original name contains query"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        where = pc.is_valid(self.table['output_name'])
+        query = query.strip()
+        if query:
+            where = pc.and_(where, pc.or_(
+                pc.match_substring(self.table['output_name'], query, ignore_case=True),
+                pc.match_substring(self.table['name'], query, ignore_case=True)
+            ))
+        return pc.indices_nonzero(pc.fill_null(where, False)).cast(pa.int64())
+    
+    def rows(self, indices):
+        """(row number, file key, output name) of some rows, e.g. one page of search_output"""
+        table = self.table.take(indices)
+        file_keys = joined_file_keys(table).to_pylist()
+        return list(zip((index + 1 for index in indices.to_pylist()), file_keys, table['output_name'].to_pylist()))
+    
+    def frame(self, columns, where=None):
+        """pandas DataFrame of some columns ({column: label}), numbered from 1
+
+        'path' is the full file key; the other names are manifest columns.
+        """
+        import pyarrow as pa
+        
+        table = self.table if where is None else self.table.filter(where)
+        data = {}
+        for column, label in columns.items():
+            if column == 'path':
+                data[label] = joined_file_keys(table)
+            else:
+                data[label] = table[column]
+        df = pa.table(data).to_pandas()
+        df.insert(0, 'No', range(1, len(df) + 1))
+        return df
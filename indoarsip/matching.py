@@ -0,0 +1,184 @@
+"""
+INDOARSIP - Reference matching
+Code extraction from filenames and indexed prefix matching against the reference column
+"""
+
+import bisect
+import os
+import re
+
+# Code patterns, tried in order; the first capture group of the first match is the code
+DEFAULT_CODE_PATTERNS = [
+    r'_(\d+)$',  # Numbers at the end (e.g., file_pelanggan_0336 -> 0336)
+    r'^(\d+)',   # Numbers at the beginning (e.g., 0336_document -> 0336)
+    r'(\d+)',    # Any sequence of digits (fallback)
+]
+
+def compile_code_patterns(patterns=None):
+    """Compile code patterns once per job (raises re.error on an invalid pattern)"""
+    if patterns is None:
+        return _DEFAULT_COMPILED_PATTERNS
+    compiled = []
+    for pattern in patterns:
+        regex = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
+        if regex.groups < 1:
+            raise re.error(f"pattern needs a capture group: {regex.pattern}")
+        compiled.append(regex)
+    return compiled
+
+_DEFAULT_COMPILED_PATTERNS = [re.compile(pattern) for pattern in DEFAULT_CODE_PATTERNS]
+
+def search_code(name_without_ext, compiled_patterns):
+    """Return the code found by the first matching pattern, or the whole name"""
+    for regex in compiled_patterns:
+        match = regex.search(name_without_ext)
+        if match:
+            return match.group(1)
+    
+    # If no code found, return the whole name
+    return name_without_ext
+
+def extract_code_from_filename(filename, patterns=None):
+    """Extract code from filename (e.g., '0336' from 'file_pelanggan_0336')"""
+    # Remove extension
+    name_without_ext = os.path.splitext(filename)[0]
+    return search_code(name_without_ext, compile_code_patterns(patterns))
+
+def extract_codes(file_list, patterns=None):
+    """Extract the code of every file at once, in file_list order
+
+    Patterns are compiled once for the whole list and files sharing a
+    basename are only searched once.
+    """
+    compiled = compile_code_patterns(patterns)
+    codes_by_name = {}
+    codes = []
+    for file_path in file_list:
+        filename = os.path.basename(file_path)
+        code = codes_by_name.get(filename)
+        if code is None:
+            code = search_code(os.path.splitext(filename)[0], compiled)
+            codes_by_name[filename] = code
+        codes.append(code)
+    return codes
+
+# Highest code point, used as the upper bound of a prefix range in the index
+PREFIX_SENTINEL = chr(0x10FFFF)
+
+MATCH_MODES = {
+    'first': 'Pertama cocok (urutan Excel)',
+    'longest': 'Prefix terpanjang',
+    'exact': 'Kode persis sama',
+}
+
+def extract_leading_code(reference):
+    """Extract the leading code of a reference (e.g. '0336' from '0336-PT. ABC')"""
+    match = re.match(r'[0-9A-Za-z]+', reference)
+    return match.group(0) if match else reference
+
+def build_reference_index(reference_values):
+    """Build a prefix index over reference values, once per reference column
+
+    Returns a dict with:
+    - keys: unique stripped references, sorted (for bisect prefix lookups)
+    - order: Excel row order of each key (first occurrence)
+    - leading: leading code -> references sharing it, in Excel order
+    """
+    first_seen = {}
+    for ref_val in reference_values:
+        ref_str = str(ref_val).strip()
+        if ref_str not in first_seen:
+            first_seen[ref_str] = len(first_seen)
+    
+    keys = sorted(first_seen)
+    leading = {}
+    for ref_str in first_seen:  # dict keeps Excel order
+        leading.setdefault(extract_leading_code(ref_str), []).append(ref_str)
+    
+    return {
+        'keys': keys,
+        'order': [first_seen[key] for key in keys],
+        'leading': leading,
+    }
+
+def lookup_reference(index, file_code, mode='first'):
+    """Find the reference for a file code
+
+    Returns (reference or None, number of candidate references).
+    More than one candidate means the code is ambiguous.
+    """
+    if mode == 'exact':
+        candidates = index['leading'].get(file_code, [])
+        return (candidates[0] if candidates else None), len(candidates)
+    
+    if mode == 'longest':
+        # Reference whose leading code is the longest prefix of the file code
+        for end in range(len(file_code), 0, -1):
+            candidates = index['leading'].get(file_code[:end])
+            if candidates:
+                return candidates[0], len(candidates)
+        return None, 0
+    
+    # Default: every reference starting with the file code, first in Excel order
+    keys = index['keys']
+    lo = bisect.bisect_left(keys, file_code)
+    hi = bisect.bisect_right(keys, file_code + PREFIX_SENTINEL, lo)
+    if lo == hi:
+        return None, 0
+    if hi - lo == 1:
+        return keys[lo], 1
+    order = index['order']
+    first = min(range(lo, hi), key=order.__getitem__)
+    return keys[first], hi - lo
+
+# Files matched between two progress reports
+PROGRESS_BATCH = 1000
+
+def match_files_with_reference(file_list, reference_values, mode='first', index=None, patterns=None, progress=None):
+    """Match filenames with reference values using an indexed prefix lookup
+
+    Returns (matched, unmatched, rename_map, ambiguous, codes) where ambiguous
+    maps file path -> number of references its code matched, and codes maps
+    every file path -> its extracted code (kept so previews never recompute it).
+    progress (optional, see indoarsip.jobs.Job) is advanced every PROGRESS_BATCH files.
+    """
+    if index is None:
+        index = build_reference_index(reference_values)
+    
+    matched = []
+    unmatched = []
+    rename_map = {}
+    ambiguous = {}
+    lookups = {}  # Files often share a code, look each one up only once
+    
+    # Extract codes for the whole list at once
+    codes = dict(zip(file_list, extract_codes(file_list, patterns)))
+    if hasattr(index, 'lookup_many'):
+        # Store-backed index (see indoarsip.catalog): every distinct code in one query
+        lookups = index.lookup_many(set(codes.values()), mode)
+    if progress is not None:
+        progress.set_stage('match', files_total=len(codes), bytes_total=0)
+    
+    for position, (file_path, file_code) in enumerate(codes.items(), 1):
+        if progress is not None and position % PROGRESS_BATCH == 0:
+            progress.advance(files=PROGRESS_BATCH)
+        file_extension = os.path.splitext(file_path)[1]
+        
+        if file_code not in lookups:
+            lookups[file_code] = lookup_reference(index, file_code, mode)
+        ref_str, candidates = lookups[file_code]
+        
+        if ref_str is None:
+            unmatched.append(file_path)
+            continue
+        
+        # Example: file code "0336" matches "0336-PT. CONTAINER MARITIME ACTIVITIES"
+        matched.append(file_path)
+        # Create new filename: reference value + original extension
+        rename_map[file_path] = ref_str + file_extension
+        if candidates > 1:
+            ambiguous[file_path] = candidates
+    
+    if progress is not None:
+        progress.advance(files=len(codes) % PROGRESS_BATCH)
+    return matched, unmatched, rename_map, ambiguous, codes
@@ -0,0 +1,273 @@
+"""
+INDOARSIP - Output building
+Renamed ZIP archive(s) and the unmatched files report, written to disk
+"""
+
+import hashlib
+import os
+import stat
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from .archive import COPY_CHUNK_SIZE, collect_file_sizes, copy_zip_member_raw, iter_tar_entries, open_tar, source_view
+from .dedupe import DUPLICATE, NAME_COLLISION, numbered_name
+from .suggest import format_suggestions
+
+OUTPUT_ZIP_NAME = "INDOARSIP_Arsip_Renamed"
+REPORT_FILE_NAME = "INDOARSIP_Laporan_Tidak_Cocok.xlsx"
+
+# Local header + central directory entry size, excluding the name (twice)
+ZIP_ENTRY_OVERHEAD = zipfile.sizeFileHeader + zipfile.sizeCentralDir
+
+def plan_archive_parts(file_mapping, stored_sizes, part_size=None):
+    """Split file_mapping into groups whose output ZIP stays within part_size bytes
+
+    A single file bigger than part_size gets a part of its own.
+    Without part_size everything goes into one part.
+    """
+    if not part_size:
+        return [dict(file_mapping)]
+    
+    parts = []
+    current = {}
+    current_size = 0
+    for file_key, new_name in file_mapping.items():
+        entry_size = stored_sizes[file_key] + ZIP_ENTRY_OVERHEAD + 2 * len(new_name.encode('utf-8'))
+        if current and current_size + entry_size > part_size:
+            parts.append(current)
+            current = {}
+            current_size = 0
+        current[file_key] = new_name
+        current_size += entry_size
+    if current:
+        parts.append(current)
+    return parts
+
+def create_zip_from_files(file_mapping, output_dir, source_zip=None, part_size=None, progress=None, file_sizes=None):
+    """Create ZIP file(s) from renamed files, written incrementally to output_dir
+
+    Keys of file_mapping are ZIP member names when source_zip is given,
+    otherwise paths on disk. ZIP members are copied raw (no recompression);
+    loose files are stored uncompressed. With part_size (bytes) the output is
+    split into several independent ZIPs of at most that size. file_sizes
+    (optional, path -> size from the scan) spares a stat per loose file.
+    progress (optional, see indoarsip.jobs.Job) is advanced per file and per byte.
+    Returns the list of written ZIP paths.
+    """
+    source = zipfile.ZipFile(source_view(source_zip), 'r') if source_zip is not None else None
+    try:
+        if source is not None:
+            stored_sizes = {name: source.getinfo(name).compress_size for name in file_mapping}
+        else:
+            known = file_sizes or {}
+            stored_sizes = collect_file_sizes(path for path in file_mapping if path not in known)
+            stored_sizes.update({path: known[path] for path in file_mapping if path in known})
+        parts = plan_archive_parts(file_mapping, stored_sizes, part_size)
+        if progress is not None:
+            progress.set_stage('build_zip', files_total=len(file_mapping), bytes_total=sum(stored_sizes.values()))
+        
+        part_paths = []
+        for part_number, part_mapping in enumerate(parts, 1):
+            if len(parts) == 1:
+                part_path = os.path.join(output_dir, f"{OUTPUT_ZIP_NAME}.zip")
+            else:
+                part_path = os.path.join(output_dir, f"{OUTPUT_ZIP_NAME}_part{part_number:03d}.zip")
+            
+            # Members are streamed chunk by chunk, so memory stays flat whatever the size
+            with zipfile.ZipFile(part_path, 'w', zipfile.ZIP_STORED) as zip_file:
+                for file_key, new_name in part_mapping.items():
+                    if source is not None:
+                        copy_zip_member_raw(source, source.getinfo(file_key), zip_file, new_name, progress)
+                        if progress is not None:
+                            progress.advance(files=1)
+                    else:
+                        # Write file with NEW name (not old path basename)
+                        zip_file.write(file_key, arcname=new_name)
+                        if progress is not None:
+                            progress.advance(files=1, nbytes=stored_sizes[file_key])
+            part_paths.append(part_path)
+        return part_paths
+    finally:
+        if source is not None:
+            source.close()
+
+# Members sharing a target name are buffered in memory up to this size (then on disk) while hashed
+TAR_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+class ZipPartWriter:
+    """Streams files into output ZIP part(s) of at most part_size bytes, opened as needed"""
+    
+    def __init__(self, output_dir, part_size=None):
+        self.output_dir = output_dir
+        self.part_size = part_size
+        self.part_paths = []
+        self._zip_file = None
+        self._part_bytes = 0
+    
+    def write(self, new_name, stream, size, mtime=None, mode=0o644, progress=None):
+        """Copy size bytes of stream into the output under new_name (stored, chunk by chunk)"""
+        entry_size = size + ZIP_ENTRY_OVERHEAD + 2 * len(new_name.encode('utf-8'))
+        if self._zip_file is None or (self.part_size and self._part_bytes
+                                      and self._part_bytes + entry_size > self.part_size):
+            self._next_part()
+        self._part_bytes += entry_size
+        
+        # ZIP dates start in 1980
+        date_time = time.localtime(mtime)[:6] if mtime else time.localtime()[:6]
+        info = zipfile.ZipInfo(new_name, date_time=max(date_time, (1980, 1, 1, 0, 0, 0)))
+        info.compress_type = zipfile.ZIP_STORED
+        info.file_size = size
+        info.external_attr = (stat.S_IFREG | (mode & 0o7777)) << 16
+        with self._zip_file.open(info, 'w', force_zip64=size > zipfile.ZIP64_LIMIT) as target:
+            remaining = size
+            while remaining > 0:
+                chunk = stream.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise tarfile.ReadError(f"Data arsip terpotong: {new_name}")
+                target.write(chunk)
+                remaining -= len(chunk)
+                if progress is not None:
+                    progress.advance(nbytes=len(chunk))
+    
+    def _next_part(self):
+        if self._zip_file is not None:
+            self._zip_file.close()
+        part_path = os.path.join(self.output_dir, f"{OUTPUT_ZIP_NAME}_part{len(self.part_paths) + 1:03d}.zip")
+        self._zip_file = zipfile.ZipFile(part_path, 'w', zipfile.ZIP_STORED)
+        self.part_paths.append(part_path)
+        self._part_bytes = 0
+    
+    def close(self):
+        """Finish the last part; returns the part paths (a single part gets the plain output name)"""
+        if self._zip_file is None:
+            self._next_part()  # Empty output, like create_zip_from_files
+        self._zip_file.close()
+        if len(self.part_paths) == 1:
+            single_path = os.path.join(self.output_dir, f"{OUTPUT_ZIP_NAME}.zip")
+            os.replace(self.part_paths[0], single_path)
+            self.part_paths = [single_path]
+        return self.part_paths
+
+def create_zip_from_tar(file_mapping, output_dir, source_tar, part_size=None, progress=None, file_sizes=None):
+    """Create the renamed ZIP part(s) from a TAR / TAR.GZ in a single streaming pass
+
+    Keys of file_mapping are TAR member names. Matched members are copied
+    straight from the (decompressed) stream into the output; nothing is
+    extracted. Duplicates are resolved on the way, with the same result as
+    resolve_duplicates: members sharing a target name are hashed (buffered
+    in a spool file in output_dir while hashed), identical copies are
+    dropped and different contents get a numbered name. A name stored
+    twice in the TAR is read once, its first copy (like list_tar_members),
+    so each file appears at most once in the duplicates report. file_sizes
+    (optional, name -> size from the scan) sizes the progress bar.
+    Returns (part_paths, output_mapping, duplicates).
+    """
+    groups = {}
+    for file_key, new_name in file_mapping.items():
+        groups.setdefault(new_name, []).append(file_key)
+    colliding = {file_key for file_keys in groups.values() if len(file_keys) > 1 for file_key in file_keys}
+    if progress is not None:
+        bytes_total = sum(file_sizes.get(file_key, 0) for file_key in file_mapping) if file_sizes else 0
+        progress.set_stage('build_zip', files_total=len(file_mapping), bytes_total=bytes_total)
+    
+    writer = ZipPartWriter(output_dir, part_size)
+    output_mapping = {}
+    duplicates = []
+    kept = {}  # target name -> {sha256: first file kept for it}
+    handled = set()  # Names already written or dropped
+    used_names = set(file_mapping.values())
+    try:
+        with open_tar(source_tar) as tar:
+            for member in iter_tar_entries(tar):
+                file_key = member.name
+                if file_key not in file_mapping or file_key in handled or not member.isfile():
+                    continue
+                handled.add(file_key)
+                new_name = file_mapping[file_key]
+                stream = tar.extractfile(member)
+                if file_key not in colliding:
+                    writer.write(new_name, stream, member.size, member.mtime, member.mode, progress)
+                    output_mapping[file_key] = new_name
+                else:
+                    with tempfile.SpooledTemporaryFile(max_size=TAR_SPOOL_MAX_BYTES, dir=output_dir) as spool:
+                        digest = hashlib.sha256()
+                        for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                            spool.write(chunk)
+                        content = digest.hexdigest()
+                        group = kept.setdefault(new_name, {})
+                        if content in group:
+                            duplicates.append({
+                                'file': file_key,
+                                'target': output_mapping[group[content]],
+                                'same_as': group[content],
+                                'status': DUPLICATE,
+                            })
+                            if progress is not None:
+                                progress.advance(files=1, nbytes=member.size)
+                            continue
+                        target = new_name
+                        if group:
+                            target = numbered_name(new_name, used_names)
+                            used_names.add(target)
+                            duplicates.append({
+                                'file': file_key,
+                                'target': target,
+                                'same_as': None,
+                                'status': NAME_COLLISION,
+                            })
+                        group[content] = file_key
+                        spool.seek(0)
+                        writer.write(target, spool, member.size, member.mtime, member.mode, progress)
+                        output_mapping[file_key] = target
+                if progress is not None:
+                    progress.advance(files=1)
+    finally:
+        part_paths = writer.close()
+    return part_paths, output_mapping, duplicates
+
+def read_output_file(part_paths, new_name):
+    """Read one renamed file back from the output ZIP part(s)
+
+    Used when the source cannot be read at random (a TAR stream).
+    """
+    for part_path in part_paths:
+        with zipfile.ZipFile(part_path, 'r') as zip_file:
+            try:
+                return zip_file.read(new_name)
+            except KeyError:
+                continue
+    raise KeyError(new_name)
+
+def create_unmatched_report(unmatched_files, output_path, duplicates=None, suggestions=None):
+    """Create Excel report for unmatched files at output_path
+
+    suggestions (optional, see indoarsip.suggest.suggest_for_unmatched) add
+    the closest references per file; duplicates (optional, see
+    indoarsip.dedupe.resolve_duplicates) are listed on a second sheet.
+    """
+    import pandas as pd  # Imported lazily, only reports need it
+    
+    data = {
+        'Nama File Tidak Cocok': [os.path.basename(f) for f in unmatched_files],
+        'Path Lengkap': unmatched_files,
+        'Status': ['Tidak Ditemukan di Referensi'] * len(unmatched_files)
+    }
+    if suggestions is not None:
+        data['Mungkin Maksudnya'] = [format_suggestions(suggestions.get(f, [])) for f in unmatched_files]
+    df = pd.DataFrame(data)
+    
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Arsip Tidak Cocok', index=False)
+        if duplicates:
+            duplicates_df = pd.DataFrame({
+                'Nama File': [os.path.basename(d['file']) for d in duplicates],
+                'Path Lengkap': [d['file'] for d in duplicates],
+                'Nama di ZIP Hasil': [d['target'] for d in duplicates],
+                'Sama Dengan': [d['same_as'] or '' for d in duplicates],
+                'Status': [d['status'] for d in duplicates],
+            })
+            duplicates_df.to_excel(writer, sheet_name='Arsip Duplikat', index=False)
+    return output_path
@@ -0,0 +1,152 @@
+"""
+INDOARSIP - Reference loading
+Reads only the reference column of the Excel register, memoised by file content
+hash in the process-wide artefact cache
+"""
+
+import hashlib
+import os
+from io import BytesIO
+
+from .cache import artefact_cache, estimate_size
+from .matching import build_reference_index
+
+def read_file_bytes(excel_file):
+    """Return the bytes of an uploaded file, file object or path"""
+    if hasattr(excel_file, 'getvalue'):
+        return excel_file.getvalue()
+    if isinstance(excel_file, (str, os.PathLike)):
+        with open(excel_file, 'rb') as f:
+            return f.read()
+    data = excel_file.read()
+    excel_file.seek(0)
+    return data
+
+# Bytes hashed between two progress reports
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+def content_hash(data, progress=None):
+    """Hash file contents, used as the cache key of parsed artefacts
+
+    progress (optional, see indoarsip.jobs.Job) is advanced per hashed chunk.
+    """
+    if progress is None:
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    view = memoryview(data)
+    for start in range(0, len(view), HASH_CHUNK_SIZE):
+        chunk = view[start:start + HASH_CHUNK_SIZE]
+        digest.update(chunk)
+        progress.advance(nbytes=len(chunk))
+    return digest.hexdigest()
+
+def is_xlsx(data):
+    """Check if data is an Office Open XML workbook (a ZIP), which openpyxl can stream"""
+    return data[:2] == b'PK'
+
+def read_excel_headers(excel_file):
+    """List the header names of the first sheet, without reading any data rows"""
+    data = read_file_bytes(excel_file)
+    if not is_xlsx(data):
+        import pandas as pd
+        return [str(c) for c in pd.read_excel(BytesIO(data), nrows=0).columns]
+    
+    from openpyxl import load_workbook
+    workbook = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        header = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        return [str(value) for value in header if value is not None]
+    finally:
+        workbook.close()
+
+def excel_cell_value(cell):
+    """Value of an openpyxl cell as pandas' openpyxl reader sees it
+
+    Empty cells are '', error cells NaN, integral numbers int.
+    """
+    if cell.value is None:
+        return ""
+    if cell.data_type == 'e':
+        return float('nan')
+    if cell.data_type == 'n':
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+def read_reference_column(data, column):
+    """Read one column of the first sheet in read-only/streaming mode
+
+    Gives the same strings as pd.read_excel(...)[column].dropna().astype(str):
+    the cells of the column go through pandas' own parser, so its NA values
+    ('NA', 'null', 'n/a'...), numeric conversion of an all-numeric column
+    ('0336' -> 336) and date handling apply. Only that column is held in
+    memory. Returns the list of reference strings, or None if the column
+    does not exist.
+    """
+    import pandas as pd
+    
+    if not is_xlsx(data):
+        try:
+            df = pd.read_excel(BytesIO(data), usecols=[column])
+        except ValueError:
+            return None
+        return df[column].dropna().astype(str).tolist()
+    
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+    
+    workbook = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()  # Like pandas: the stored dimensions can be wrong
+        rows = sheet.iter_rows()
+        header = [str(cell.value) if cell.value is not None else None for cell in next(rows, ())]
+        if column not in header:
+            return None
+        position = header.index(column)
+        
+        cells = []
+        last_row_with_data = -1
+        for row in rows:
+            # pandas keeps empty rows (NaN) up to the last row with data in any column
+            if any(cell.value is not None for cell in row):
+                last_row_with_data = len(cells)
+            cells.append([excel_cell_value(row[position]) if position < len(row) else ""])
+        del cells[last_row_with_data + 1:]
+    finally:
+        workbook.close()
+    
+    parser = TextParser([[column]] + cells, header=0, skip_blank_lines=False)
+    try:
+        values = parser.read()[column]
+    finally:
+        parser.close()
+    return values.dropna().astype(str).tolist()
+
+def load_reference_values(excel_file, column):
+    """Load the reference column of an Excel register, memoised by content hash
+
+    Returns None if the column does not exist (see read_excel_headers for the
+    available names). The list is shared by every caller: do not modify it.
+    """
+    data = read_file_bytes(excel_file)
+    return artefact_cache.get(
+        ('reference_values', content_hash(data), column),
+        lambda: read_reference_column(data, column),
+        size_of=estimate_size
+    )
+
+def load_reference_index(excel_file, column):
+    """build_reference_index of an Excel register column, memoised by content hash
+
+    Sessions uploading the same register share one index (and, through the
+    same cache, its suggestion levels). Returns None if the column does not
+    exist.
+    """
+    data = read_file_bytes(excel_file)
+    
+    def build():
+        values = read_reference_column(data, column)
+        return build_reference_index(values) if values is not None else None
+    
+    return artefact_cache.get(('reference_index', content_hash(data), column), build, size_of=estimate_size)
@@ -0,0 +1,179 @@
+"""
+INDOARSIP - Suggestions for unmatched files
+"Did you mean" lookups of the closest reference codes by edit distance,
+through a symmetric-delete index instead of comparing every reference
+"""
+
+import hashlib
+import os
+
+from .cache import artefact_cache, estimate_size
+
+# Suggestions kept per unmatched file
+SUGGEST_LIMIT = 3
+
+# Codes further apart than this are not suggested
+SUGGEST_MAX_DISTANCE = int(os.environ.get('INDOARSIP_SUGGEST_MAX_DISTANCE', '2'))
+
+def edit_distance(a, b, max_distance=None):
+    """Levenshtein distance between a and b
+
+    With max_distance, stops early and returns max_distance + 1 once the
+    distance is known to be larger.
+    """
+    if a == b:
+        return 0
+    # Common prefix and suffix do not change the distance
+    start = 0
+    shortest = min(len(a), len(b))
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def delete_variants(word, deletes):
+    """Every string obtained by deleting exactly `deletes` characters from word"""
+    variants = {word}
+    for _ in range(deletes):
+        variants = {variant[:i] + variant[i + 1:] for variant in variants for i in range(len(variant))}
+    return variants
+
+def build_delete_level(codes, deletes):
+    """variant -> ids of the codes it comes from, for this number of deletions"""
+    variants = {}
+    for code_id, code in enumerate(codes):
+        for variant in delete_variants(code, deletes):
+            variants.setdefault(variant, []).append(code_id)
+    return variants
+
+class SuggestionIndex:
+    """Symmetric-delete index over the leading codes of a reference column
+
+    Level n maps every string obtained by deleting n characters from a code
+    to the codes it came from. Two codes within edit distance d share a
+    variant with at most d deletions on each side, so a lookup only verifies
+    the few codes sharing a variant with the query. Levels are built on
+    first use (dense registers usually have enough suggestions at distance
+    1) and kept in the shared artefact cache, keyed by the codes and sized
+    once built; the index itself holds no state of its own.
+    """
+    
+    def __init__(self, reference_index):
+        self.leading = reference_index['leading']
+        self.codes = list(self.leading)  # Excel order
+        self.key = hashlib.sha256('\0'.join(self.codes).encode('utf-8')).hexdigest()
+    
+    def level(self, deletes):
+        """The variant -> code ids map for this number of deletions"""
+        return artefact_cache.get(
+            ('suggest_level', self.key, deletes),
+            lambda: build_delete_level(self.codes, deletes),
+            size_of=estimate_size
+        )
+    
+    def suggest(self, code, limit=SUGGEST_LIMIT, max_distance=SUGGEST_MAX_DISTANCE):
+        """Closest references to code as [(reference, distance)], nearest first then Excel order"""
+        if not code or not self.codes:
+            return []
+        
+        found = {}  # code id -> distance
+        query_levels = []
+        for distance in range(max_distance + 1):
+            query_levels.append(delete_variants(code, distance))
+            # A code sharing a variant after i deletions from the query and j from
+            # the code is within i + j. This step adds the pairs with
+            # max(i, j) == distance. Codes within distance - 1 were all found at
+            # the previous steps, so a new code from (distance, 0) or (0, distance)
+            # is exactly at this distance; only the other pairs need checking.
+            candidates = set()
+            for query_deletes, code_deletes in {(distance, 0), (0, distance)}:
+                for code_id in self._lookup(query_levels[query_deletes], code_deletes):
+                    found.setdefault(code_id, distance)
+            for query_deletes in range(1, distance + 1):
+                candidates.update(self._lookup(query_levels[query_deletes], distance))
+            for code_deletes in range(1, distance):
+                candidates.update(self._lookup(query_levels[distance], code_deletes))
+            candidates.difference_update(found)
+            
+            # Check candidates in Excel order, only until the first `limit`
+            # references at this distance are settled
+            needed = limit - self._reference_count(code_id for code_id, d in found.items() if d < distance)
+            exact = sorted(code_id for code_id, d in found.items() if d == distance)
+            position = 0
+            references_before = 0
+            for code_id in sorted(candidates):
+                while position < len(exact) and exact[position] < code_id:
+                    references_before += len(self.leading[self.codes[exact[position]]])
+                    position += 1
+                if references_before >= needed:
+                    break
+                found[code_id] = edit_distance(code, self.codes[code_id], max_distance)
+                if found[code_id] == distance:
+                    references_before += len(self.leading[self.codes[code_id]])
+            
+            nearest = sorted((d, code_id) for code_id, d in found.items() if d <= distance)
+            if self._reference_count(code_id for _, code_id in nearest) >= limit:
+                break
+        
+        suggestions = []
+        for d, code_id in nearest:
+            for reference in self.leading[self.codes[code_id]]:
+                suggestions.append((reference, d))
+                if len(suggestions) == limit:
+                    return suggestions
+        return suggestions
+    
+    def _lookup(self, variants, code_deletes):
+        """Code ids sharing one of the query variants at this level"""
+        index_level = self.level(code_deletes)
+        for variant in variants:
+            yield from index_level.get(variant, ())
+    
+    def _reference_count(self, code_ids):
+        return sum(len(self.leading[self.codes[code_id]]) for code_id in code_ids)
+
+def get_suggestion_index(reference_index):
+    """The suggestion index of a reference index (its levels are shared through the artefact cache)"""
+    if hasattr(reference_index, 'suggestion_index'):
+        return reference_index.suggestion_index()  # Catalog register (see indoarsip.catalog)
+    return SuggestionIndex(reference_index)
+
+def suggest_for_unmatched(unmatched_files, codes, reference_index, limit=SUGGEST_LIMIT,
+                          max_distance=SUGGEST_MAX_DISTANCE):
+    """Suggestions for every unmatched file: {file path: [(reference, distance)]}
+
+    codes is the file path -> extracted code map from match_files_with_reference;
+    files sharing a code are looked up once.
+    """
+    suggestion_index = get_suggestion_index(reference_index)
+    by_code = {}
+    suggestions = {}
+    for file_path in unmatched_files:
+        code = codes[file_path]
+        if code not in by_code:
+            by_code[code] = suggestion_index.suggest(code, limit, max_distance)
+        suggestions[file_path] = by_code[code]
+    return suggestions
+
+def format_suggestions(suggestions):
+    """Suggestions as one readable cell, e.g. '0336-PT. ABC (selisih 1); ...'"""
+    return '; '.join(f"{reference} (selisih {distance})" for reference, distance in suggestions)
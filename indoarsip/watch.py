@@ -0,0 +1,301 @@
+"""
+INDOARSIP - Watch-folder mode
+Watches a server-side inbox and renames matching files straight into an
+outbox with a hard link (no upload, no copy). Example:
+
+    python -m indoarsip.watch --inbox /data/scan --outbox /data/arsip referensi.xlsx Nomor_Arsip
+"""
+
+import argparse
+import errno
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from .archive import get_files_from_directory, is_valid_archive_member
+from .matching import MATCH_MODES, build_reference_index, compile_code_patterns, match_files_with_reference
+from .reference import load_reference_values, read_excel_headers
+from .suggest import suggest_for_unmatched
+
+logger = logging.getLogger('indoarsip')
+
+# A file is processed once its size and mtime stayed unchanged this long (still being copied otherwise)
+WATCH_SETTLE_SECONDS = float(os.environ.get('INDOARSIP_WATCH_SETTLE_SECONDS', '2'))
+
+# One JSON line per processed file, written in the outbox
+WATCH_LOG_NAME = "INDOARSIP_Watch_Log.jsonl"
+
+# Names used by browsers and copy tools for files still being written
+PARTIAL_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download')
+
+# How often files logged as not renamed are checked for having disappeared
+WATCH_PRUNE_SECONDS = 60
+
+def is_candidate_file(path, inbox):
+    """Check if an inbox path may be an archive file (not hidden, system, in __MACOSX/ or still being written)"""
+    relative_path = os.path.relpath(path, inbox)
+    return is_valid_archive_member(relative_path) and not relative_path.lower().endswith(PARTIAL_SUFFIXES)
+
+def move_without_overwrite(source, target):
+    """Move source to target on the same filesystem; FileExistsError if target exists
+
+    os.link fails atomically when target exists, so a file created meanwhile
+    is never overwritten. Filesystems without hard links get an O_EXCL
+    placeholder instead, which os.replace then swaps for the file.
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK):
+            raise  # e.g. EXDEV: inbox and outbox on different filesystems
+        os.close(os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        try:
+            os.replace(source, target)
+        except BaseException:
+            os.unlink(target)
+            raise
+        return
+    os.unlink(source)
+
+def safe_target_name(new_name):
+    """Keep a reference-based name inside the outbox (no path separators)"""
+    return new_name.replace('/', '_').replace('\\', '_')
+
+class InboxEventHandler:
+    """watchdog event handler that hands new or moved-in files to the watcher"""
+    
+    def __init__(self, watcher):
+        self.watcher = watcher
+    
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        if event.event_type in ('deleted', 'moved'):
+            self.watcher.forget(os.fsdecode(event.src_path))
+        path = getattr(event, 'dest_path', None) or event.src_path
+        if event.event_type in ('created', 'modified', 'moved', 'closed'):
+            self.watcher.notify(os.fsdecode(path))
+
+class InboxWatcher:
+    """Match files arriving in inbox and move them, renamed, into outbox
+
+    The reference index is built once. Files are batched through
+    match_files_with_reference, so naming is identical to the upload flow.
+    Matched files are moved with move_without_overwrite (inbox and outbox
+    must be on the same filesystem); an existing target is never
+    overwritten. Unmatched files stay in the inbox and are logged once per
+    version of the file.
+    """
+    
+    def __init__(self, inbox, outbox, reference_values, mode='first', patterns=None,
+                 settle_seconds=WATCH_SETTLE_SECONDS, log_path=None):
+        self.inbox = os.path.abspath(inbox)
+        self.outbox = os.path.abspath(outbox)
+        if os.path.commonpath([self.inbox, self.outbox]) in (self.inbox, self.outbox):
+            raise ValueError("Folder inbox dan outbox tidak boleh saling berada di dalam satu sama lain")
+        os.makedirs(self.outbox, exist_ok=True)
+        self.mode = mode
+        self.patterns = patterns
+        self.settle_seconds = settle_seconds
+        self.log_path = log_path or os.path.join(self.outbox, WATCH_LOG_NAME)
+        self.index = build_reference_index(reference_values)
+        self.counts = {'matched': 0, 'unmatched': 0, 'collision': 0, 'error': 0}
+        self._pending = {}  # path -> (size, mtime) at the last check
+        self._skipped = {}  # path -> (size, mtime) already logged as not renamed
+        self._lock = threading.Lock()
+    
+    def scan(self):
+        """Queue every file already in the inbox"""
+        for path in get_files_from_directory(self.inbox):
+            self.notify(path)
+    
+    def notify(self, path):
+        """Queue a path to be processed once it has settled"""
+        if not is_candidate_file(path, self.inbox):
+            return
+        with self._lock:
+            self._pending.setdefault(path, None)
+    
+    def forget(self, path):
+        """Drop a path deleted or moved out of the inbox"""
+        with self._lock:
+            self._pending.pop(path, None)
+            self._skipped.pop(path, None)
+    
+    def prune_skipped(self):
+        """Drop the not-renamed files that disappeared without an event (e.g. missed events)"""
+        with self._lock:
+            paths = list(self._skipped)
+        for path in paths:
+            if not os.path.exists(path):
+                self.forget(path)
+    
+    def _settled(self, now):
+        """Pop the pending paths whose size and mtime stopped changing"""
+        ready = []
+        with self._lock:
+            for path, previous in list(self._pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    del self._pending[path]  # Gone (moved away or deleted)
+                    continue
+                current = (stat.st_size, stat.st_mtime)
+                if self._skipped.get(path) == current:
+                    del self._pending[path]
+                elif previous == current and now - stat.st_mtime >= self.settle_seconds:
+                    del self._pending[path]
+                    ready.append((path, current))
+                else:
+                    self._pending[path] = current
+        return ready
+    
+    def _log(self, records):
+        with open(self.log_path, 'a', encoding='utf-8') as log_file:
+            for record in records:
+                log_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def process_ready(self, now=None):
+        """Match and move every settled file; returns the log records written"""
+        ready = self._settled(time.time() if now is None else now)
+        if not ready:
+            return []
+        versions = dict(ready)
+        matched, unmatched, rename_map, ambiguous, codes = match_files_with_reference(
+            list(versions), None, mode=self.mode, index=self.index, patterns=self.patterns
+        )
+        
+        records = []
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        for path in matched:
+            target = os.path.join(self.outbox, safe_target_name(rename_map[path]))
+            record = {'time': timestamp, 'file': path, 'code': codes[path], 'target': target}
+            try:
+                move_without_overwrite(path, target)
+                record['status'] = 'matched'
+                if path in ambiguous:
+                    record['candidates'] = ambiguous[path]
+            except FileExistsError:
+                record['status'] = 'collision'
+            except OSError as e:
+                # e.g. EXDEV: inbox and outbox on different filesystems, nothing is copied
+                record['status'] = 'error'
+                record['error'] = str(e)
+            records.append(record)
+        suggestions = suggest_for_unmatched(unmatched, codes, self.index)
+        for path in unmatched:
+            records.append({
+                'time': timestamp,
+                'file': path,
+                'code': codes[path],
+                'status': 'unmatched',
+                'suggestions': [reference for reference, _ in suggestions[path]],
+            })
+        
+        for record in records:
+            self.counts[record['status']] += 1
+            if record['status'] != 'matched':
+                # Not retried until the file changes
+                self._skipped[record['file']] = versions[record['file']]
+                logger.warning(json.dumps({'watch': record['status'], 'file': record['file']}, ensure_ascii=False))
+        self._log(records)
+        return records
+    
+    def run(self, stop_event=None, poll_interval=1.0):
+        """Process existing files, then watch the inbox until stop_event is set"""
+        # watchdog is only needed for this mode
+        from watchdog.observers import Observer
+        
+        stop_event = stop_event or threading.Event()
+        observer = Observer()
+        observer.schedule(InboxEventHandler(self), self.inbox, recursive=True)
+        observer.start()
+        try:
+            self.scan()
+            last_prune = time.monotonic()
+            while not stop_event.is_set():
+                self.process_ready()
+                if time.monotonic() - last_prune >= WATCH_PRUNE_SECONDS:
+                    self.prune_skipped()
+                    last_prune = time.monotonic()
+                stop_event.wait(poll_interval)
+        finally:
+            observer.stop()
+            observer.join()
+
+def build_parser():
+    """Build the argument parser for watch mode"""
+    parser = argparse.ArgumentParser(
+        prog="python -m indoarsip.watch",
+        description="INDOARSIP - Pantau folder inbox dan rename arsip langsung ke folder outbox"
+    )
+    parser.add_argument("excel", help="File Excel referensi penamaan")
+    parser.add_argument("column", help="Nama kolom referensi arsip di Excel")
+    parser.add_argument("--inbox", default=os.environ.get('INDOARSIP_WATCH_INBOX'), help="Folder masuk yang dipantau (default: env INDOARSIP_WATCH_INBOX)")
+    parser.add_argument("--outbox", default=os.environ.get('INDOARSIP_WATCH_OUTBOX'), help="Folder tujuan file hasil rename, harus satu filesystem dengan inbox (default: env INDOARSIP_WATCH_OUTBOX)")
+    parser.add_argument("--mode", choices=list(MATCH_MODES), default="first", help="Mode pencocokan kode (default: first)")
+    parser.add_argument("--pattern", action="append", dest="patterns", metavar="REGEX", help="Pola kode di nama file, boleh diulang; grup pertama = kode (default: pola bawaan)")
+    parser.add_argument("--settle-seconds", type=float, default=WATCH_SETTLE_SECONDS, help=f"File diproses setelah tidak berubah selama ini (default: {WATCH_SETTLE_SECONDS:g} detik)")
+    parser.add_argument("--once", action="store_true", help="Proses file yang sudah ada lalu selesai, tanpa memantau")
+    return parser
+
+def main(argv=None):
+    """Run watch mode; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    if not args.inbox or not args.outbox:
+        print("❌ Folder inbox dan outbox wajib diisi (--inbox/--outbox)", file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.inbox):
+        print(f"❌ Folder inbox tidak ditemukan: {args.inbox}", file=sys.stderr)
+        return 2
+    
+    try:
+        patterns = compile_code_patterns(args.patterns)
+    except re.error as e:
+        print(f"❌ Pola kode tidak valid: {e}", file=sys.stderr)
+        return 2
+    
+    reference_values = load_reference_values(args.excel, args.column)
+    if reference_values is None:
+        print(f"❌ Kolom '{args.column}' tidak ditemukan dalam file Excel!", file=sys.stderr)
+        print(f"📋 Kolom yang tersedia: {', '.join(read_excel_headers(args.excel))}", file=sys.stderr)
+        return 2
+    
+    try:
+        watcher = InboxWatcher(args.inbox, args.outbox, reference_values, mode=args.mode,
+                               patterns=patterns, settle_seconds=args.settle_seconds)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    
+    if args.once:
+        # Files are only handed over once settled, so check twice
+        watcher.scan()
+        watcher.process_ready()
+        time.sleep(args.settle_seconds)
+        watcher.scan()
+        watcher.process_ready()
+    else:
+        print(f"👀 Memantau {watcher.inbox} -> {watcher.outbox} (Ctrl+C untuk berhenti)", file=sys.stderr)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+    print(f"Arsip Direname: {watcher.counts['matched']}")
+    print(f"Arsip Tidak Cocok: {watcher.counts['unmatched']}")
+    if watcher.counts['collision']:
+        print(f"Nama Tujuan Sudah Ada: {watcher.counts['collision']}")
+    if watcher.counts['error']:
+        print(f"Gagal Dipindah: {watcher.counts['error']}")
+    print(f"📄 {watcher.log_path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
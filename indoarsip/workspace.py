@@ -0,0 +1,334 @@
+"""
+INDOARSIP - Workspaces
+Per-session directories on local disk (spilled uploads, output ZIPs, reports)
+under one root, with a global byte quota, LRU eviction and idle cleanup
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Not available on Windows
+except ImportError:
+    fcntl = None
+
+# Every workspace lives under this folder, in one subfolder per process
+WORKSPACE_ROOT = os.environ.get(
+    'INDOARSIP_WORKSPACE_ROOT',
+    os.path.join(tempfile.gettempdir(), 'indoarsip_workspaces')
+)
+
+# Disk budget of all workspaces together; least recently used ones are evicted beyond it
+WORKSPACE_QUOTA_BYTES = int(os.environ.get('INDOARSIP_WORKSPACE_QUOTA_MB', '10240')) * 1024 * 1024
+
+# Workspaces of a session unused this long are removed
+WORKSPACE_IDLE_SECONDS = int(os.environ.get('INDOARSIP_WORKSPACE_IDLE_SECONDS', '3600'))
+
+# Workspaces of a closed session are kept this long, so a reconnecting browser can adopt them
+WORKSPACE_GRACE_SECONDS = int(os.environ.get('INDOARSIP_WORKSPACE_GRACE_SECONDS', '300'))
+
+# How often the janitor thread looks for idle workspaces
+WORKSPACE_CLEANUP_INTERVAL = int(os.environ.get('INDOARSIP_WORKSPACE_CLEANUP_INTERVAL', '60'))
+
+# Held (flock) by the owning process for as long as it runs, in its own folder
+OWNER_LOCK_NAME = '.owner.lock'
+
+class WorkspaceQuotaExceeded(Exception):
+    """Raised when a workspace does not fit in the quota, even after eviction"""
+
+def try_lock(path):
+    """Open path and take an exclusive lock without waiting; the open file, or None if held elsewhere"""
+    lock_file = open(path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def directory_size(path):
+    """Total size in bytes of the files under path"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+class Workspace:
+    """One directory owned by a session"""
+    
+    def __init__(self, path, session_id, kind, nbytes):
+        self.path = path
+        self.session_id = session_id
+        self.kind = kind
+        self.bytes = nbytes  # Reserved size until record_size measures it
+        self.last_used = time.time()
+        self.busy = 0
+
+class WorkspaceManager:
+    """Process-wide registry of workspaces, bounded by a byte quota
+
+    create() reserves the expected size and evicts the least recently used
+    idle workspaces until it fits. A workspace in use by a job (busy) is
+    never evicted. cleanup() removes the workspaces of sessions idle longer
+    than idle_seconds, or closed for longer than grace_seconds.
+    Several processes can share base_root: each one works in its own
+    folder, locked for as long as the process runs (see sweep_orphans).
+    """
+    
+    def __init__(self, root=WORKSPACE_ROOT, quota_bytes=WORKSPACE_QUOTA_BYTES,
+                 idle_seconds=WORKSPACE_IDLE_SECONDS, grace_seconds=WORKSPACE_GRACE_SECONDS):
+        self.base_root = root
+        self.root = os.path.join(root, f"process_{os.getpid()}_{uuid.uuid4().hex[:8]}")
+        self.quota_bytes = quota_bytes
+        self.idle_seconds = idle_seconds
+        self.grace_seconds = grace_seconds
+        self.evictions = 0
+        self._workspaces = {}  # path -> Workspace
+        self._closed_since = {}  # session id -> first time it was seen closed
+        self._janitor = None
+        self._owner_lock = None
+        self._lock = threading.Lock()
+    
+    def _claim_root(self):
+        """Create the folder of this process and hold its owner lock (lock held)"""
+        if self._owner_lock is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        lock_path = os.path.join(self.root, OWNER_LOCK_NAME)
+        self._owner_lock = try_lock(lock_path) if fcntl is not None else open(lock_path, 'a')
+    
+    def create(self, session_id, kind, reserve_bytes=0):
+        """New directory for session_id with room for reserve_bytes; returns its path
+
+        Raises WorkspaceQuotaExceeded if reserve_bytes cannot be freed.
+        """
+        with self._lock:
+            self._claim_root()
+            evicted = self._make_room(reserve_bytes)
+            path = os.path.join(self.root, session_id, f"{kind}_{uuid.uuid4().hex[:12]}")
+            os.makedirs(path)
+            self._workspaces[path] = Workspace(path, session_id, kind, reserve_bytes)
+        self._remove(evicted)
+        return path
+    
+    def _make_room(self, nbytes):
+        """Unregister LRU idle workspaces until nbytes fit; returns their paths (lock held)"""
+        if nbytes > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Butuh {nbytes / (1024 * 1024):.0f} MB, kuota disk kerja {self.quota_bytes / (1024 * 1024):.0f} MB"
+            )
+        used = sum(workspace.bytes for workspace in self._workspaces.values())
+        evicted = []
+        for workspace in sorted(self._workspaces.values(), key=lambda w: w.last_used):
+            if used + nbytes <= self.quota_bytes:
+                break
+            if not workspace.busy:
+                evicted.append(workspace)
+                used -= workspace.bytes
+        if used + nbytes > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                "Disk kerja server sedang penuh dipakai proses lain, coba lagi nanti"
+            )
+        for workspace in evicted:
+            del self._workspaces[workspace.path]
+        self.evictions += len(evicted)
+        return [workspace.path for workspace in evicted]
+    
+    def reserve(self, path, nbytes):
+        """Grow the reservation of a workspace by nbytes, evicting others if needed
+
+        Raises WorkspaceQuotaExceeded if nbytes cannot be freed, or
+        FileNotFoundError if the workspace was evicted or cleaned up.
+        """
+        with self._lock:
+            workspace = self._workspaces.get(path)
+            if workspace is None:
+                raise FileNotFoundError(path)
+            workspace.busy += 1  # Never evicted to make room for itself
+            try:
+                evicted = self._make_room(nbytes)
+            finally:
+                workspace.busy -= 1
+            workspace.bytes += nbytes
+            workspace.last_used = time.time()
+        self._remove(evicted)
+    
+    def record_size(self, path, nbytes=None):
+        """Replace the reservation of a workspace by its size (measured when nbytes is None)"""
+        if nbytes is None:
+            nbytes = directory_size(path)
+        with self._lock:
+            if path in self._workspaces:
+                self._workspaces[path].bytes = nbytes
+                self._workspaces[path].last_used = time.time()
+    
+    def exists(self, path):
+        """Whether path is a live workspace (not evicted or cleaned up)"""
+        with self._lock:
+            return path in self._workspaces
+    
+    def touch(self, session_id):
+        """Mark every workspace of a session as used now"""
+        now = time.time()
+        with self._lock:
+            self._closed_since.pop(session_id, None)
+            for workspace in self._workspaces.values():
+                if workspace.session_id == session_id:
+                    workspace.last_used = now
+    
+    def adopt(self, path, session_id):
+        """Hand a workspace over to another session (e.g. a reconnected browser)"""
+        with self._lock:
+            if path in self._workspaces:
+                self._workspaces[path].session_id = session_id
+                self._workspaces[path].last_used = time.time()
+    
+    @contextmanager
+    def busy(self, path):
+        """Protect a workspace from eviction while a job reads or writes it"""
+        with self._lock:
+            workspace = self._workspaces.get(path)
+            if workspace is not None:
+                workspace.busy += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if workspace is not None:
+                    workspace.busy -= 1
+                    workspace.last_used = time.time()
+    
+    def release(self, path):
+        """Remove a workspace and its files"""
+        with self._lock:
+            self._workspaces.pop(path, None)
+        self._remove([path])
+    
+    def release_session(self, session_id):
+        """Remove every workspace of a session"""
+        with self._lock:
+            paths = [path for path, workspace in self._workspaces.items() if workspace.session_id == session_id]
+            for path in paths:
+                del self._workspaces[path]
+        self._remove(paths)
+    
+    def cleanup(self, now=None, is_active=None):
+        """Remove idle workspaces, and those of closed sessions after the grace period
+
+        is_active (optional) tells whether a session id is still connected.
+        Returns the number of workspaces removed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            sessions = {workspace.session_id for workspace in self._workspaces.values()}
+            if is_active is not None:
+                for session_id in sessions:
+                    if is_active(session_id):
+                        self._closed_since.pop(session_id, None)
+                    else:
+                        self._closed_since.setdefault(session_id, now)
+            paths = []
+            for path, workspace in list(self._workspaces.items()):
+                closed_since = self._closed_since.get(workspace.session_id)
+                if workspace.busy:
+                    continue
+                if now - workspace.last_used > self.idle_seconds or (
+                        closed_since is not None and now - closed_since > self.grace_seconds):
+                    del self._workspaces[path]
+                    paths.append(path)
+            for session_id in set(self._closed_since) - {w.session_id for w in self._workspaces.values()}:
+                del self._closed_since[session_id]
+        self._remove(paths)
+        with self._lock:
+            self._remove_empty_session_dirs()
+        return len(paths)
+    
+    def sweep_orphans(self):
+        """Remove the folders under base_root left by processes that are gone
+
+        A process folder is removed only when its owner lock can be taken,
+        so the live workspaces of another process on the same host are never
+        touched. Unlocked folders (older layout, or where locks are not
+        available) are removed once older than grace_seconds.
+        """
+        if not os.path.isdir(self.base_root):
+            return 0
+        removed = 0
+        for entry in os.scandir(self.base_root):
+            if not entry.is_dir(follow_symlinks=False) or entry.path == self.root:
+                continue
+            lock_path = os.path.join(entry.path, OWNER_LOCK_NAME)
+            if os.path.exists(lock_path):
+                if fcntl is None:
+                    continue  # No way to tell whether its owner still runs
+                lock_file = try_lock(lock_path)
+                if lock_file is None:
+                    continue  # Owner process still running
+                try:
+                    self._remove([entry.path])
+                finally:
+                    lock_file.close()
+            elif time.time() - entry.stat(follow_symlinks=False).st_mtime > self.grace_seconds:
+                self._remove([entry.path])
+            else:
+                continue
+            removed += 1
+        return removed
+    
+    def start_janitor(self, is_active=None, interval=WORKSPACE_CLEANUP_INTERVAL):
+        """Run cleanup() every interval seconds on a daemon thread (started once)"""
+        with self._lock:
+            if self._janitor is not None:
+                return
+            self._janitor = threading.Thread(
+                target=self._janitor_loop, args=(is_active, interval),
+                name='indoarsip-workspace-janitor', daemon=True
+            )
+        self.sweep_orphans()
+        self._janitor.start()
+    
+    def _janitor_loop(self, is_active, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.cleanup(is_active=is_active)
+            except Exception:
+                pass  # Retried at the next round
+    
+    def usage(self):
+        """Current disk use: bytes, quota_bytes, workspaces, sessions, evictions"""
+        with self._lock:
+            return {
+                'bytes': sum(workspace.bytes for workspace in self._workspaces.values()),
+                'quota_bytes': self.quota_bytes,
+                'workspaces': len(self._workspaces),
+                'sessions': len({workspace.session_id for workspace in self._workspaces.values()}),
+                'evictions': self.evictions,
+            }
+    
+    def _remove(self, paths):
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+    
+    def _remove_empty_session_dirs(self):
+        """Remove session folders left empty (lock held, so create() never races it)"""
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_dir(follow_symlinks=False):
+                try:
+                    os.rmdir(entry.path)  # Only succeeds when empty
+                except OSError:
+                    pass
+
+# Shared by every session of the process
+workspace_manager = WorkspaceManager()
@@ -0,0 +1,147 @@
+"""
+INDOARSIP - Reading and copying ZIP members
+"""
+
+import io
+import os
+import sys
+import threading
+import zipfile
+import zlib
+
+from indoarsip import copy_zip_member_raw, create_zip_from_files, list_zip_members, read_source_file
+from indoarsip.archive import append_raw_member
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile (a BytesIO with a name)"""
+    
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+def make_upload(count=64):
+    contents = {f"scan/f{i}.pdf": os.urandom(2000 + i * 37) for i in range(count)}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in contents.items():
+            zip_file.writestr(name, data)
+    return Upload('arsip.zip', buffer.getvalue()), contents
+
+def test_concurrent_reads_and_output_build(tmp_path):
+    upload, contents = make_upload()
+    errors = []
+    
+    def download(offset):
+        try:
+            names = list(contents)
+            for _ in range(5):
+                for name in names[offset:] + names[:offset]:
+                    assert read_source_file(name, upload) == contents[name], name
+        except Exception as e:
+            errors.append(e)
+    
+    def build():
+        try:
+            members, _ = list_zip_members(upload)
+            mapping = {info.filename: f"new_{index}.pdf" for index, info in enumerate(members)}
+            part_paths = create_zip_from_files(mapping, str(tmp_path), source_zip=upload)
+            with zipfile.ZipFile(part_paths[0]) as output:
+                for file_key, new_name in mapping.items():
+                    assert output.read(new_name) == contents[file_key], file_key
+        except Exception as e:
+            errors.append(e)
+    
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=download, args=(offset * 7,)) for offset in range(8)]
+        threads.append(threading.Thread(target=build))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors, errors
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream: ZipFile then writes every member with a data descriptor"""
+    
+    def __init__(self):
+        self.buffer = io.BytesIO()
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        return self.buffer.write(data)
+
+def zip_crypto_encrypt(data, password, check_byte):
+    """Traditional PKWARE encryption (the one zipfile can decrypt)"""
+    def crc_step(crc, byte):
+        return ~zlib.crc32(bytes([byte]), ~crc & 0xFFFFFFFF) & 0xFFFFFFFF
+    
+    keys = [305419896, 591751049, 878082192]
+    
+    def update(byte):
+        keys[0] = crc_step(keys[0], byte)
+        keys[1] = ((keys[1] + (keys[0] & 0xFF)) * 134775813 + 1) & 0xFFFFFFFF
+        keys[2] = crc_step(keys[2], keys[1] >> 24)
+    
+    for byte in password:
+        update(byte)
+    encrypted = bytearray()
+    for byte in os.urandom(11) + bytes([check_byte]) + data:
+        temp = keys[2] | 2
+        encrypted.append(byte ^ (((temp * (temp ^ 1)) >> 8) & 0xFF))
+        update(byte)
+    return bytes(encrypted)
+
+def make_source_zip():
+    """ZIP with deflated and stored members, all written with a data descriptor, plus an encrypted one"""
+    contents = {'deflated.pdf': os.urandom(1000) * 5, 'stored.pdf': os.urandom(3000)}
+    stream = Unseekable()
+    with zipfile.ZipFile(stream, 'w') as zip_file:
+        zip_file.writestr('deflated.pdf', contents['deflated.pdf'], zipfile.ZIP_DEFLATED)
+        zip_file.writestr('stored.pdf', contents['stored.pdf'], zipfile.ZIP_STORED)
+        
+        secret = b'isi rahasia' * 100
+        info = zipfile.ZipInfo('secret.pdf', date_time=(2024, 5, 17, 13, 45, 30))
+        info.flag_bits = 0x01 | 0x08  # Encrypted, with a data descriptor
+        dos_time = 13 << 11 | 45 << 5 | 30 // 2
+        encrypted = zip_crypto_encrypt(secret, b'sandi', (dos_time >> 8) & 0xFF)
+        info.CRC = zlib.crc32(secret)
+        info.file_size = len(secret)
+        info.compress_size = len(encrypted)
+        append_raw_member(zip_file, info, [encrypted])
+    return stream.buffer.getvalue(), contents, secret
+
+def test_raw_copy_round_trip(tmp_path):
+    data, contents, secret = make_source_zip()
+    output_path = str(tmp_path / 'output.zip')
+    with zipfile.ZipFile(io.BytesIO(data)) as source:
+        assert all(info.flag_bits & 0x08 for info in source.infolist())
+        assert source.read('secret.pdf', pwd=b'sandi') == secret
+        with zipfile.ZipFile(output_path, 'w') as output:
+            for info in source.infolist():
+                copy_zip_member_raw(source, info, output, 'baru_' + info.filename)
+    
+    with zipfile.ZipFile(output_path) as output:
+        output.setpassword(b'sandi')
+        assert output.testzip() is None  # Every CRC checks out
+        for name, content in contents.items():
+            assert output.read('baru_' + name) == content
+        assert output.read('baru_secret.pdf', pwd=b'sandi') == secret
+
+def test_copy_without_zip_internals_rewrites_the_member(tmp_path, monkeypatch):
+    data, contents, _ = make_source_zip()
+    monkeypatch.setattr('indoarsip.archive.ZIPFILE_WRITE_FIELDS', ('_field_of_another_python',))
+    output_path = str(tmp_path / 'output.zip')
+    with zipfile.ZipFile(io.BytesIO(data)) as source, zipfile.ZipFile(output_path, 'w') as output:
+        for name in contents:
+            copy_zip_member_raw(source, source.getinfo(name), output, 'baru_' + name)
+    
+    with zipfile.ZipFile(output_path) as output:
+        assert output.testzip() is None
+        for name, content in contents.items():
+            assert output.read('baru_' + name) == content
@@ -0,0 +1,24 @@
+"""
+INDOARSIP - Job instrumentation
+"""
+
+import time
+
+import pytest
+
+from indoarsip.instrumentation import JobMetrics, current_rss_bytes
+
+@pytest.mark.skipif(current_rss_bytes() is None, reason="resident memory not readable here")
+def test_stage_peak_covers_only_that_stage():
+    metrics = JobMetrics('test')
+    with metrics.stage('allocate'):
+        buffer = bytearray(200 * 1024 * 1024)
+        buffer[::4096] = b'x' * len(buffer[::4096])  # Touch every page
+        time.sleep(0.2)
+        del buffer
+    with metrics.stage('idle'):
+        time.sleep(0.2)
+    
+    allocate, idle = metrics.stages
+    assert allocate['peak_rss_bytes'] - idle['peak_rss_bytes'] > 150 * 1024 * 1024
+    assert 'process_peak_rss_bytes' in metrics.summary()
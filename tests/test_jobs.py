@@ -0,0 +1,40 @@
+"""
+INDOARSIP - Job admission
+"""
+
+import pytest
+
+from indoarsip.cache import ByteLRUCache
+from indoarsip.jobs import Job, JobManager, JobRejected
+
+@pytest.fixture
+def caches(monkeypatch):
+    """Fresh shared caches, each holding four 100-byte values"""
+    artefacts, files = ByteLRUCache(1000), ByteLRUCache(1000)
+    for cache in (artefacts, files):
+        for key in range(4):
+            cache.get(key, lambda: b'x' * 100)
+    monkeypatch.setattr('indoarsip.jobs.artefact_cache', artefacts)
+    monkeypatch.setattr('indoarsip.jobs.file_cache', files)
+    return artefacts, files
+
+def wait_for_admission(reason, monkeypatch):
+    """Run _admit for one job while another runs and the budget is exceeded for reason"""
+    manager = JobManager(workers=1, max_wait_seconds=0)
+    monkeypatch.setattr(manager, 'over_budget', lambda: reason)
+    manager._running = 1
+    with pytest.raises(JobRejected):
+        manager._admit(Job('test'))
+
+def test_cpu_load_keeps_the_shared_caches(caches, monkeypatch):
+    wait_for_admission('CPU', monkeypatch)
+    assert [cache.stats()['bytes'] for cache in caches] == [400, 400]
+
+def test_memory_pressure_trims_the_least_recently_used(caches, monkeypatch):
+    monkeypatch.setattr('indoarsip.jobs.ADMISSION_CACHE_TRIM_FRACTION', 0.25)
+    artefacts, files = caches
+    artefacts.get(0, lambda: None)  # Key 0 becomes the most recently used
+    wait_for_admission('memori', monkeypatch)
+    assert [cache.stats()['bytes'] for cache in caches] == [200, 200]
+    assert artefacts.get(0, lambda: b'reloaded') == b'x' * 100
+    assert artefacts.get(1, lambda: b'reloaded') == b'reloaded'
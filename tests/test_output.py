@@ -0,0 +1,31 @@
+"""
+INDOARSIP - Renamed ZIP from a TAR stream
+"""
+
+import io
+import tarfile
+import zipfile
+
+from indoarsip import create_zip_from_tar
+from indoarsip.dedupe import DUPLICATE
+
+def make_tar(path, members):
+    with tarfile.open(path, 'w') as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+def test_name_stored_twice_is_reported_once(tmp_path):
+    source = str(tmp_path / 'arsip.tar')
+    # b.pdf duplicates a.pdf, then is appended again with other content
+    make_tar(source, [('a.pdf', b'same'), ('b.pdf', b'same'), ('b.pdf', b'other'), ('c.pdf', b'third')])
+    mapping = {'a.pdf': '0001-A.pdf', 'b.pdf': '0001-A.pdf', 'c.pdf': '0002-B.pdf'}
+    
+    part_paths, output_mapping, duplicates = create_zip_from_tar(mapping, str(tmp_path), source)
+    
+    assert output_mapping == {'a.pdf': '0001-A.pdf', 'c.pdf': '0002-B.pdf'}
+    assert duplicates == [{'file': 'b.pdf', 'target': '0001-A.pdf', 'same_as': 'a.pdf', 'status': DUPLICATE}]
+    with zipfile.ZipFile(part_paths[0]) as zip_file:
+        assert zip_file.namelist() == ['0001-A.pdf', '0002-B.pdf']
+        assert zip_file.read('0001-A.pdf') == b'same'
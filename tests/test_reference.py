@@ -0,0 +1,49 @@
+"""
+INDOARSIP - Streamed reference column vs pandas read_excel
+"""
+
+import datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from indoarsip.reference import read_reference_column
+
+def workbook_bytes(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+CASES = {
+    'ints': [[1], [336], [42]],
+    'text_codes': [['0001-A'], ['0336-B'], ['X-9']],
+    'numeric_text': [[1], ['0336'], [42]],
+    'numeric_text_only': [['0001'], ['0336']],
+    'na_strings': [['0001-A'], ['NA'], ['null'], ['n/a'], ['#N/A'], ['0002-B']],
+    'ints_with_gap': [[1], [None], [3]],
+    'ints_with_fraction': [[1], [2.5], [3]],
+    'integral_floats': [[1.0], [2.0]],
+    'dates': [[datetime.datetime(2024, 1, 31)], [datetime.datetime(2024, 2, 1)]],
+    'dates_with_time': [[datetime.datetime(2024, 1, 31, 13, 5)], [datetime.date(2024, 2, 1)]],
+    'mixed': [['0001-A'], [336], [datetime.datetime(2024, 1, 31)], [True], [1.5]],
+    'bools': [[True], [False]],
+    'trailing_other_column': [[1, 'x'], [2, 'y'], [None, 'z']],
+    'trailing_empty_rows': [[1], [2], [None], [None]],
+    'blank_row_inside': [[1], [None, None], [3]],
+    'error_cell': [['0001-A'], ['#DIV/0!'], ['0002-B']],
+}
+
+@pytest.mark.parametrize('case', sorted(CASES))
+def test_matches_pandas(case):
+    data = workbook_bytes([['Nomor', 'Lain']] + CASES[case])
+    expected = pd.read_excel(BytesIO(data))['Nomor'].dropna().astype(str).tolist()
+    assert read_reference_column(data, 'Nomor') == expected
+
+def test_missing_column():
+    assert read_reference_column(workbook_bytes([['Nomor'], [1]]), 'Kode') is None
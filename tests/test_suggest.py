@@ -0,0 +1,67 @@
+"""
+INDOARSIP - Suggestions through the symmetric-delete index
+"""
+
+import random
+
+import pytest
+
+from indoarsip.cache import artefact_cache, estimate_size
+from indoarsip.matching import build_reference_index
+from indoarsip.suggest import SuggestionIndex, build_delete_level, suggest_for_unmatched
+
+def levenshtein(a, b):
+    """Textbook dynamic-programming Levenshtein distance"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def brute_force(reference_index, code, limit, max_distance):
+    """Compare the code with every leading code: nearest first, then Excel order"""
+    nearest = []
+    for code_id, leading_code in enumerate(reference_index['leading']):
+        distance = levenshtein(code, leading_code)
+        if distance <= max_distance:
+            nearest.append((distance, code_id, leading_code))
+    suggestions = []
+    for distance, _, leading_code in sorted(nearest):
+        for reference in reference_index['leading'][leading_code]:
+            suggestions.append((reference, distance))
+    return suggestions[:limit]
+
+def make_references(count, seed):
+    rng = random.Random(seed)
+    references = []
+    for number in range(count):
+        code = ''.join(rng.choice('0123456789') for _ in range(rng.randint(3, 6)))
+        references.append(f"{code}-REF {number}")
+    return references
+
+@pytest.mark.parametrize('max_distance', [0, 1, 2, 3])
+def test_matches_brute_force(max_distance):
+    reference_index = build_reference_index(make_references(400, seed=max_distance))
+    suggestion_index = SuggestionIndex(reference_index)
+    rng = random.Random(100 + max_distance)
+    queries = [''.join(rng.choice('0123456789') for _ in range(rng.randint(1, 7))) for _ in range(300)]
+    queries += list(reference_index['leading'])[:20]
+    for code in queries:
+        expected = brute_force(reference_index, code, 10, max_distance)
+        for limit in (1, 3, 10):
+            assert suggestion_index.suggest(code, limit, max_distance) == expected[:limit], (code, limit)
+
+def test_levels_are_cached_and_sized_apart_from_the_reference_index():
+    reference_index = build_reference_index(make_references(200, seed=7))
+    keys_before = set(reference_index)
+    artefact_cache.clear()
+    
+    suggest_for_unmatched(['x/99999.pdf'], {'x/99999.pdf': '99999'}, reference_index, max_distance=2)
+    
+    # The reference index is not modified; every level built is accounted in the cache
+    assert set(reference_index) == keys_before
+    codes = list(reference_index['leading'])
+    levels = [build_delete_level(codes, deletes) for deletes in range(3)]
+    assert artefact_cache.stats()['bytes'] == sum(estimate_size(level) for level in levels)
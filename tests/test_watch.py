@@ -0,0 +1,54 @@
+"""
+INDOARSIP - Watch-folder mode
+"""
+
+import os
+
+from indoarsip.watch import InboxWatcher, is_candidate_file
+
+def write(path, data=b'%PDF'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def settle(watcher):
+    """Scan twice (a file is handed over once unchanged) and process"""
+    watcher.scan()
+    watcher.process_ready()
+    watcher.scan()
+    return watcher.process_ready()
+
+def test_candidate_files_skip_system_directories(tmp_path):
+    inbox = str(tmp_path)
+    assert is_candidate_file(os.path.join(inbox, 'box', 'file_0001.pdf'), inbox)
+    assert not is_candidate_file(os.path.join(inbox, '__MACOSX', 'box', 'file_0001.pdf'), inbox)
+    assert not is_candidate_file(os.path.join(inbox, '.hidden', 'file_0001.pdf'), inbox)
+    assert not is_candidate_file(os.path.join(inbox, 'box', '._file_0001.pdf'), inbox)
+    assert not is_candidate_file(os.path.join(inbox, 'file_0001.pdf.part'), inbox)
+
+def test_existing_target_is_never_overwritten(tmp_path):
+    inbox, outbox = str(tmp_path / 'inbox'), str(tmp_path / 'outbox')
+    write(os.path.join(inbox, 'file_0001.pdf'), b'new')
+    write(os.path.join(inbox, 'file_0002.pdf'), b'two')
+    write(os.path.join(outbox, '0001-A.pdf'), b'old')
+    watcher = InboxWatcher(inbox, outbox, ['0001-A', '0002-B'], settle_seconds=0)
+    
+    statuses = {os.path.basename(record['file']): record['status'] for record in settle(watcher)}
+    
+    assert statuses == {'file_0001.pdf': 'collision', 'file_0002.pdf': 'matched'}
+    with open(os.path.join(outbox, '0001-A.pdf'), 'rb') as f:
+        assert f.read() == b'old'
+    assert os.path.exists(os.path.join(inbox, 'file_0001.pdf'))
+    assert not os.path.exists(os.path.join(inbox, 'file_0002.pdf'))
+
+def test_skipped_files_are_forgotten_once_gone(tmp_path):
+    inbox, outbox = str(tmp_path / 'inbox'), str(tmp_path / 'outbox')
+    path = os.path.join(inbox, 'file_0009.pdf')
+    write(path)
+    watcher = InboxWatcher(inbox, outbox, ['0001-A'], settle_seconds=0)
+    
+    assert [record['status'] for record in settle(watcher)] == ['unmatched']
+    assert path in watcher._skipped
+    os.remove(path)
+    watcher.prune_skipped()
+    assert not watcher._skipped
@@ -0,0 +1,64 @@
+"""
+INDOARSIP - Workspaces
+"""
+
+import os
+
+import pytest
+
+from indoarsip.workspace import OWNER_LOCK_NAME, WorkspaceManager, WorkspaceQuotaExceeded
+
+def test_reservation_beyond_quota_is_rejected(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path), quota_bytes=1000)
+    with pytest.raises(WorkspaceQuotaExceeded):
+        manager.create('session', 'upload', reserve_bytes=1001)
+    
+    path = manager.create('session', 'upload', reserve_bytes=800)
+    with manager.busy(path):
+        # The only other workspace is in use, so nothing can be evicted
+        with pytest.raises(WorkspaceQuotaExceeded):
+            manager.create('other', 'upload', reserve_bytes=300)
+        with pytest.raises(WorkspaceQuotaExceeded):
+            manager.reserve(path, 300)
+    assert manager.exists(path)
+    assert manager.usage()['bytes'] == 800
+
+def test_least_recently_used_workspaces_are_evicted_first(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path), quota_bytes=1000)
+    first = manager.create('a', 'upload', reserve_bytes=400)
+    second = manager.create('b', 'upload', reserve_bytes=400)
+    manager.touch('a')  # second is now the least recently used
+    manager._workspaces[second].last_used -= 10
+    
+    third = manager.create('c', 'output', reserve_bytes=400)
+    
+    assert manager.exists(first) and manager.exists(third)
+    assert not manager.exists(second) and not os.path.exists(second)
+    assert manager.usage()['evictions'] == 1
+    
+    manager.create('d', 'output', reserve_bytes=600)
+    assert not manager.exists(first) and manager.exists(third)
+    assert manager.usage()['evictions'] == 2
+
+def test_sweep_keeps_the_workspaces_of_a_running_process(tmp_path):
+    running = WorkspaceManager(root=str(tmp_path))
+    path = running.create('session', 'upload')
+    starting = WorkspaceManager(root=str(tmp_path), grace_seconds=0)
+    os.utime(running.root, (0, 0))
+    
+    assert starting.sweep_orphans() == 0
+    assert os.path.isdir(path)
+
+def test_sweep_removes_the_folders_of_stopped_processes(tmp_path):
+    stopped = tmp_path / 'process_1_deadbeef'
+    (stopped / 'session' / 'upload_x').mkdir(parents=True)
+    (stopped / OWNER_LOCK_NAME).touch()  # Nobody holds it any more
+    legacy = tmp_path / 'old_session'
+    legacy.mkdir()
+    os.utime(legacy, (0, 0))
+    recent = tmp_path / 'new_session'
+    recent.mkdir()
+    
+    manager = WorkspaceManager(root=str(tmp_path))
+    assert manager.sweep_orphans() == 2
+    assert sorted(os.listdir(tmp_path)) == ['new_session']